@@ -0,0 +1,574 @@
+import numpy as np
+
+from race_strategy import RACE_STRATEGY_TYPES
+from weather_conditions import WEATHER_CONDITIONS
+from weather_transitions import WEATHER_TRANSITIONS
+from ers_management import ERS_MODES
+from progress import ProgressReporter
+
+# Vectorized batch race engine.
+# Advances a whole batch of races lap by lap. Every piece of dynamic race state is an
+# (n_sims, n_drivers) NumPy array, and the lap-time, wear, failure, pit, ERS, team order and
+# overtake rules of race_sim_adv.simulate_race are applied as array operations.
+# The engine draws from its own NumPy Generator, so it reproduces the race model
+# statistically, not the exact random stream of the scalar engine.
+# It does not build race logs or replays.
+
+# Races simulated per batch. Every batch draws from a random stream of its own (see
+# batch_rng), so a run can start at any batch boundary (a shard or a resumed checkpoint) and
+# still draw exactly the races a single run from sim 0 would have.
+BATCH_SIZE = 4096
+
+COMPOUNDS = ['soft', 'medium', 'hard', 'intermediate', 'wet']
+SOFT, MEDIUM, HARD, INTERMEDIATE, WET = range(len(COMPOUNDS))
+
+DNF_REASONS = ['', 'Mechanical Failure (Engine)', 'Mechanical Failure (Brakes/Chassis)', 'Mechanical Failure', 'Driver Error (Crash)']
+NO_DNF, DNF_ENGINE, DNF_BRAKES, DNF_MECHANICAL, DNF_CRASH = range(len(DNF_REASONS))
+
+ERS_MODE_NAMES = list(ERS_MODES)
+STANDARD, HOTLAP, OVERTAKE, DEFEND, CHARGE = (ERS_MODE_NAMES.index(name) for name in ('Standard', 'Hotlap', 'Overtake', 'Defend', 'Charge'))
+ERS_POWER_BOOST = np.array([ERS_MODES[name]['power_boost'] for name in ERS_MODE_NAMES], dtype=float)
+ERS_ENERGY_DRAIN = np.array([ERS_MODES[name]['energy_drain'] for name in ERS_MODE_NAMES], dtype=float)
+ERS_DURATION = np.array([ERS_MODES[name]['duration_laps'] for name in ERS_MODE_NAMES], dtype=np.int64)
+# Overtake and Hotlap burn 10% more fuel (see calculate_lap_time).
+ERS_FUEL_MULTIPLIER = np.array([1.1 if name in ('Overtake', 'Hotlap') else 1.0 for name in ERS_MODE_NAMES])
+
+_ACUMEN_KEYS = ['strategy_aggressive_acumen', 'strategy_balanced_acumen', 'strategy_conservative_acumen']
+
+def _strategy_table():
+    """Per-strategy lookup arrays, indexed by position in RACE_STRATEGY_TYPES."""
+    names = [s['name'] for s in RACE_STRATEGY_TYPES]
+    return {
+        'acumen_key': np.array([_ACUMEN_KEYS.index(s['applies_acumen']) for s in RACE_STRATEGY_TYPES]),
+        'weather_adaptability': np.array([s.get('weather_adaptability', 0.0) for s in RACE_STRATEGY_TYPES]),
+        'num_stops': np.array([2 if "2-Stop" in n else 3 if "3-Stop" in n else 1 for n in names]),
+        'team_order_stops': np.array([1 if "1-Stop" in n else 2 for n in names]),
+        'aggressive': np.array([n.lower().startswith('aggressive') for n in names]),
+        'aggressive_push': np.array([n.lower().startswith('aggressive push') for n in names]),
+        'safety_car_opt': np.array([n == "Safety Car Optimization (Opportunistic)" for n in names]),
+        'weather_dependent': np.array([n == "Weather Dependent (Wet/Intermediate Play)" for n in names]),
+        'tire_preference': np.array([[s.get('tire_compound_preference', {'soft': 0.33, 'medium': 0.33, 'hard': 0.34})[c] for c in COMPOUNDS[:3]] for s in RACE_STRATEGY_TYPES]),
+    }
+
+def _weather_table(initial_weather):
+    """Per-weather lookup arrays plus the normalized transition matrix."""
+    names = list(WEATHER_CONDITIONS)
+    if initial_weather['name'] not in names:
+        names.append(initial_weather['name'])
+    rows = [initial_weather if name == initial_weather['name'] else WEATHER_CONDITIONS[name] for name in names]
+    recommendation = {'intermediate': INTERMEDIATE, 'wet': WET}
+
+    transitions = np.zeros((len(names), len(names)))
+    for i, name in enumerate(names):
+        possible = WEATHER_TRANSITIONS.get(name, {})
+        total_weight = sum(possible.values())
+        for next_name, weight in possible.items():
+            if total_weight > 0 and next_name in names:
+                transitions[i, names.index(next_name)] = weight / total_weight
+    # Rows without transitions (or with zero total weight) keep the current weather.
+    for i in range(len(names)):
+        if transitions[i].sum() == 0:
+            transitions[i, i] = 1.0
+
+    return {
+        'names': names,
+        'grip': np.array([w['grip_multiplier'] for w in rows]),
+        'hp': np.array([w['hp_multiplier'] for w in rows]),
+        'downforce': np.array([w['downforce_multiplier'] for w in rows]),
+        'tire_wear': np.array([w['tire_wear_modifier'] for w in rows]),
+        'driver_error': np.array([w['driver_error_chance_modifier'] for w in rows]),
+        'variability': np.array([w.get('variability', 0.0) for w in rows]),
+        'track_temp': np.array([w.get('track_temp_celsius', 25) for w in rows]),
+        'adaptability': np.array([w.get('adaptability_modifier', 0.2) for w in rows]),
+        'recommendation': np.array([recommendation.get(w.get('tire_type_recommendation', 'dry'), -1) for w in rows]),
+        'washes_rubber': np.array(['Rain' in name for name in names]),
+        'heavy_rain': np.array([name == 'Heavy Rain' for name in names]),
+        'light_rain': np.array([name == 'Light Rain' for name in names]),
+        'dry_running': np.array([name in ('Dry', 'Hot', 'Cold') for name in names]),
+        'transition_cdf': np.cumsum(transitions, axis=1),
+    }
+
+def _driver_table(race_entries_template):
+    """Static driver, team and car attributes as (n_drivers,) arrays."""
+    def column(attr):
+        return np.array([getattr(e, attr) for e in race_entries_template], dtype=float)
+
+    team_names = [e.team_name for e in race_entries_template]
+    pairs = []
+    for team in dict.fromkeys(team_names):
+        members = [i for i, name in enumerate(team_names) if name == team]
+        if len(members) == 2:
+            pairs.append(members)
+
+    return {
+        'skill': column('driver_skill'),
+        'consistency': column('driver_consistency'),
+        'tire_management': column('driver_tire_management'),
+        'wet_weather': column('driver_wet_weather_ability'),
+        'overtaking': column('driver_overtaking_skill'),
+        'defending': column('driver_defending_skill'),
+        'pit_speed': column('team_pit_stop_speed'),
+        'acumen': np.stack([column(key) for key in _ACUMEN_KEYS], axis=1),
+        'car_overall': column('car_overall_score'),
+        'engine_hp': column('car_engine_hp_final'),
+        'engine_rel': column('car_engine_rel_final'),
+        'aero_df': column('car_chassis_aero_df_final'),
+        'aero_dr': column('car_chassis_aero_dr_final'),
+        'brakes_sp': column('car_brakes_sp_final'),
+        'brakes_dur': column('car_brakes_dur_final'),
+        'tires_wr': column('car_tires_wr_final'),
+        'teammate_pairs': np.array(pairs, dtype=np.int64).reshape(-1, 2),
+    }
+
+def _weighted_choice(rng, weights, options):
+    """Draws one option per row from row-wise (unnormalized) weights."""
+    cdf = np.cumsum(weights, axis=-1)
+    u = rng.random(cdf.shape[:-1])[..., None] * cdf[..., -1:]
+    idx = (u >= cdf).sum(axis=-1)
+    return np.asarray(options)[np.minimum(idx, len(options) - 1)]
+
+def _running_order(total_time, is_dnf):
+    """Returns the race order (live cars by time, retired cars last) and the gaps to the cars ahead and behind."""
+    key = np.where(is_dnf, np.inf, total_time)
+    order = np.argsort(key, axis=1, kind='stable')
+    sorted_time = np.take_along_axis(key, order, axis=1)
+    inf_col = np.full((key.shape[0], 1), np.inf)
+    with np.errstate(invalid='ignore'):
+        gap_front_sorted = sorted_time - np.concatenate([-inf_col, sorted_time[:, :-1]], axis=1)
+        gap_rear_sorted = np.concatenate([sorted_time[:, 1:], inf_col], axis=1) - sorted_time
+    gap_front = np.empty_like(key)
+    gap_rear = np.empty_like(key)
+    np.put_along_axis(gap_front, order, gap_front_sorted, axis=1)
+    np.put_along_axis(gap_rear, order, gap_rear_sorted, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(1, key.shape[1] + 1)[None, :].repeat(key.shape[0], axis=0), axis=1)
+    return order, positions, gap_front, gap_rear
+
+class BatchRaceResult:
+    """
+    Final state of a batch of races. Every array is (n_sims, n_drivers), with drivers
+    in template order. Positions are final classification positions (DNFs at the back).
+    """
+    def __init__(self, driver_names, team_names, positions, grid_positions, is_dnf, dnf_reason, total_race_time_s, laps_completed, pit_stops_made, strategy, tire_compound):
+        self.driver_names = driver_names
+        self.team_names = team_names
+        self.positions = positions
+        self.grid_positions = grid_positions
+        self.is_dnf = is_dnf
+        self.dnf_reason = dnf_reason
+        self.total_race_time_s = total_race_time_s
+        self.laps_completed = laps_completed
+        self.pit_stops_made = pit_stops_made
+        self.strategy = strategy
+        self.tire_compound = tire_compound
+
+    @property
+    def num_simulations(self):
+        return self.positions.shape[0]
+
+    def to_simulation_results(self):
+        """Converts the batch to the per-race record lists consumed by aggregate_results."""
+        all_simulation_results = []
+        for s in range(self.num_simulations):
+            race = []
+            for d in np.argsort(self.positions[s]):
+                race.append({
+                    'driver_name': self.driver_names[d],
+                    'team_name': self.team_names[d],
+                    'initial_position': int(self.grid_positions[s, d]),
+                    'current_position': int(self.positions[s, d]),
+                    'is_dnf': bool(self.is_dnf[s, d]),
+                    'dnf_reason': DNF_REASONS[self.dnf_reason[s, d]],
+                    'total_race_time_s': float(self.total_race_time_s[s, d]),
+                    'laps_completed': int(self.laps_completed[s, d]),
+                    'pit_stops_made': int(self.pit_stops_made[s, d]),
+                    'assigned_strategy_type': RACE_STRATEGY_TYPES[self.strategy[s, d]],
+                    'current_tire_compound': COMPOUNDS[self.tire_compound[s, d]],
+                })
+            all_simulation_results.append(race)
+        return all_simulation_results
+
+def simulate_race_batch(circuit, weather, race_entries_template, num_simulations, enhanced_simulation=False, rng=None):
+    """Simulates num_simulations independent races at once and returns a BatchRaceResult."""
+    rng = rng if rng is not None else np.random.default_rng()
+    drivers = _driver_table(race_entries_template)
+    strategies = _strategy_table()
+    weathers = _weather_table(weather)
+    n_sims, n_drivers = num_simulations, len(race_entries_template)
+    shape = (n_sims, n_drivers)
+    total_laps = circuit['laps']
+    sims = np.arange(n_sims)[:, None]
+
+    # --- Circuit invariants (calculate_lap_time / check_for_overtake) ---
+    base_time = circuit['length_km'] * 38
+    speed_weight = circuit['straight_speed_importance']
+    cornering_weight = circuit['cornering_importance']
+    braking_weight = circuit['braking_demands']
+    total_weight = speed_weight + cornering_weight + braking_weight
+    base_wear = circuit['tire_wear_severity'] * (1.1 - drivers['tires_wr']) * (1.0 - (drivers['tire_management'] * 0.5))
+    fuel_burn_rate = circuit['length_km'] * 0.35
+    track_difficulty = circuit['overtaking_difficulty'] * 0.4
+    slipstream_track = circuit['straight_speed_importance'] > 0.7 and circuit.get('downforce_sensitivity', 0.5) < 0.7
+    sc_probability = 0.6 if circuit.get('track_type') == 'Street Circuit' else 0.4
+    weather_susceptibility = circuit.get('weather_susceptibility', 0.1)
+
+    # --- Reliability invariants (simulate_event) ---
+    engine_penalty = (1.0 - drivers['engine_rel']) * 2
+    brakes_penalty = (1.0 - drivers['brakes_dur']) * 1.5
+    failure_base = 0.0002 + (engine_penalty * 0.001) + (brakes_penalty * 0.0008)
+    minor_damage_base = 0.0002 + (engine_penalty * 0.0005) + (brakes_penalty * 0.0003)
+    total_penalty = engine_penalty + brakes_penalty
+    with np.errstate(divide='ignore', invalid='ignore'):
+        engine_share = np.where(total_penalty > 0, engine_penalty / total_penalty, 0.0)
+
+    # --- Per-sim setup: strategies, grid and starting tires ---
+    strategy = rng.integers(0, len(RACE_STRATEGY_TYPES), size=shape)
+    grid_positions = np.argsort(rng.random(shape), axis=1) + 1
+    acumen = drivers['acumen'][np.arange(n_drivers)[None, :], strategies['acumen_key'][strategy]]
+    adaptability = strategies['weather_adaptability'][strategy]
+    num_stops = strategies['num_stops'][strategy]
+    team_order_stops = strategies['team_order_stops'][strategy]
+    aggressive = strategies['aggressive'][strategy]
+    aggressive_push = strategies['aggressive_push'][strategy]
+    safety_car_opt = strategies['safety_car_opt'][strategy]
+    weather_dependent = strategies['weather_dependent'][strategy]
+
+    weather_idx = np.full(n_sims, weathers['names'].index(weather['name']))
+    if enhanced_simulation:
+        initial_rec = weathers['recommendation'][weather_idx[0]]
+        if initial_rec >= 0:
+            compound = np.full(shape, initial_rec)
+        else:
+            circuit_pref = circuit.get('tire_compound_preference', {'soft': 0.33, 'medium': 0.33, 'hard': 0.34})
+            circuit_weights = np.array([circuit_pref[c] for c in COMPOUNDS[:3]])
+            combined_weights = (circuit_weights[None, None, :] + strategies['tire_preference'][strategy]) / 2
+            compound = _weighted_choice(rng, combined_weights, [SOFT, MEDIUM, HARD])
+    else:
+        compound = np.full(shape, MEDIUM)
+
+    # --- Dynamic race state ---
+    total_time = np.zeros(shape)
+    laps_completed = np.zeros(shape, dtype=np.int64)
+    is_dnf = np.zeros(shape, dtype=bool)
+    dnf_reason = np.zeros(shape, dtype=np.int64)
+    pit_stops = np.zeros(shape, dtype=np.int64)
+    tire_wear = np.zeros(shape)
+    laps_on_tires = np.zeros(shape, dtype=np.int64)
+    has_graining = np.zeros(shape, dtype=bool)
+    has_damage = np.zeros(shape, dtype=bool)
+    damage_factor = np.ones(shape)
+    ers_charge = np.ones(shape)
+    ers_mode = np.full(shape, STANDARD)
+    ers_lap = np.zeros(shape, dtype=np.int64)
+    morale = np.ones(shape)
+    fuel = np.full(shape, 110.0)
+    drs_active = np.zeros(shape, dtype=bool)
+    dirty_air = np.zeros(shape, dtype=bool)
+    safety_car_laps = np.zeros(n_sims, dtype=np.int64)
+    rubber = np.zeros(n_sims)
+
+    for lap in range(1, total_laps + 1):
+        live = ~is_dnf
+
+        # Safety car deployment
+        if 2 < lap < total_laps - 5:
+            # A car that retired during the previous lap stopped short of completing it.
+            dnf_last_lap = (is_dnf & (laps_completed == lap - 2)).any(axis=1)
+            incident = (safety_car_laps == 0) & (dnf_last_lap | (rng.random(n_sims) < 0.005))
+            deployed = incident & (rng.random(n_sims) < sc_probability)
+            safety_car_laps = np.where(deployed, rng.integers(2, 5, size=n_sims), safety_car_laps)
+        safety_car = safety_car_laps > 0
+
+        # Weather transitions
+        weather_changed = np.zeros(n_sims, dtype=bool)
+        if enhanced_simulation:
+            transition = rng.random(n_sims) < weathers['variability'][weather_idx] * weather_susceptibility
+            cdf = weathers['transition_cdf'][weather_idx]
+            new_idx = np.minimum((rng.random(n_sims)[:, None] * cdf[:, -1:] >= cdf).sum(axis=1), cdf.shape[1] - 1)
+            weather_changed = transition & (new_idx != weather_idx)
+            weather_idx = np.where(weather_changed, new_idx, weather_idx)
+            rubber = np.where(weather_changed & weathers['washes_rubber'][weather_idx], rubber * 0.1, rubber)
+
+        live_count = live.sum(axis=1)
+        rubber = np.where(rubber < 1.0, np.minimum(1.0, rubber + (live_count / 20) * 0.01 * (1.0 - rubber)), rubber)
+        grip_bonus = rubber * 0.015 if enhanced_simulation else np.zeros(n_sims)
+
+        w_grip = weathers['grip'][weather_idx][:, None]
+        w_hp = weathers['hp'][weather_idx][:, None]
+        w_downforce = weathers['downforce'][weather_idx][:, None]
+        w_tire_wear = weathers['tire_wear'][weather_idx][:, None]
+        w_error = weathers['driver_error'][weather_idx][:, None]
+        w_variability = weathers['variability'][weather_idx][:, None]
+        w_rec = weathers['recommendation'][weather_idx][:, None]
+
+        # Running order, ERS, DRS and dirty air
+        _, _, gap_front, gap_rear = _running_order(total_time, is_dnf)
+        if enhanced_simulation:
+            expired = live & (ers_mode != STANDARD) & (lap > ers_lap + ERS_DURATION[ers_mode])
+            ers_mode = np.where(expired, STANDARD, ers_mode)
+            ers_charge = np.where(live, np.clip(ers_charge - ERS_ENERGY_DRAIN[ers_mode], 0.0, 1.0), ers_charge)
+            deciding = live & (ers_mode == STANDARD)
+            u = rng.random((4,) + shape)
+            to_charge = deciding & (ers_charge < 0.2) & (u[0] < 0.8)
+            deciding &= ~to_charge
+            to_overtake = deciding & (gap_front < 0.7) & (ers_charge > 0.4) & (u[1] < 0.7)
+            deciding &= ~to_overtake
+            to_defend = deciding & (gap_rear < 0.7) & (ers_charge > 0.3) & (u[2] < 0.7)
+            deciding &= ~to_defend
+            to_hotlap = deciding & (gap_front > 3.0) & (gap_rear > 3.0) & (ers_charge > 0.6) & (u[3] < 0.1)
+            ers_mode = np.select([to_charge, to_overtake, to_defend, to_hotlap], [CHARGE, OVERTAKE, DEFEND, HOTLAP], ers_mode)
+            ers_lap = np.where(to_charge | to_overtake | to_defend | to_hotlap, lap, ers_lap)
+            drs_active = np.where(live, (lap > 2) & ~safety_car[:, None] & (gap_front < 1.0), drs_active)
+            dirty_air = np.where(live, gap_front < 2.0, dirty_air)
+
+        # Random events: minor damage, mechanical failures and driver errors
+        u = rng.random((6,) + shape)
+        failure_chance = np.broadcast_to(failure_base, shape)
+        high_wear_factor = np.where(tire_wear > 0.8, 1 + (tire_wear - 0.8) * 0.5, 1.0)
+        if enhanced_simulation:
+            failure_chance = np.where(aggressive, failure_chance * 1.25, failure_chance)
+            minor_damage_chance = minor_damage_base * np.where(aggressive, 1.5, 1.0) * high_wear_factor
+            new_damage = live & ~has_damage & (u[0] < minor_damage_chance)
+            has_damage |= new_damage
+            damage_factor = np.where(new_damage, 1.005 + 0.015 * u[1], damage_factor)
+
+        failed = live & (u[2] < failure_chance)
+        failure_reason = np.where(total_penalty > 0, np.where(u[3] < engine_share, DNF_ENGINE, DNF_BRAKES), DNF_MECHANICAL)
+        dnf_reason = np.where(failed, failure_reason, dnf_reason)
+        is_dnf |= failed
+        live &= ~failed
+
+        error_chance = 0.001 * (1.5 - drivers['consistency']) + w_error
+        if enhanced_simulation:
+            error_chance = (error_chance + w_variability * 0.0005) * high_wear_factor
+            error_chance = np.where(aggressive, error_chance * 1.1, error_chance)
+        errored = live & (rng.random(shape) < error_chance)
+        if enhanced_simulation:
+            morale = np.where(errored, np.maximum(0.8, morale - 0.1), morale)
+        incident_roll = u[4]
+        crashed = errored & (incident_roll < 0.05)
+        big_error = errored & (incident_roll >= 0.05) & (incident_roll < 0.2)
+        small_error = errored & (incident_roll >= 0.2)
+        total_time += np.where(big_error, 5.0 + 5.0 * u[5], 0.0) + np.where(small_error, 1.0 + 2.0 * u[5], 0.0)
+        dnf_reason = np.where(crashed, DNF_CRASH, dnf_reason)
+        is_dnf |= crashed
+        live &= ~crashed
+
+        # Pit stop decisions (decide_pit_stop)
+        pit = np.zeros(shape, dtype=bool)
+        if safety_car.any() and 5 < lap < total_laps - 5:
+            pit |= safety_car[:, None] & ((safety_car_opt & (tire_wear > 0.2)) | ((acumen > 0.75) & (tire_wear > 0.4)))
+        pit |= tire_wear > 0.95
+        if enhanced_simulation:
+            on_rain_tires = (compound == INTERMEDIATE) | (compound == WET)
+            heavy = weathers['heavy_rain'][weather_idx][:, None]
+            light = weathers['light_rain'][weather_idx][:, None]
+            dry_running = weathers['dry_running'][weather_idx][:, None]
+            wrong_tires = (w_rec != compound) & (
+                (heavy & (compound != WET)) |
+                (light & ~on_rain_tires & ((acumen > 0.6) | weather_dependent)) |
+                (dry_running & on_rain_tires)
+            )
+            pit |= wrong_tires
+        if lap <= total_laps - 5:
+            stint_length = total_laps / (num_stops + 1)
+            target_lap = np.floor(stint_length * (pit_stops + 1)).astype(np.int64)
+            in_window = (pit_stops < num_stops) & (lap >= np.maximum(1, target_lap - 5)) & (lap <= np.minimum(total_laps, target_lap + 5))
+            pit |= in_window & ((tire_wear > 0.5) | ((laps_on_tires > stint_length * 0.8) & (tire_wear > 0.3)))
+            if enhanced_simulation:
+                pit |= (compound == SOFT) & (tire_wear > 0.65) & aggressive_push
+                pit |= (tire_wear > 0.75) & (acumen > 0.5)
+        pit &= live
+
+        # Pit stops (simulate_pit_stop)
+        if pit.any():
+            stationary_time = np.broadcast_to(2.8 - drivers['pit_speed'] * 0.8, shape)
+            if enhanced_simulation:
+                u = rng.random((2,) + shape)
+                pit_error = u[0] < 0.03 * (1 - drivers['pit_speed'])
+                stationary_time = stationary_time + np.where(pit_error, 1.5 + 3.5 * u[1], -0.3 + 0.6 * u[1])
+            pit_stop_time = 18.0 + stationary_time
+            total_time += np.where(pit, np.where(safety_car[:, None], pit_stop_time * 0.5, pit_stop_time), 0.0)
+            pit_stops += pit
+            tire_wear = np.where(pit, 0.0, tire_wear)
+            laps_on_tires = np.where(pit, 0, laps_on_tires)
+            has_graining &= ~pit
+
+            # Tire wear has just been reset, so the compound depends on the laps remaining and the strategy.
+            remaining_laps = total_laps - laps_completed
+            strategy_choice = _weighted_choice(rng, strategies['tire_preference'][strategy], [SOFT, MEDIUM, HARD])
+            u = rng.random(shape)
+            dry_choice = np.where(remaining_laps < 10, np.where(u < 0.7, SOFT, MEDIUM),
+                                  np.where(remaining_laps > 30, np.where(u < 0.6, MEDIUM, HARD), strategy_choice))
+            new_compound = np.where(w_rec >= 0, w_rec, dry_choice)
+            compound = np.where(pit, new_compound, compound)
+
+        # Lap times (calculate_lap_time)
+        ers_boost = ERS_POWER_BOOST[ers_mode] if enhanced_simulation else 0.0
+        effective_hp = (drivers['engine_hp'] + ers_boost) * w_hp
+        drs_bonus = np.where(drs_active, 0.15, 0.0) if enhanced_simulation else 0.0
+        effective_downforce = drivers['aero_df'] * w_downforce
+        if enhanced_simulation:
+            effective_downforce = np.where(dirty_air, effective_downforce * 0.90, effective_downforce)
+        straight_line = (effective_hp * 0.7) + (drivers['aero_dr'] * 0.3) + drs_bonus
+        perf_score = ((straight_line * speed_weight) + (effective_downforce * cornering_weight) + (drivers['brakes_sp'] * braking_weight)) / total_weight
+        lap_time = base_time / (perf_score + 0.5) * (1.0 - (drivers['skill'] * 0.05))
+        mitigation = (1.0 - w_grip) * (drivers['wet_weather'] * 0.5)
+        effective_grip = w_grip + mitigation + grip_bonus[:, None]
+        if enhanced_simulation:
+            adaptability_modifier = weathers['adaptability'][weather_idx][:, None]
+            lap_time = np.where(weather_changed[:, None], lap_time * (1.0 - (adaptability * adaptability_modifier * 0.1)), lap_time)
+        lap_time = lap_time / effective_grip
+
+        wear_this_lap = (base_wear + w_tire_wear) / 100.0
+        if enhanced_simulation:
+            wear_multiplier = np.select([compound == SOFT, compound == HARD, compound == WET], [1.2, 0.8, 0.7], 1.0)
+            time_multiplier = np.select(
+                [compound == SOFT, compound == HARD, compound == INTERMEDIATE, compound == WET],
+                [0.98, 1.02, np.where(w_rec == INTERMEDIATE, 0.95, 1.05), np.where(w_rec == WET, 0.90, 1.10)],
+                1.0)
+            wear_this_lap = wear_this_lap * wear_multiplier
+            lap_time = lap_time * time_multiplier
+        tire_wear = np.where(live, np.minimum(1.0, tire_wear + wear_this_lap), tire_wear)
+        laps_on_tires += live
+
+        # Wet-weather wear modifiers can push wear below zero; the fractional power is only selected above 0.5.
+        with np.errstate(invalid='ignore'):
+            lap_time = lap_time + np.select([tire_wear > 0.8, tire_wear > 0.5], [(tire_wear ** 3) * 10.0, (tire_wear ** 2.5) * 7.5], (tire_wear ** 2) * 5.0)
+
+        u = rng.random((5,) + shape)
+        if enhanced_simulation:
+            temp = weathers['track_temp'][weather_idx][:, None]
+            graining_chance = np.where(
+                ((compound == SOFT) | (compound == MEDIUM)) & (tire_wear > 0.4) & (laps_on_tires > 8),
+                (tire_wear - 0.4) * 0.05 + (1.0 - drivers['tire_management']) * 0.02 + temp / 1000.0,
+                0.0)
+            new_graining = live & ~has_graining & (u[0] < graining_chance)
+            lap_time = lap_time + np.where(new_graining, 1.0 + 2.0 * u[1], 0.0)
+            has_graining |= new_graining
+        lap_time = lap_time + np.where(has_graining, 1.5, 0.0)
+
+        deviation_range = (1.0 - drivers['consistency']) * 0.5
+        lap_time = lap_time + (2.0 * u[2] - 1.0) * deviation_range
+        lap_time = lap_time - (acumen - 0.7) * 0.1
+        lap_time = np.where(has_damage, lap_time * damage_factor, lap_time)
+
+        if enhanced_simulation:
+            jitter = u[3] < w_variability * 0.5
+            lap_time = np.where(jitter, lap_time * (0.995 + 0.01 * u[4]), lap_time)
+            fuel = np.where(live, np.maximum(0.0, fuel - fuel_burn_rate * ERS_FUEL_MULTIPLIER[ers_mode]), fuel)
+            lap_time = lap_time + (fuel / 10.0) * 0.3
+            lap_time = lap_time * np.where(morale > 1.0, 1.0 - np.minimum(0.02, (morale - 1.0) * 0.01),
+                                           np.where(morale < 1.0, 1.0 + np.minimum(0.02, (1.0 - morale) * 0.01), 1.0))
+        lap_time = np.maximum(base_time * 0.8, lap_time)
+
+        if safety_car.any():
+            sc_lap_time = base_time * np.where(gap_front > 1.0, 1.2, 1.4) + rng.uniform(-0.5, 0.5, size=shape)
+            lap_time = np.where(safety_car[:, None], sc_lap_time, lap_time)
+
+        total_time += np.where(live, lap_time, 0.0)
+        laps_completed += live
+        safety_car_laps = np.where(safety_car, safety_car_laps - 1, safety_car_laps)
+
+        # Team orders (check_for_team_orders)
+        _, positions, _, _ = _running_order(total_time, is_dnf)
+        pairs = drivers['teammate_pairs']
+        if enhanced_simulation and len(pairs) and 5 <= lap <= total_laps - 5:
+            first, second = pairs[:, 0][None, :], pairs[:, 1][None, :]
+            first_ahead = positions[:, pairs[:, 0]] < positions[:, pairs[:, 1]]
+            front = np.where(first_ahead, first, second)
+            rear = np.where(first_ahead, second, first)
+            time_diff = total_time[sims, rear] - total_time[sims, front]
+            eligible = live[sims, front] & live[sims, rear] & ~safety_car[:, None] & (time_diff <= 2.0)
+            rear_is_faster = (tire_wear[sims, rear] < tire_wear[sims, front] - 0.2) | \
+                             ((compound[sims, rear] == SOFT) & (compound[sims, front] != SOFT))
+            u = rng.random((2,) + front.shape)
+            faster_call = eligible & rear_is_faster & (acumen[sims, rear] > 0.7) & (u[0] < 0.8)
+            strategy_call = eligible & ~faster_call & (team_order_stops[sims, front] != team_order_stops[sims, rear]) & \
+                            (time_diff < 1.0) & (acumen[sims, rear] > 0.6) & (u[1] < 0.5)
+            swap = faster_call | strategy_call
+            total_time[sims, front] += np.where(swap, time_diff + 0.1, 0.0)
+
+        # Overtakes (check_for_overtake): scanning from the back, the first successful move is the only one this lap.
+        order, _, _, _ = _running_order(total_time, is_dnf)
+        front, rear = order[:, :-1], order[:, 1:]
+        time_diff = total_time[sims, rear] - total_time[sims, front]
+        candidate = live[sims, front] & live[sims, rear] & (time_diff > 0) & (time_diff < 1.2)
+        overtake_prob = 0.3 + (drivers['car_overall'][rear] - drivers['car_overall'][front]) * 0.2 + \
+                        (drivers['overtaking'][rear] - drivers['defending'][front]) * 0.3 - track_difficulty
+        if enhanced_simulation:
+            front_wear, rear_wear = tire_wear[sims, front], tire_wear[sims, rear]
+            overtake_prob = overtake_prob - np.where(positions[sims, front] <= 5, 0.05, 0.0)
+            overtake_prob = overtake_prob + (front_wear - rear_wear) * 0.15
+            if slipstream_track:
+                overtake_prob = overtake_prob + np.where(time_diff < 0.8, 0.15, np.where(time_diff < 1.0, 0.05, 0.0))
+            overtake_prob = overtake_prob + (drivers['consistency'][rear] - 0.5) * 0.05
+            overtake_prob = overtake_prob - np.where((drivers['defending'][front] > drivers['overtaking'][rear]) & (front_wear < 0.7), 0.03, 0.0)
+            overtake_prob = overtake_prob + np.where(aggressive[sims, rear], 0.02, 0.0)
+            overtake_prob = overtake_prob + np.where(ers_mode[sims, rear] == OVERTAKE, 0.15, 0.0)
+            overtake_prob = overtake_prob - np.where(ers_mode[sims, front] == DEFEND, 0.10, 0.0)
+            overtake_prob = overtake_prob + np.where(drs_active[sims, rear], 0.25, 0.0)
+            overtake_prob = overtake_prob + (morale[sims, rear] - 1.0) * 0.1 - (morale[sims, front] - 1.0) * 0.1
+        success = candidate & (rng.random(candidate.shape) < np.clip(overtake_prob, 0.0, 1.0))
+        passed = success.any(axis=1)
+        if passed.any():
+            slot = success.shape[1] - 1 - np.argmax(success[:, ::-1], axis=1)
+            rows = np.nonzero(passed)[0]
+            passed_front, passing_rear = front[rows, slot[rows]], rear[rows, slot[rows]]
+            total_time[rows, passed_front] = total_time[rows, passing_rear] + rng.uniform(0.1, 0.3, size=len(rows))
+            if enhanced_simulation:
+                morale[rows, passing_rear] = np.minimum(1.2, morale[rows, passing_rear] + 0.05)
+                morale[rows, passed_front] = np.maximum(0.8, morale[rows, passed_front] - 0.05)
+
+    # Final classification: finishers by time, then retirements by laps completed and time.
+    final_order = np.lexsort((total_time, np.where(is_dnf, -laps_completed, 0), is_dnf), axis=1)
+    positions = np.empty_like(final_order)
+    np.put_along_axis(positions, final_order, np.arange(1, n_drivers + 1)[None, :].repeat(n_sims, axis=0), axis=1)
+
+    return BatchRaceResult(
+        [e.driver_name for e in race_entries_template], [e.team_name for e in race_entries_template],
+        positions, grid_positions, is_dnf, dnf_reason, total_time, laps_completed, pit_stops, strategy, compound
+    )
+
+def batch_rng(seed, first_sim):
+    """The Generator of the batch starting at sim first_sim of a run seeded with seed (an int or a list of ints)."""
+    if first_sim == 0:
+        return np.random.default_rng(seed)
+    return np.random.default_rng([*np.atleast_1d(seed).tolist(), first_sim])
+
+def run_batch_monte_carlo(num_simulations, circuit, weather, race_entries_template, enhanced_simulation=False, seed=None, batch_size=BATCH_SIZE, accumulator=None, verbosity='progress', progress=None, start_sim=0, results_store=None, run_id=None, checkpoint=None):
+    """
+    Batch-engine counterpart of run_monte_carlo_simulation. Runs the races in batches of
+    batch_size and returns the per-race records consumed by aggregate_results, or, when a
+    RaceResultAccumulator is given, adds each batch to it and returns the accumulator.
+    verbosity and progress work as in run_monte_carlo_simulation; progress advances per batch.
+    Pass a results_store.RaceResultStore and run_id to store every race, numbered from start_sim.
+    Each batch draws from its own stream, derived from seed and the number of its first sim
+    (see batch_rng), so starting at a multiple of batch_size continues a run with the same seed.
+    checkpoint works as in run_monte_carlo_simulation, called after every batch.
+    """
+    owns_progress = progress is None
+    if owns_progress:
+        progress = ProgressReporter(num_simulations, verbosity=verbosity)
+    progress.set_label(f"{weather['name']} at {circuit['name']}")
+    progress.write(f"\n--- Running {num_simulations} batch simulations for {weather['name']} conditions at {circuit['name']} ---")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    all_simulation_results = []
+    try:
+        for start in range(0, num_simulations, batch_size):
+            rng = batch_rng(seed, start_sim + start)
+            batch = simulate_race_batch(circuit, weather, race_entries_template, min(batch_size, num_simulations - start), enhanced_simulation, rng)
+            if accumulator is not None:
+                accumulator.add_batch(batch)
+            else:
+                all_simulation_results.extend(batch.to_simulation_results())
+            if results_store is not None:
+                results_store.add_batch(run_id, circuit['name'], weather['name'], start_sim + start, batch)
+            progress.update(batch.num_simulations)
+            if checkpoint is not None:
+                checkpoint(start + batch.num_simulations)
+    finally:
+        if owns_progress:
+            progress.close()
+    return accumulator if accumulator is not None else all_simulation_results
@@ -0,0 +1,274 @@
+"""
+Benchmark suite for the simulation hot paths.
+
+    python benchmark.py                                  # full suite, results printed
+    python benchmark.py --quick --output bench.json      # smaller workloads, saved as JSON
+    python benchmark.py --baseline bench.json --threshold 10
+
+Micro benchmarks time single engine functions (us/call). Macro benchmarks time whole races
+(races/s, plus us/lap) and Monte Carlo runs at several sim counts; end-to-end benchmarks run
+a weather sweep with and without output files. With --baseline, every benchmark present in
+both runs is compared and the exit status is 1 if any got slower by more than --threshold
+percent.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from circuit_data import CIRCUIT_DATA
+from ers_management import manage_ers
+from race_logger import NullRaceLogger
+from random_pool import ENGINE_RNG
+from race_sim_adv import (
+    load_race_field, prepare_weather, create_sim_entries, arm_sim_entries, calculate_lap_time, decide_pit_stop,
+    check_for_overtake, simulate_event, simulate_race, aggregate_results, run_single_simulation,
+    run_monte_carlo_simulation, run_weather_sweep, LAP_DRAWS_PER_CAR
+)
+
+BENCHMARK_CIRCUIT = CIRCUIT_DATA[0]
+BENCHMARK_WEATHER = 'Dry'
+
+class BenchmarkResult:
+    """One benchmark's measurement. value is in unit; higher_is_better says which way is faster."""
+    def __init__(self, name, value, unit, higher_is_better, samples, extra=None):
+        self.name = name
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.samples = samples
+        self.extra = extra or {}
+
+    def as_dict(self):
+        return {
+            'value': self.value, 'unit': self.unit, 'higher_is_better': self.higher_is_better,
+            'samples': self.samples, **self.extra
+        }
+
+def _best_time(fn, repeats, setup=None):
+    # Runs fn repeats times (engine output silenced) and returns all wall times, best first.
+    # With setup, fn(setup()) is timed and setup itself is not.
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            args = (setup(),) if setup is not None else ()
+            start = time.perf_counter()
+            fn(*args)
+            times.append(time.perf_counter() - start)
+    return sorted(times)
+
+def _armed_entries(race_entries_template, weather, enhanced_simulation=True, seed=0, draws=0):
+    ENGINE_RNG.seed(seed)
+    entries = arm_sim_entries(create_sim_entries(race_entries_template), BENCHMARK_CIRCUIT, weather, enhanced_simulation)
+    # Buffers the random draws the timed calls will make (see RandomPool.reserve).
+    ENGINE_RNG.reserve(draws)
+    for i, entry in enumerate(entries):
+        entry.entry_index = i
+    return entries
+
+def micro_benchmark(name, race_entries_template, call, calls, repeats):
+    """Times calls calls of call(entries, i) on freshly armed entries; reports us/call."""
+    weather = prepare_weather(BENCHMARK_WEATHER, True)
+    def run(entries):
+        for i in range(calls):
+            call(entries, i, weather)
+    times = _best_time(run, repeats, setup=lambda: _armed_entries(race_entries_template, weather, draws=calls * LAP_DRAWS_PER_CAR))
+    per_call = [t / calls * 1e6 for t in times]
+    return BenchmarkResult(f"micro.{name}", per_call[0], 'us/call', False, per_call)
+
+def _lap_time_call(entries, i, weather):
+    entry = entries[i % len(entries)]
+    if entry.tire_wear > 0.9:
+        entry.tire_wear = 0.0
+    calculate_lap_time(entry, BENCHMARK_CIRCUIT, weather, True, False, 0.005, 0.0)
+
+def _pit_stop_call(entries, i, weather):
+    entry = entries[i % len(entries)]
+    entry.tire_wear = (i % 100) / 100.0
+    decide_pit_stop(entry, BENCHMARK_CIRCUIT, 10 + i % 40, i % 7 == 0, True, BENCHMARK_WEATHER)
+
+def _overtake_call(entries, i, weather):
+    check_for_overtake(entries[i % len(entries)], entries[(i + 1) % len(entries)], BENCHMARK_CIRCUIT, 0.5, True)
+
+def _ers_call(entries, i, weather):
+    manage_ers(entries[i % len(entries)], 10 + i % 40, (i % 10) / 10.0, (i % 13) / 10.0)
+
+_null_logger = NullRaceLogger()
+
+def _event_call(entries, i, weather):
+    entry = entries[i % len(entries)]
+    simulate_event(entry, 10 + i % 40, _null_logger, weather, True)
+    entry.is_dnf = False
+
+def race_benchmark(race_entries_template, enhanced_simulation, races, repeats):
+    """Times simulate_race on re-armed entries; reports races/s, plus us/lap."""
+    weather = prepare_weather(BENCHMARK_WEATHER, enhanced_simulation)
+    entries = create_sim_entries(race_entries_template)
+    def run():
+        ENGINE_RNG.seed(1)
+        for _ in range(races):
+            arm_sim_entries(entries, BENCHMARK_CIRCUIT, weather, enhanced_simulation)
+            simulate_race(BENCHMARK_CIRCUIT, weather, entries, enhanced_simulation, replay_level='none', logger=NullRaceLogger())
+    times = _best_time(run, repeats)
+    races_per_s = [races / t for t in times]
+    us_per_lap = times[0] / (races * BENCHMARK_CIRCUIT['laps']) * 1e6
+    mode = 'enhanced' if enhanced_simulation else 'basic'
+    return BenchmarkResult(f"macro.simulate_race.{mode}", races_per_s[0], 'races/s', True, races_per_s, {'us_per_lap': us_per_lap})
+
+def monte_carlo_benchmark(race_entries_template, num_simulations, repeats):
+    """Times run_monte_carlo_simulation without file output; reports races/s."""
+    weather = prepare_weather(BENCHMARK_WEATHER, True)
+    def run():
+        run_monte_carlo_simulation(num_simulations, BENCHMARK_CIRCUIT, weather, race_entries_template, True, seed=1, replay_level='none', verbosity='quiet')
+    times = _best_time(run, repeats)
+    races_per_s = [num_simulations / t for t in times]
+    return BenchmarkResult(f"macro.monte_carlo.{num_simulations}", races_per_s[0], 'races/s', True, races_per_s)
+
+def aggregate_benchmark(race_entries_template, valid_drivers, races, repeats):
+    """Times aggregate_results over pre-simulated race records; reports us/race."""
+    weather = prepare_weather(BENCHMARK_WEATHER, False)
+    entries = create_sim_entries(race_entries_template)
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = [
+            [e.as_record() for e in run_single_simulation(n, BENCHMARK_CIRCUIT, weather, entries, False, 1, 'none', False)[0]]
+            for n in range(min(races, 50))
+        ]
+    records = (records * (races // len(records) + 1))[:races]
+    times = _best_time(lambda: aggregate_results(records, valid_drivers), repeats)
+    per_race = [t / races * 1e6 for t in times]
+    return BenchmarkResult("micro.aggregate_results", per_race[0], 'us/race', False, per_race)
+
+def end_to_end_benchmark(race_entries_template, valid_drivers, total_simulations, with_outputs, repeats):
+    """Times a full weather sweep at one circuit, optionally writing replays, race CSVs and logs."""
+    def run():
+        with tempfile.TemporaryDirectory() as output_dir:
+            run_weather_sweep(
+                total_simulations, BENCHMARK_CIRCUIT, race_entries_template, valid_drivers,
+                enhanced_simulation=True, race_results_output_dir=output_dir, save_logs=with_outputs,
+                save_individual_races=with_outputs, seed=1, replay_level='full' if with_outputs else 'none',
+                verbosity='quiet'
+            )
+    times = _best_time(run, repeats)
+    races_per_s = [total_simulations / t for t in times]
+    name = 'with_outputs' if with_outputs else 'no_outputs'
+    return BenchmarkResult(f"e2e.{name}", races_per_s[0], 'races/s', True, races_per_s)
+
+def run_suite(quick=False, only=None):
+    """Runs the benchmarks (those whose name contains any of only, if given) and returns their results."""
+    race_field = load_race_field(os.path.dirname(os.path.abspath(__file__)))
+    if race_field is None:
+        raise IOError("Could not load the team, driver and car data CSVs.")
+    valid_drivers, race_entries_template = race_field
+    scale = 0.2 if quick else 1.0
+    repeats = 3 if quick else 5
+    calls = int(20000 * scale)
+    races = max(2, int(20 * scale))
+
+    benchmarks = [
+        ('micro.calculate_lap_time', lambda: micro_benchmark('calculate_lap_time', race_entries_template, _lap_time_call, calls, repeats)),
+        ('micro.decide_pit_stop', lambda: micro_benchmark('decide_pit_stop', race_entries_template, _pit_stop_call, calls, repeats)),
+        ('micro.check_for_overtake', lambda: micro_benchmark('check_for_overtake', race_entries_template, _overtake_call, calls, repeats)),
+        ('micro.manage_ers', lambda: micro_benchmark('manage_ers', race_entries_template, _ers_call, calls, repeats)),
+        ('micro.simulate_event', lambda: micro_benchmark('simulate_event', race_entries_template, _event_call, calls, repeats)),
+        ('micro.aggregate_results', lambda: aggregate_benchmark(race_entries_template, valid_drivers, int(2000 * scale), repeats)),
+        ('macro.simulate_race.basic', lambda: race_benchmark(race_entries_template, False, races, repeats)),
+        ('macro.simulate_race.enhanced', lambda: race_benchmark(race_entries_template, True, races, repeats)),
+    ]
+    for num_simulations in ((10, 50) if quick else (10, 100, 500)):
+        benchmarks.append((f'macro.monte_carlo.{num_simulations}', lambda n=num_simulations: monte_carlo_benchmark(race_entries_template, n, 1 if n >= 100 else repeats)))
+    e2e_sims = 25 if quick else 100
+    benchmarks.append(('e2e.no_outputs', lambda: end_to_end_benchmark(race_entries_template, valid_drivers, e2e_sims, False, 1 if not quick else 2)))
+    benchmarks.append(('e2e.with_outputs', lambda: end_to_end_benchmark(race_entries_template, valid_drivers, e2e_sims, True, 1 if not quick else 2)))
+
+    results = []
+    for name, benchmark in benchmarks:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        result = benchmark()
+        extra = ''.join(f"  ({value:.2f} {key.replace('_per_', '/')})" for key, value in result.extra.items())
+        print(f"{result.name:<32} {result.value:>12.2f} {result.unit}{extra}")
+        results.append(result)
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def results_to_json(results, quick=False):
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': quick,
+        },
+        'benchmarks': {result.name: result.as_dict() for result in results},
+    }
+
+def compare_to_baseline(current, baseline, threshold):
+    """
+    Compares two benchmark JSON documents. Returns (rows, regressions): rows holds
+    (name, baseline value, current value, change %) for every shared benchmark, where a
+    positive change is always an improvement; regressions lists names slower by more than
+    threshold percent.
+    """
+    rows, regressions = [], []
+    for name, result in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None or base['unit'] != result['unit'] or not base['value']:
+            continue
+        ratio = result['value'] / base['value']
+        change = (ratio - 1.0) * 100 if result['higher_is_better'] else (1.0 / ratio - 1.0) * 100
+        rows.append((name, base['value'], result['value'], change))
+        if change < -threshold:
+            regressions.append(name)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the race simulation engine.")
+    parser.add_argument('--quick', action='store_true', help="smaller workloads, for a fast check")
+    parser.add_argument('--only', action='append', help="run only benchmarks whose name contains this (repeatable)")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against a previous JSON result file")
+    parser.add_argument('--threshold', type=float, default=10.0, help="regression threshold in percent (default 10)")
+    args = parser.parse_args(argv)
+
+    print(f"--- Benchmarking ({'quick' if args.quick else 'full'} suite) ---")
+    results = run_suite(args.quick, args.only)
+    current = results_to_json(results, args.quick)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare_to_baseline(current, baseline, args.threshold)
+        print(f"\n--- Comparison with {args.baseline} (commit {baseline['meta'].get('commit')}) ---")
+        for name, base_value, value, change in rows:
+            flag = '  REGRESSION' if name in regressions else ''
+            print(f"{name:<32} {base_value:>12.2f} -> {value:>12.2f}  {change:+7.1f}%{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.1f}%.")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.1f}%.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
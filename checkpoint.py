@@ -0,0 +1,77 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from race_sim_adv import RaceResultAccumulator, save_npz_atomic
+from shards import shard_suffix
+
+# Checkpoints of long weather sweeps (see run_weather_sweep), so a killed or preempted run can
+# resume instead of starting again from zero.
+# A checkpoint is one .npz file holding the sweep's accumulated results, the number of sims
+# every weather has completed, and the weather run in progress with its results so far. Both
+# engines seed their random streams from the base seed and the sim number (the scalar engine
+# per sim, the batch engine per batch), so the counts are all the random state there is.
+# A resumed sweep therefore draws exactly the races the uninterrupted run would have drawn,
+# and produces the same aggregated results.
+
+CHECKPOINT_VERSION = 1
+DEFAULT_CHECKPOINT_INTERVAL = 60.0
+
+def sweep_checkpoint_path(output_dir, circuit_name, run_key, shard_index=0, shard_count=1):
+    """Where a sweep of circuit_name (or one shard of it) writing under output_dir keeps its checkpoint; run_key identifies the run's settings."""
+    shard = shard_suffix(shard_index, shard_count) if shard_count > 1 else ''
+    return os.path.join(output_dir, "checkpoints", f"{circuit_name.replace(' ', '')}_{run_key[:16]}{shard}.npz")
+
+class SweepCheckpoint:
+    # Saves a sweep's progress to path at most every interval seconds (see due()).
+    def __init__(self, path, interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._last_save = time.perf_counter()
+
+    def due(self):
+        """True once interval seconds have passed since the last save (or since the sweep started)."""
+        return time.perf_counter() - self._last_save >= self.interval
+
+    def save(self, settings, base_seed, run_id, results_accumulator, weather_sims, current=None):
+        """
+        Writes a checkpoint. weather_sims maps each weather to the sims its finished weather runs
+        cover; current is None between weather runs, or a dict of the run in progress: weather,
+        start_sim, sims_done and accumulator.
+        """
+        meta = {
+            'version': CHECKPOINT_VERSION, 'settings': settings, 'base_seed': base_seed, 'run_id': run_id,
+            'weather_sims': weather_sims, 'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'current': None if current is None else {key: current[key] for key in ('weather', 'start_sim', 'sims_done')},
+        }
+        arrays = results_accumulator.state_arrays('results.')
+        if current is not None:
+            arrays.update(current['accumulator'].state_arrays('current.'))
+        arrays['meta'] = np.array(json.dumps(meta))
+        save_npz_atomic(self.path, arrays)
+        self._last_save = time.perf_counter()
+
+    def load(self):
+        """
+        Returns the saved state as a dict (the arguments of save(), with the accumulators
+        rebuilt), or None when there is no checkpoint.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as arrays:
+            meta = json.loads(str(arrays['meta']))
+            if meta['version'] != CHECKPOINT_VERSION:
+                raise ValueError(f"Checkpoint {self.path} has version {meta['version']}, expected {CHECKPOINT_VERSION}.")
+            meta['results_accumulator'] = RaceResultAccumulator.from_state_arrays(arrays, 'results.')
+            if meta['current'] is not None:
+                meta['current']['accumulator'] = RaceResultAccumulator.from_state_arrays(arrays, 'current.')
+        return meta
+
+    def remove(self):
+        """Deletes the checkpoint, e.g. once the sweep has finished."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,4 +1,4 @@
-import random
+from random_pool import ENGINE_RNG
 
 # Defines the different ERS modes available to a car.
 ERS_MODES = {
@@ -22,25 +22,25 @@ def manage_ers(entry, current_lap, time_to_front, time_to_rear):
     # Only make a new decision if in Standard mode
     if entry.ers_mode['name'] == 'Standard':
         # Recharge battery if it's very low
-        if entry.ers_charge < 0.2 and random.random() < 0.8:
+        if entry.ers_charge < 0.2 and ENGINE_RNG.random() < 0.8:
             entry.ers_mode = ERS_MODES['Charge']
             entry.ers_deployment_lap = current_lap
             return
 
         # High chance to use Overtake mode if very close to car ahead
-        if time_to_front < 0.7 and entry.ers_charge > 0.4 and random.random() < 0.7:
+        if time_to_front < 0.7 and entry.ers_charge > 0.4 and ENGINE_RNG.random() < 0.7:
             entry.ers_mode = ERS_MODES['Overtake']
             entry.ers_deployment_lap = current_lap
             return
             
         # High chance to use Defend mode if car behind is very close
-        if time_to_rear < 0.7 and entry.ers_charge > 0.3 and random.random() < 0.7:
+        if time_to_rear < 0.7 and entry.ers_charge > 0.3 and ENGINE_RNG.random() < 0.7:
             entry.ers_mode = ERS_MODES['Defend']
             entry.ers_deployment_lap = current_lap
             return
 
         # Use Hotlap mode if in clear air to build a gap
-        if time_to_front > 3.0 and time_to_rear > 3.0 and entry.ers_charge > 0.6 and random.random() < 0.1:
+        if time_to_front > 3.0 and time_to_rear > 3.0 and entry.ers_charge > 0.6 and ENGINE_RNG.random() < 0.1:
             entry.ers_mode = ERS_MODES['Hotlap']
             entry.ers_deployment_lap = current_lap
             return
\ No newline at end of file
@@ -0,0 +1,117 @@
+import os
+import csv
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+class AsyncOutputWriter:
+    # Persists finished race artifacts (replays, race CSVs, logs) on background threads,
+    # so the simulation loop never waits on the filesystem.
+    # At most max_pending writes may be queued; submitting more blocks the caller until a
+    # slot frees up (backpressure). flush() or close() guarantee everything is on disk.
+    def __init__(self, max_pending=256, num_threads=2):
+        self._executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix='output-writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._errors = []
+        self._created_dirs = set()
+        self._closed = False
+
+    def _ensure_dir(self, filepath):
+        directory = os.path.dirname(filepath)
+        if directory and directory not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                self._created_dirs.add(directory)
+
+    def _run(self, write_fn, filepath, payload):
+        try:
+            self._ensure_dir(filepath)
+            write_fn(filepath, payload)
+        except Exception as e:
+            with self._lock:
+                self._errors.append((filepath, e))
+        finally:
+            self._slots.release()
+
+    def _submit(self, write_fn, filepath, payload):
+        if self._closed:
+            raise RuntimeError("AsyncOutputWriter is closed.")
+        self._slots.acquire()
+        future = self._executor.submit(self._run, write_fn, filepath, payload)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def write_json(self, filepath, data):
+        """Queues data to be written as JSON."""
+        self._submit(_dump_json, filepath, data)
+
+    def write_csv(self, filepath, dataframe):
+        """Queues a DataFrame to be written as CSV (without the index)."""
+        self._submit(_dump_csv, filepath, dataframe)
+
+    def write_rows(self, filepath, columns, rows):
+        """Queues row tuples to be written as CSV under a header of columns, without pandas."""
+        self._submit(_dump_rows, filepath, (columns, rows))
+
+    def write_lines(self, filepath, lines):
+        """Queues an iterable of text lines; each line is written with a trailing newline."""
+        self._submit(_dump_lines, filepath, lines)
+
+    def flush(self):
+        """Blocks until every queued write has finished. Raises the first write error, if any."""
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+            if not pending:
+                break
+            done, _ = wait(pending)
+            with self._lock:
+                self._pending.difference_update(done)
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            filepath, error = errors[0]
+            raise IOError(f"Failed to write {len(errors)} output file(s); first failure was '{filepath}': {error}") from error
+
+    def close(self):
+        """Flushes all queued writes and stops the background threads."""
+        if self._closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def _dump_json(filepath, data):
+    with open(filepath, 'w') as f:
+        json.dump(data, f)
+
+def _dump_csv(filepath, dataframe):
+    dataframe.to_csv(filepath, index=False)
+
+def _dump_rows(filepath, payload):
+    columns, rows = payload
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+def _dump_lines(filepath, lines):
+    with open(filepath, 'w') as f:
+        for line in lines:
+            f.write(line + "\n")
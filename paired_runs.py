@@ -0,0 +1,246 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from race_strategy import RACE_STRATEGY_TYPES
+from weather_conditions import WEATHER_CONDITIONS
+from race_sim_adv import CONFIDENCE_Z, RaceEntry, assign_points, create_sim_entries, prepare_weather, run_single_simulation
+from progress import ProgressReporter
+
+# Paired comparisons of two scenarios, e.g. a car before and after an upgrade, or one strategy
+# against another, with common random numbers.
+# Race k of both scenarios runs on the same random stream (sim seeds do not depend on the
+# scenario), so the luck both races share cancels out of their difference and the delta is known
+# far more precisely than from two independent runs of the same size.
+# With antithetic pairing the races come in pairs, on a stream and on its antithetic twin (see
+# RandomPool); each pair's mean counts as one sample, which cancels part of the remaining noise.
+
+# Outcomes compared per driver; probabilities are in %, Points is the average race points.
+COMPARISON_METRICS = ('Points', 'Win', 'Podium', 'Points Finish', 'DNF')
+
+def resolve_strategy_overrides(strategy_overrides):
+    """Maps driver names to RACE_STRATEGY_TYPES entries, given a mapping of driver names to strategy names."""
+    if not strategy_overrides:
+        return {}
+    strategies = {s_type['name'].lower(): s_type for s_type in RACE_STRATEGY_TYPES}
+    resolved = {}
+    for driver_name, strategy_name in strategy_overrides.items():
+        strategy = strategies.get(str(strategy_name).strip().lower())
+        if strategy is None:
+            raise ValueError(f"Unknown strategy '{strategy_name}'. Expected one of {[s['name'] for s in RACE_STRATEGY_TYPES]}.")
+        resolved[driver_name] = strategy
+    return resolved
+
+class Scenario:
+    # One side of a paired comparison: a race field (race entry templates) and optionally the
+    # strategies some drivers always run, as {driver name: strategy name}.
+    def __init__(self, name, race_entries_template, strategy_overrides=None):
+        self.name = name
+        self.race_entries_template = race_entries_template
+        self.strategy_overrides = resolve_strategy_overrides(strategy_overrides)
+
+    def __repr__(self):
+        return f"Scenario('{self.name}', drivers={len(self.race_entries_template)}, strategy_overrides={list(self.strategy_overrides)})"
+
+def apply_car_overrides(race_entries_template, car_overrides):
+    """
+    Returns new race entry templates with some static attributes changed. car_overrides maps
+    team or driver names to {RaceEntryProfile field: value}, e.g.
+    {'McLaren Formula 1': {'car_overall_score': 92.0, 'car_engine_rel_final': 8.0}}.
+    """
+    if not car_overrides:
+        return list(race_entries_template)
+    overrides = {name.strip(): fields for name, fields in car_overrides.items()}
+    matched = set()
+    new_template = []
+    for entry in race_entries_template:
+        profile = entry.profile
+        for name in (profile.team_name.strip(), profile.driver_name.strip()):
+            if name in overrides:
+                matched.add(name)
+                try:
+                    profile = profile._replace(**overrides[name])
+                except ValueError as e:
+                    raise ValueError(f"Invalid override for '{name}': {e}") from None
+        new_template.append(RaceEntry.from_profile(profile, entry.assigned_strategy_type))
+    unmatched = set(overrides) - matched
+    if unmatched:
+        raise ValueError(f"No team or driver named {sorted(unmatched)} in the race field.")
+    return new_template
+
+_worker_entries = None
+
+def _init_paired_worker(template_a, template_b):
+    global _worker_entries
+    _worker_entries = (create_sim_entries(template_a), create_sim_entries(template_b))
+
+def simulate_pairs(entries_a, entries_b, circuit, weather, sim_nums, enhanced_simulation, base_seed, antithetic, strategy_overrides_a, strategy_overrides_b):
+    """
+    Runs sim_nums of both scenarios on common random numbers. With antithetic, sims 2k and 2k + 1
+    run on stream k and its antithetic twin.
+    Returns a (2, n_sims, n_drivers) array of classified positions in entry order, 0 for a DNF.
+    """
+    positions = np.zeros((2, len(sim_nums), len(entries_a)), dtype=np.int64)
+    sides = ((entries_a, strategy_overrides_a), (entries_b, strategy_overrides_b))
+    for row, sim_num in enumerate(sim_nums):
+        stream, twin = (sim_num // 2, sim_num % 2 == 1) if antithetic else (sim_num, False)
+        for side, (entries, strategy_overrides) in enumerate(sides):
+            final_results, _, _ = run_single_simulation(
+                stream, circuit, weather, entries, enhanced_simulation, base_seed,
+                replay_level='none', log_events=False, antithetic=twin, strategy_overrides=strategy_overrides
+            )
+            for entry in final_results:
+                positions[side, row, entry.entry_index] = 0 if entry.is_dnf else entry.current_position
+    return positions
+
+def _run_pairs_task(circuit, weather, sim_nums, enhanced_simulation, base_seed, antithetic, strategy_overrides_a, strategy_overrides_b):
+    return simulate_pairs(*_worker_entries, circuit, weather, sim_nums, enhanced_simulation, base_seed, antithetic, strategy_overrides_a, strategy_overrides_b)
+
+class PairedComparison:
+    """
+    Classified positions (0 for a DNF) of both scenarios, race by race on common random
+    numbers, and the per-driver outcome deltas with their confidence intervals.
+    """
+    def __init__(self, scenario_a, scenario_b, circuit, weathers, positions_a, positions_b, antithetic, seed, enhanced):
+        self.scenario_a = scenario_a
+        self.scenario_b = scenario_b
+        self.circuit = circuit
+        self.weathers = weathers
+        self.positions_a = positions_a
+        self.positions_b = positions_b
+        self.antithetic = antithetic
+        self.seed = seed
+        self.enhanced = enhanced
+        self.output_files = []
+        self.driver_names = [e.driver_name for e in scenario_a.race_entries_template]
+        self.team_names = [e.team_name.strip() for e in scenario_a.race_entries_template]
+        self._points_by_position = np.array([0] + [assign_points(pos) for pos in range(1, len(self.driver_names) + 1)], dtype=np.int64)
+
+    @property
+    def num_races(self):
+        """Races run per scenario."""
+        return self.positions_a.shape[0]
+
+    def _outcomes(self, positions):
+        points = self._points_by_position[positions]
+        return {
+            'Points': points.astype(float),
+            'Win': (positions == 1) * 100.0,
+            'Podium': ((positions >= 1) & (positions <= 3)) * 100.0,
+            'Points Finish': (points > 0) * 100.0,
+            'DNF': (positions == 0) * 100.0,
+        }
+
+    def _samples(self, values):
+        # Antithetic pairs are averaged into one sample each.
+        if self.antithetic:
+            return values.reshape(-1, 2, values.shape[1]).mean(axis=1)
+        return values
+
+    def deltas_dataframe(self):
+        """
+        One row per driver and metric (see COMPARISON_METRICS): both scenarios' means, the
+        delta (B - A) and its 95% CI half-width from the paired samples. 'Independent CI' is the
+        half-width two independent runs of the same size would give, and 'Variance Reduction'
+        how many times more races they would need to match the paired CI.
+        """
+        import pandas as pd
+        outcomes_a = self._outcomes(self.positions_a)
+        outcomes_b = self._outcomes(self.positions_b)
+        n = self.num_races
+        rows = []
+        for metric in COMPARISON_METRICS:
+            a, b = outcomes_a[metric], outcomes_b[metric]
+            deltas = self._samples(b - a)
+            paired_half_width = CONFIDENCE_Z * deltas.std(axis=0, ddof=1) / math.sqrt(deltas.shape[0])
+            independent_half_width = CONFIDENCE_Z * np.sqrt(a.var(axis=0, ddof=1) / n + b.var(axis=0, ddof=1) / n)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                variance_reduction = np.where(paired_half_width > 0, (independent_half_width / paired_half_width) ** 2, np.inf)
+            mean_a, mean_b = a.mean(axis=0), b.mean(axis=0)
+            for i, driver_name in enumerate(self.driver_names):
+                delta = mean_b[i] - mean_a[i]
+                rows.append({
+                    'Driver': driver_name,
+                    'Team': self.team_names[i],
+                    'Metric': metric,
+                    self.scenario_a.name: mean_a[i],
+                    self.scenario_b.name: mean_b[i],
+                    'Delta': delta,
+                    'Delta CI (+/-)': paired_half_width[i],
+                    'Significant': bool(abs(delta) > paired_half_width[i]),
+                    'Independent CI (+/-)': independent_half_width[i],
+                    'Variance Reduction (x)': variance_reduction[i],
+                })
+        return pd.DataFrame(rows)
+
+    def __repr__(self):
+        return (f"PairedComparison('{self.scenario_a.name}' vs '{self.scenario_b.name}', circuit='{self.circuit['name']}', "
+                f"num_races={self.num_races}, antithetic={self.antithetic}, seed={self.seed})")
+
+def run_paired_comparison(num_races, circuit, scenario_a, scenario_b, weather_names=None, enhanced_simulation=False, seed=None, antithetic=False, num_workers=1, verbosity='progress'):
+    """
+    Runs num_races races of each scenario at the circuit on common random numbers, split evenly
+    over the weather conditions (all of them by default), and returns a PairedComparison.
+    Both scenarios must field the same drivers in the same order. With antithetic every
+    weather's race count is rounded up to an even number.
+    verbosity (see progress.VERBOSITY_LEVELS) sets the console output; the progress line counts
+    the races of both scenarios.
+    """
+    names_a = [e.driver_name for e in scenario_a.race_entries_template]
+    names_b = [e.driver_name for e in scenario_b.race_entries_template]
+    if names_a != names_b:
+        raise ValueError("Both scenarios must field the same drivers in the same order.")
+    if weather_names is None:
+        weather_names = list(WEATHER_CONDITIONS)
+    base_seed = seed if seed is not None else random.randrange(2**32)
+
+    num_weathers = len(weather_names)
+    races_per_weather = [num_races // num_weathers + (1 if i < num_races % num_weathers else 0) for i in range(num_weathers)]
+    if antithetic:
+        races_per_weather = [count + count % 2 for count in races_per_weather]
+    progress = ProgressReporter(2 * sum(races_per_weather), verbosity=verbosity)
+    progress.write(f"\n--- Comparing '{scenario_a.name}' with '{scenario_b.name}' over {sum(races_per_weather)} paired races at {circuit['name']} ---")
+
+    tasks = []
+    for weather_name, weather_races in zip(weather_names, races_per_weather):
+        if weather_races == 0: continue
+        weather = prepare_weather(weather_name, enhanced_simulation)
+        # Chunks hold an even number of sims so antithetic pairs never straddle two chunks.
+        chunk_size = max(2, 2 * math.ceil(weather_races / (2 * num_workers * 4)))
+        tasks.extend((weather, range(start, min(start + chunk_size, weather_races))) for start in range(0, weather_races, chunk_size))
+
+    task_args = [(weather, sim_nums, enhanced_simulation, base_seed, antithetic, scenario_a.strategy_overrides, scenario_b.strategy_overrides) for weather, sim_nums in tasks]
+    results = []
+    try:
+        if num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_paired_worker,
+                                     initargs=(scenario_a.race_entries_template, scenario_b.race_entries_template)) as executor:
+                for (weather, sim_nums), positions in zip(tasks, executor.map(_run_pairs_task, *zip(*[(circuit,) + args for args in task_args]))):
+                    results.append(positions)
+                    progress.set_label(f"{weather['name']} at {circuit['name']}")
+                    progress.update(2 * len(sim_nums))
+        else:
+            entries_a = create_sim_entries(scenario_a.race_entries_template)
+            entries_b = create_sim_entries(scenario_b.race_entries_template)
+            for (weather, sim_nums), args in zip(tasks, task_args):
+                progress.set_label(f"{weather['name']} at {circuit['name']}")
+                results.append(simulate_pairs(entries_a, entries_b, circuit, *args))
+                progress.update(2 * len(sim_nums))
+    finally:
+        progress.close()
+
+    positions = np.concatenate(results, axis=1)
+    return PairedComparison(scenario_a, scenario_b, circuit, weather_names, positions[0], positions[1], antithetic, base_seed, enhanced_simulation)
+
+def save_comparison_results(comparison, race_results_output_dir):
+    """Writes a PairedComparison's deltas (see deltas_dataframe) as a CSV. Returns the file path."""
+    comparison_output_dir = os.path.join(race_results_output_dir, "results", "comparisons")
+    os.makedirs(comparison_output_dir, exist_ok=True)
+    scenario_names = f"{comparison.scenario_a.name}_vs_{comparison.scenario_b.name}".replace(' ', '')
+    filename = f"Compare_{comparison.circuit['name'].replace(' ', '')}_{scenario_names}_{comparison.num_races}races.csv"
+    filepath = os.path.join(comparison_output_dir, filename)
+    comparison.deltas_dataframe().to_csv(filepath, index=False)
+    return filepath
@@ -0,0 +1,95 @@
+import sys
+import time
+
+# Console output levels of a run:
+#   'quiet'    - no progress output, only the final results
+#   'progress' - a single updating progress line plus the run's headings (the default)
+#   'verbose'  - every race's result table (and the banner of every simulated race)
+VERBOSITY_LEVELS = ('quiet', 'progress', 'verbose')
+
+def check_verbosity(verbosity):
+    if verbosity not in VERBOSITY_LEVELS:
+        raise ValueError(f"Unknown verbosity '{verbosity}'. Expected one of {VERBOSITY_LEVELS}.")
+    return verbosity
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+
+class ProgressReporter:
+    # Reports how far a run has got: races done out of total, races/sec, ETA and a label such as
+    # the weather or circuit being simulated.
+    # At the 'progress' level it keeps one line on stderr up to date: redrawn in place (at most
+    # every min_interval seconds) on a terminal, or printed as a new line every log_interval
+    # seconds when stderr is redirected, so log files get a few lines per minute rather than
+    # one per race. write() prints a message on stdout without breaking the progress line, and
+    # prints nothing when quiet. At the 'verbose' level the run prints every race itself, so
+    # the progress line is left out.
+    # initial counts races finished before the reporter started (by the run a resumed run
+    # continues); they count towards done but not towards the rate.
+    def __init__(self, total, label='', verbosity='progress', stream=None, min_interval=0.1, log_interval=10.0, initial=0):
+        self.verbosity = check_verbosity(verbosity)
+        self.total = total
+        self.label = label
+        self.initial = initial
+        self.done = initial
+        self.stream = stream if stream is not None else sys.stderr
+        self.is_terminal = self.stream.isatty() if hasattr(self.stream, 'isatty') else False
+        self.interval = min_interval if self.is_terminal else log_interval
+        self.started = time.perf_counter()
+        self._last_draw = self.started
+        self._line_width = 0
+        self.enabled = verbosity == 'progress'
+
+    def set_label(self, label):
+        self.label = label
+
+    def update(self, n=1):
+        """Counts n more finished races and redraws the progress line when it is due."""
+        self.done += n
+        if self.enabled:
+            now = time.perf_counter()
+            if now - self._last_draw >= self.interval:
+                self._last_draw = now
+                self._draw(now)
+
+    def status_line(self, now=None):
+        elapsed = (now if now is not None else time.perf_counter()) - self.started
+        rate = (self.done - self.initial) / elapsed if elapsed > 0 else 0.0
+        line = f"{self.label}: {self.done}/{self.total} races, {rate:.1f} races/s" if self.label else f"{self.done}/{self.total} races, {rate:.1f} races/s"
+        if rate > 0 and self.total > self.done:
+            line += f", ETA {format_duration((self.total - self.done) / rate)}"
+        return line
+
+    def _draw(self, now):
+        line = self.status_line(now)
+        if self.is_terminal:
+            self.stream.write('\r' + line.ljust(self._line_width))
+            self._line_width = len(line)
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def _clear(self):
+        if self._line_width:
+            self.stream.write('\r' + ' ' * self._line_width + '\r')
+            self.stream.flush()
+            self._line_width = 0
+
+    def write(self, message):
+        """Prints a message (e.g. a heading) unless quiet, keeping the progress line below it."""
+        if self.verbosity == 'quiet':
+            return
+        self._clear()
+        print(message)
+
+    def close(self):
+        """Prints the final progress line: races run, total time and average rate."""
+        if self.enabled:
+            self._clear()
+            elapsed = time.perf_counter() - self.started
+            races_run = self.done - self.initial
+            rate = races_run / elapsed if elapsed > 0 else 0.0
+            self.stream.write(f"{races_run} races in {format_duration(elapsed)} ({rate:.1f} races/s)\n")
+            self.stream.flush()
@@ -1,40 +1,168 @@
+# Event codes. Events are recorded as compact tuples and only turned into text when rendered:
+#   (code, lap, driver_index, other_driver_index, position, value, detail)
+# Driver indices refer to the roster bound at the start of the race (see bind_roster).
+OVERTAKE, PIT_STOP, PIT_ERROR, DNF, SAFETY_CAR, SAFETY_CAR_ENDS, WEATHER, TEAM_ORDER, BLUE_FLAG = range(9)
+
+EVENT_TYPES = {
+    OVERTAKE: 'Overtake',
+    PIT_STOP: 'Pit Stop',
+    PIT_ERROR: 'Pit Stop Error',
+    DNF: 'DNF',
+    SAFETY_CAR: 'Safety Car',
+    SAFETY_CAR_ENDS: 'Safety Car',
+    WEATHER: 'Weather',
+    TEAM_ORDER: 'Team Order',
+    BLUE_FLAG: 'Blue Flag',
+}
+
 class RaceLogger:
-    # A simple class to handle logging of race events.
-    def __init__(self):
-        self.logs = []
+    # Records race events as compact tuples. Formatting happens only when the text is
+    # actually read (logs, iteration or format_event), and subscribers receive the raw
+    # event tuples as they happen, e.g. to collect metrics.
+    def __init__(self, record=True):
+        self.record = record
+        self.events = []
+        self.roster = []
+        self._subscribers = []
+
+    def bind_roster(self, entries):
+        # Maps driver indices to names; entries must carry their entry_index.
+        self.roster = [(entry.driver_name, entry.team_name) for entry in entries]
+
+    def subscribe(self, callback):
+        # callback(event) is called with every event tuple as it is logged.
+        self._subscribers.append(callback)
+
+    def _emit(self, event):
+        if self.record:
+            self.events.append(event)
+        for callback in self._subscribers:
+            callback(event)
 
     def log(self, lap, event_type, message):
-        # Generic log method to append a new log entry.
-        self.logs.append({'lap': lap, 'type': event_type, 'message': message})
+        # Generic log method for free-form messages; event_type is the rendered type label.
+        self._emit((None, lap, -1, -1, 0, event_type, message))
 
     def log_overtake(self, lap, overtaking_driver, overtaken_driver):
         # Logs a successful overtake.
-        self.log(lap, 'Overtake', f"{overtaking_driver.driver_name} has overtaken {overtaken_driver.driver_name} for P{overtaken_driver.current_position}.")
+        self._emit((OVERTAKE, lap, overtaking_driver.entry_index, overtaken_driver.entry_index, overtaken_driver.current_position, None, None))
 
     def log_pit_stop(self, lap, entry, duration, new_tires):
         # Logs a pit stop event.
-        self.log(lap, 'Pit Stop', f"{entry.driver_name} pits from P{entry.current_position}. Stop time: {duration:.2f}s. New tires: {new_tires.capitalize()}.")
+        self._emit((PIT_STOP, lap, entry.entry_index, -1, entry.current_position, duration, new_tires))
 
     def log_pit_error(self, lap, entry, duration):
-        # Logs a pit stop event.
-        self.log(lap, 'Pit Stop Error', f"{entry.driver_name} pits from P{entry.current_position}. Error time: {duration:.2f}s.")
+        # Logs a pit stop error.
+        self._emit((PIT_ERROR, lap, entry.entry_index, -1, entry.current_position, duration, None))
 
     def log_dnf(self, lap, entry):
         # Logs a driver not finishing the race.
-        self.log(lap, 'DNF', f"{entry.driver_name} is out of the race from P{entry.current_position}. Reason: {entry.dnf_reason}.")
+        self._emit((DNF, lap, entry.entry_index, -1, entry.current_position, None, entry.dnf_reason))
 
     def log_safety_car(self, lap, reason="incident"):
         # Logs the deployment of the Safety Car.
-        self.log(lap, 'Safety Car', f"Safety Car deployed due to an {reason}.")
-        
+        self._emit((SAFETY_CAR, lap, -1, -1, 0, None, reason))
+
     def log_safety_car_ends(self, lap):
         # Logs when the Safety Car is coming into the pits.
-        self.log(lap, 'Safety Car', "Safety Car is in this lap. Racing will resume next lap.")
+        self._emit((SAFETY_CAR_ENDS, lap, -1, -1, 0, None, None))
 
     def log_weather_change(self, lap, new_weather):
         # Logs a change in weather conditions.
-        self.log(lap, 'Weather', f"The weather has changed to {new_weather}.")
-        
+        self._emit((WEATHER, lap, -1, -1, 0, None, new_weather))
+
     def log_team_order(self, lap, team_name, front_driver, rear_driver):
         # Logs a team order instruction.
-        self.log(lap, 'Team Order', f"Team {team_name} has instructed {front_driver.driver_name} to let {rear_driver.driver_name} pass.")
\ No newline at end of file
+        self._emit((TEAM_ORDER, lap, front_driver.entry_index, rear_driver.entry_index, 0, None, team_name))
+
+    def log_blue_flag(self, lap, entry):
+        # Logs blue flags shown to a lapped car.
+        self._emit((BLUE_FLAG, lap, entry.entry_index, -1, entry.current_position, None, None))
+
+    def format_event(self, event):
+        # Renders one event tuple as the {'lap', 'type', 'message'} dict used by logs and replays.
+        code, lap, driver, other, position, value, detail = event
+        name = self.roster[driver][0] if driver >= 0 else None
+        if code is None:
+            return {'lap': lap, 'type': value, 'message': detail}
+        if code == OVERTAKE:
+            message = f"{name} has overtaken {self.roster[other][0]} for P{position}."
+        elif code == PIT_STOP:
+            message = f"{name} pits from P{position}. Stop time: {value:.2f}s. New tires: {detail.capitalize()}."
+        elif code == PIT_ERROR:
+            message = f"{name} pits from P{position}. Error time: {value:.2f}s."
+        elif code == DNF:
+            message = f"{name} is out of the race from P{position}. Reason: {detail}."
+        elif code == SAFETY_CAR:
+            message = f"Safety Car deployed due to an {detail}."
+        elif code == SAFETY_CAR_ENDS:
+            message = "Safety Car is in this lap. Racing will resume next lap."
+        elif code == WEATHER:
+            message = f"The weather has changed to {detail}."
+        elif code == TEAM_ORDER:
+            message = f"Team {detail} has instructed {name} to let {self.roster[other][0]} pass."
+        else:
+            message = f"Blue flags for {name}."
+        return {'lap': lap, 'type': EVENT_TYPES[code], 'message': message}
+
+    @property
+    def logs(self):
+        # The recorded events rendered as a list of {'lap', 'type', 'message'} dicts.
+        return [self.format_event(event) for event in self.events]
+
+    def __iter__(self):
+        return (self.format_event(event) for event in self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __getstate__(self):
+        # Subscribers are process-local callbacks; only the recorded race is sent between processes.
+        state = self.__dict__.copy()
+        state['_subscribers'] = []
+        return state
+
+class NullRaceLogger(RaceLogger):
+    # A logger that records nothing. Used when no text log, replay event list or metric
+    # subscriber will consume the race events, so logging costs only a no-op call.
+    def __init__(self):
+        super().__init__(record=False)
+
+    def bind_roster(self, entries):
+        pass
+
+    def subscribe(self, callback):
+        raise TypeError("NullRaceLogger does not deliver events; use RaceLogger(record=False) to only notify subscribers.")
+
+    def _emit(self, event):
+        pass
+
+    def log(self, lap, event_type, message):
+        pass
+
+    def log_overtake(self, lap, overtaking_driver, overtaken_driver):
+        pass
+
+    def log_pit_stop(self, lap, entry, duration, new_tires):
+        pass
+
+    def log_pit_error(self, lap, entry, duration):
+        pass
+
+    def log_dnf(self, lap, entry):
+        pass
+
+    def log_safety_car(self, lap, reason="incident"):
+        pass
+
+    def log_safety_car_ends(self, lap):
+        pass
+
+    def log_weather_change(self, lap, new_weather):
+        pass
+
+    def log_team_order(self, lap, team_name, front_driver, rear_driver):
+        pass
+
+    def log_blue_flag(self, lap, entry):
+        pass
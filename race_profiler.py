@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import time
+
+# Phases recorded by simulate_race ('race.*') and run_monte_carlo_simulation ('run.*').
+# 'run.simulate' is the time spent waiting for each race, so it contains the race phases
+# when races run in this process and worker wait time when they run in a pool.
+RACE_PHASES = (
+    'race.arm', 'race.setup', 'race.safety_car', 'race.weather', 'race.ers', 'race.events',
+    'race.pit_stops', 'race.lap_time', 'race.standings', 'race.team_orders', 'race.overtakes',
+    'race.replay_snapshot', 'race.results'
+)
+RUN_PHASES = ('run.simulate', 'run.result_table', 'run.report', 'run.accumulate', 'run.flush')
+
+class RaceProfiler:
+    # Collects cumulative wall time and call counts per phase, and optionally a timeline of
+    # every phase for a Chrome/Perfetto trace.
+    # The simulation code only calls mark() when a profiler was passed in, so there is no
+    # timing overhead at all when profiling is off. mark(phase, start) closes the phase that
+    # began at start and returns the current time, which starts the next phase.
+    def __init__(self, trace=False, max_trace_events=1000000):
+        self.totals = {}
+        self.calls = {}
+        self.trace = trace
+        self.max_trace_events = max_trace_events
+        self.trace_events = []
+        self.clock = time.perf_counter
+
+    def mark(self, phase, start):
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + (now - start)
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        if self.trace and len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append((phase, start, now - start, os.getpid(), threading.get_ident()))
+        return now
+
+    def merge(self, other):
+        """Adds the phases (and trace events) of another profiler, e.g. one from a worker process."""
+        for phase, total in other.totals.items():
+            self.totals[phase] = self.totals.get(phase, 0.0) + total
+            self.calls[phase] = self.calls.get(phase, 0) + other.calls[phase]
+        if self.trace:
+            room = self.max_trace_events - len(self.trace_events)
+            self.trace_events.extend(other.trace_events[:max(0, room)])
+        return self
+
+    def stats(self):
+        """Returns one (phase, calls, total seconds, mean microseconds, share of its group in %) row per phase."""
+        group_totals = {}
+        for phase, total in self.totals.items():
+            group = phase.split('.', 1)[0]
+            group_totals[group] = group_totals.get(group, 0.0) + total
+        known_order = RACE_PHASES + RUN_PHASES
+        phases = sorted(self.totals, key=lambda p: (known_order.index(p) if p in known_order else len(known_order), p))
+        rows = []
+        for phase in phases:
+            total, calls = self.totals[phase], self.calls[phase]
+            group_total = group_totals[phase.split('.', 1)[0]]
+            rows.append((phase, calls, total, total / calls * 1e6, total / group_total * 100 if group_total else 0.0))
+        return rows
+
+    def format_table(self):
+        lines = [f"{'Phase':<22} {'Calls':>10} {'Total (s)':>11} {'Mean (us)':>11} {'Share':>8}"]
+        for phase, calls, total, mean_us, share in self.stats():
+            lines.append(f"{phase:<22} {calls:>10} {total:>11.3f} {mean_us:>11.2f} {share:>7.1f}%")
+        return "\n".join(lines)
+
+    def print_table(self):
+        print(self.format_table())
+
+    def write_chrome_trace(self, filepath):
+        """Writes the recorded timeline in Chrome trace event format (chrome://tracing, ui.perfetto.dev)."""
+        events = [
+            {'name': phase, 'cat': phase.split('.', 1)[0], 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6, 'pid': pid, 'tid': tid}
+            for phase, start, duration, pid, tid in self.trace_events
+        ]
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filepath, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
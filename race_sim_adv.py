@@ -1,9 +1,12 @@
-import pandas as pd
+import numpy as np
 import random
 import math
-from collections import Counter
+import copy
+from collections import namedtuple
 import os
-import json
+import sys
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 
 # --- 1. Modular Data Imports ---
 from circuit_data import CIRCUIT_DATA
@@ -13,9 +16,15 @@ from weather_transitions import WEATHER_TRANSITIONS
 # NEW: Import new modules for enhanced features
 from ers_management import ERS_MODES, manage_ers 
 from track_evolution import TrackState
+from running_order import RunningOrder
+from race_state import RaceStateIndex
 from team_orders import check_for_team_orders
 # NEW: Import the race logger
-from race_logger import RaceLogger
+from race_logger import RaceLogger, NullRaceLogger
+from output_writer import AsyncOutputWriter
+from race_profiler import RaceProfiler
+from random_pool import ENGINE_RNG
+from progress import ProgressReporter
 
 # --- 2. Data Loading Function ---
 def load_csv_data(filepath):
@@ -23,6 +32,7 @@ def load_csv_data(filepath):
     Loads data from a specified CSV file into a list of dictionaries.
     Handles potential FileNotFoundError and other exceptions.
     """
+    import pandas as pd
     try:
         df = pd.read_csv(filepath)
         df.columns = df.columns.str.strip()
@@ -36,33 +46,79 @@ def load_csv_data(filepath):
         return None
 
 # --- 3. Race Entry Class ---
+# Static driver, team and car attributes. One immutable profile per driver is shared by every
+# entry created for that driver, in every simulation.
+RaceEntryProfile = namedtuple('RaceEntryProfile', [
+    'driver_name', 'team_name', 'driver_skill', 'driver_consistency', 'driver_tire_management',
+    'driver_wet_weather_ability', 'driver_overtaking_skill', 'driver_defending_skill',
+    'team_pit_stop_speed', 'team_strategy_acumen_base', 'strategy_aggressive_acumen',
+    'strategy_balanced_acumen', 'strategy_conservative_acumen', 'car_overall_score',
+    'car_engine_hp_final', 'car_engine_rel_final', 'car_chassis_aero_df_final',
+    'car_chassis_aero_dr_final', 'car_brakes_sp_final', 'car_brakes_dur_final', 'car_tires_wr_final'
+])
+
+_STRATEGY_ACUMEN_KEYS = {s_type['name']: s_type['applies_acumen'] for s_type in RACE_STRATEGY_TYPES}
+_ACUMEN_FIELDS = ('strategy_aggressive_acumen', 'strategy_balanced_acumen', 'strategy_conservative_acumen')
+
 class RaceEntry:
     """
     Represents a single driver and their car in the race.
-    Holds all dynamic and static attributes for a participant.
+    Static attributes come from the shared RaceEntryProfile and are bound once, when the entry
+    is created. The dynamic race state lives in slots and is re-armed between simulations with reset().
     """
+    __slots__ = ('profile',) + RaceEntryProfile._fields + (
+        'initial_position', 'current_position', 'total_race_time_s', 'laps_completed',
+        'is_dnf', 'dnf_reason', 'pit_stops_made', 'tire_wear', 'assigned_strategy_type',
+        'effective_strategy_acumen', 'current_tire_compound', 'laps_on_current_tires',
+        'has_graining', 'has_minor_damage', 'damage_penalty_factor', 'ers_charge', 'ers_mode',
+        'ers_deployment_lap', 'morale', 'fuel_load_kg', 'drs_active', 'in_dirty_air',
+        'current_time_to_front', 'entry_index', 'lap_profile'
+    )
+
     def __init__(self, driver_data, team_data, car_scores, initial_position, assigned_strategy_type):
-        self.driver_name = driver_data['driver_name']
-        self.team_name = driver_data['team_name']
-        self.driver_skill = driver_data['skill']
-        self.driver_consistency = driver_data['consistency']
-        self.driver_tire_management = driver_data['tire_management']
-        self.driver_wet_weather_ability = driver_data['wet_weather_ability']
-        self.driver_overtaking_skill = driver_data['overtaking_skill']
-        self.driver_defending_skill = driver_data['defending_skill']
-        self.team_pit_stop_speed = team_data['team_pit_stop_speed']
-        self.team_strategy_acumen_base = team_data['team_strategy_acumen']
-        self.strategy_aggressive_acumen = team_data['strategy_aggressive_acumen']
-        self.strategy_balanced_acumen = team_data['strategy_balanced_acumen']
-        self.strategy_conservative_acumen = team_data['strategy_conservative_acumen']
-        self.car_overall_score = car_scores['Overall_Car_Score']
-        self.car_engine_hp_final = car_scores['Engine_HP_Final']
-        self.car_engine_rel_final = car_scores['Engine_REL_Final']
-        self.car_chassis_aero_df_final = car_scores['ChassisAero_DF_Final']
-        self.car_chassis_aero_dr_final = car_scores['ChassisAero_DR_Final']
-        self.car_brakes_sp_final = car_scores['Brakes_SP_Final']
-        self.car_brakes_dur_final = car_scores['Brakes_DUR_Final']
-        self.car_tires_wr_final = car_scores['Tires_WR_Final']
+        self.profile = RaceEntryProfile(
+            driver_name=driver_data['driver_name'],
+            team_name=driver_data['team_name'],
+            driver_skill=driver_data['skill'],
+            driver_consistency=driver_data['consistency'],
+            driver_tire_management=driver_data['tire_management'],
+            driver_wet_weather_ability=driver_data['wet_weather_ability'],
+            driver_overtaking_skill=driver_data['overtaking_skill'],
+            driver_defending_skill=driver_data['defending_skill'],
+            team_pit_stop_speed=team_data['team_pit_stop_speed'],
+            team_strategy_acumen_base=team_data['team_strategy_acumen'],
+            strategy_aggressive_acumen=team_data['strategy_aggressive_acumen'],
+            strategy_balanced_acumen=team_data['strategy_balanced_acumen'],
+            strategy_conservative_acumen=team_data['strategy_conservative_acumen'],
+            car_overall_score=car_scores['Overall_Car_Score'],
+            car_engine_hp_final=car_scores['Engine_HP_Final'],
+            car_engine_rel_final=car_scores['Engine_REL_Final'],
+            car_chassis_aero_df_final=car_scores['ChassisAero_DF_Final'],
+            car_chassis_aero_dr_final=car_scores['ChassisAero_DR_Final'],
+            car_brakes_sp_final=car_scores['Brakes_SP_Final'],
+            car_brakes_dur_final=car_scores['Brakes_DUR_Final'],
+            car_tires_wr_final=car_scores['Tires_WR_Final'],
+        )
+        self._bind_profile()
+        self.reset(assigned_strategy_type, initial_position, None)
+
+    @classmethod
+    def from_profile(cls, profile, assigned_strategy_type=None, initial_position=0, tire_compound=None):
+        """Creates an entry that shares an existing profile. Call reset() before racing it."""
+        entry = cls.__new__(cls)
+        entry.profile = profile
+        entry._bind_profile()
+        entry.reset(assigned_strategy_type or RACE_STRATEGY_TYPES[0], initial_position, tire_compound)
+        return entry
+
+    def _bind_profile(self):
+        # Static attributes are read on every lap, so they are bound to slots (plain attribute
+        # reads) rather than looked up through the profile each time.
+        for field, value in zip(RaceEntryProfile._fields, self.profile):
+            setattr(self, field, value)
+
+    def reset(self, assigned_strategy_type, initial_position, tire_compound):
+        """Re-arms the entry for a new race with the given strategy, grid slot and starting tires."""
         self.initial_position = initial_position
         self.current_position = initial_position
         self.total_race_time_s = 0.0
@@ -72,7 +128,7 @@ class RaceEntry:
         self.pit_stops_made = 0
         self.tire_wear = 0.0
         self.assigned_strategy_type = assigned_strategy_type
-        self.current_tire_compound = None
+        self.current_tire_compound = tire_compound
         self.laps_on_current_tires = 0
         self.has_graining = False
         self.has_minor_damage = False
@@ -84,18 +140,19 @@ class RaceEntry:
         self.fuel_load_kg = 110.0
         self.drs_active = False
         self.in_dirty_air = False
+        self.current_time_to_front = float('inf')
+        self.entry_index = -1
+        self.lap_profile = None
 
-        acumen_map = {
-            "strategy_aggressive_acumen": self.strategy_aggressive_acumen,
-            "strategy_balanced_acumen": self.strategy_balanced_acumen,
-            "strategy_conservative_acumen": self.strategy_conservative_acumen
-        }
-        self.effective_strategy_acumen = self.team_strategy_acumen_base
-        found_strategy = next((s_type for s_type in RACE_STRATEGY_TYPES if s_type['name'] == self.assigned_strategy_type['name']), None)
-        if found_strategy:
-            self.effective_strategy_acumen = acumen_map.get(found_strategy['applies_acumen'], self.team_strategy_acumen_base)
+        acumen_key = _STRATEGY_ACUMEN_KEYS.get(assigned_strategy_type['name'])
+        if acumen_key in _ACUMEN_FIELDS:
+            self.effective_strategy_acumen = getattr(self.profile, acumen_key)
         else:
-            self.effective_strategy_acumen = self.team_strategy_acumen_base
+            self.effective_strategy_acumen = self.profile.team_strategy_acumen_base
+
+    def as_record(self):
+        """Returns a plain dict snapshot of the entry's static and dynamic attributes."""
+        return {slot: getattr(self, slot) for slot in RaceEntry.__slots__[1:]}
 
     def __repr__(self):
         status = f"DNF ({self.dnf_reason})" if self.is_dnf else f"Time: {self.total_race_time_s:.2f}s"
@@ -106,65 +163,117 @@ def calculate_base_lap_time(circuit):
     """Calculates a reference lap time based on circuit length."""
     return circuit['length_km'] * 38
 
+class LapTimeProfile:
+    """
+    Precompiled lap-time terms for one entry at one circuit in one weather condition.
+    Holds everything calculate_lap_time needs that does not change lap to lap, so the per-lap
+    work is reduced to tire wear, randomness and penalties. The pace term for each ERS boost /
+    DRS / dirty-air combination is compiled on first use and kept in a small lookup table.
+    A profile is tied to the circuit and weather dicts it was compiled from; simulate_race
+    swaps in a new weather dict on a weather transition, which invalidates it.
+    """
+    __slots__ = (
+        'circuit', 'weather', 'entry', 'base_time', 'min_lap_time', 'pace', 'grip_base',
+        'adaptability_modifier', 'wear_per_lap', 'compound_multipliers', 'graining_tire_term',
+        'graining_temp_term', 'deviation_range', 'lap_jitter_chance', 'fuel_burn'
+    )
+
+    def __init__(self, entry, circuit, weather):
+        self.circuit = circuit
+        self.weather = weather
+        self.entry = entry
+        self.base_time = calculate_base_lap_time(circuit)
+        self.min_lap_time = self.base_time * 0.8
+        self.pace = {}
+
+        grip_penalty = 1.0 - weather['grip_multiplier']
+        mitigation = grip_penalty * (entry.driver_wet_weather_ability * 0.5)
+        self.grip_base = weather['grip_multiplier'] + mitigation
+        self.adaptability_modifier = weather.get('adaptability_modifier', 0.2)
+
+        base_wear_per_lap = circuit['tire_wear_severity'] * (1.1 - entry.car_tires_wr_final)
+        driver_wear_effect = base_wear_per_lap * (1.0 - (entry.driver_tire_management * 0.5))
+        self.wear_per_lap = (driver_wear_effect + weather['tire_wear_modifier']) / 100.0
+
+        # (wear multiplier, lap time multiplier) per compound, used in enhanced mode.
+        tire_type_rec = weather.get('tire_type_recommendation', 'dry')
+        self.compound_multipliers = {
+            'soft': (1.2, 0.98),
+            'medium': (1.0, 1.0),
+            'hard': (0.8, 1.02),
+            'intermediate': (1.0, 0.95 if tire_type_rec == 'intermediate' else 1.05),
+            'wet': (0.7, 0.90 if tire_type_rec == 'wet' else 1.10),
+        }
+        self.graining_tire_term = (1.0 - entry.driver_tire_management) * 0.02
+        self.graining_temp_term = weather.get('track_temp_celsius', 25) / 1000.0
+        self.deviation_range = (1.0 - entry.driver_consistency) * 0.5
+        self.lap_jitter_chance = weather.get('variability', 0.0) * 0.5
+
+        fuel_burn_rate = circuit['length_km'] * 0.35
+        self.fuel_burn = {name: fuel_burn_rate for name in ERS_MODES}
+        self.fuel_burn['Overtake'] = fuel_burn_rate * 1.1
+        self.fuel_burn['Hotlap'] = fuel_burn_rate * 1.1
+        self.fuel_burn['Recharge'] = fuel_burn_rate * 0.9
+
+    def compile_pace(self, ers_power_boost, drs_active, in_dirty_air):
+        """Computes (and caches) the car and driver pace term for one ERS/DRS/dirty-air state."""
+        entry, circuit, weather = self.entry, self.circuit, self.weather
+        speed_weight = circuit['straight_speed_importance']
+        cornering_weight = circuit['cornering_importance']
+        braking_weight = circuit['braking_demands']
+        total_weight = speed_weight + cornering_weight + braking_weight
+
+        effective_hp = (entry.car_engine_hp_final + ers_power_boost) * weather['hp_multiplier']
+        drs_speed_bonus = 0.15 if drs_active else 0.0
+        effective_downforce = entry.car_chassis_aero_df_final * weather['downforce_multiplier']
+        if in_dirty_air:
+            effective_downforce *= 0.90
+
+        straight_line_performance = (effective_hp * 0.7) + (entry.car_chassis_aero_dr_final * 0.3) + drs_speed_bonus
+        perf_score = (
+            (straight_line_performance * speed_weight) +
+            (effective_downforce * cornering_weight) +
+            (entry.car_brakes_sp_final * braking_weight)
+        ) / total_weight
+        pace = self.base_time / (perf_score + 0.5)
+        pace *= 1.0 - (entry.driver_skill * 0.05)
+        self.pace[(ers_power_boost, drs_active, in_dirty_air)] = pace
+        return pace
+
+def get_lap_time_profile(entry, circuit, weather):
+    """Returns the entry's lap-time profile for this circuit and weather, compiling it if needed."""
+    profile = entry.lap_profile
+    if profile is None or profile.weather is not weather or profile.circuit is not circuit:
+        profile = entry.lap_profile = LapTimeProfile(entry, circuit, weather)
+    return profile
+
 def calculate_lap_time(entry, circuit, weather, enhanced_simulation=False, weather_changed=False, track_grip_bonus=0.0, ers_power_boost=0.0):
     """
     Calculates the time for a single lap for a given entry.
     """
-    base_time = calculate_base_lap_time(circuit)
-    speed_weight = circuit['straight_speed_importance']
-    cornering_weight = circuit['cornering_importance']
-    braking_weight = circuit['braking_demands']
-    total_weight = speed_weight + cornering_weight + braking_weight
-    
-    effective_hp = (entry.car_engine_hp_final + ers_power_boost) * weather['hp_multiplier']
-    
-    drs_speed_bonus = 0.0
-    if enhanced_simulation and entry.drs_active:
-        drs_speed_bonus = 0.15
-
-    effective_downforce = entry.car_chassis_aero_df_final * weather['downforce_multiplier']
-    if enhanced_simulation and entry.in_dirty_air:
-        effective_downforce *= 0.90
-
-    straight_line_performance = (effective_hp * 0.7) + (entry.car_chassis_aero_dr_final * 0.3) + drs_speed_bonus
-    perf_score = (
-        (straight_line_performance * speed_weight) +
-        (effective_downforce * cornering_weight) +
-        (entry.car_brakes_sp_final * braking_weight)
-    ) / total_weight
-    adjusted_time = base_time / (perf_score + 0.5)
-    driver_skill_modifier = 1.0 - (entry.driver_skill * 0.05)
-    adjusted_time *= driver_skill_modifier
-    grip_penalty = 1.0 - weather['grip_multiplier']
-    mitigation = grip_penalty * (entry.driver_wet_weather_ability * 0.5)
-    
-    effective_grip_multiplier = weather['grip_multiplier'] + mitigation + track_grip_bonus
+    profile = get_lap_time_profile(entry, circuit, weather)
+    drs_active = enhanced_simulation and entry.drs_active
+    in_dirty_air = enhanced_simulation and entry.in_dirty_air
+    adjusted_time = profile.pace.get((ers_power_boost, drs_active, in_dirty_air))
+    if adjusted_time is None:
+        adjusted_time = profile.compile_pace(ers_power_boost, drs_active, in_dirty_air)
+
+    effective_grip_multiplier = profile.grip_base + track_grip_bonus
 
     if enhanced_simulation:
         if weather_changed:
             adaptability = entry.assigned_strategy_type.get('weather_adaptability', 0.0)
-            adaptability_modifier = weather.get('adaptability_modifier', 0.2)
-            adjusted_time *= (1.0 - (adaptability * adaptability_modifier * 0.1))
+            adjusted_time *= (1.0 - (adaptability * profile.adaptability_modifier * 0.1))
 
     adjusted_time /= effective_grip_multiplier
 
-    base_wear_per_lap = circuit['tire_wear_severity'] * (1.1 - entry.car_tires_wr_final)
-    driver_wear_effect = base_wear_per_lap * (1.0 - (entry.driver_tire_management * 0.5))
-    final_wear_this_lap = (driver_wear_effect + weather['tire_wear_modifier']) / 100.0
+    final_wear_this_lap = profile.wear_per_lap
 
     if enhanced_simulation and entry.current_tire_compound:
-        if entry.current_tire_compound == 'soft':
-            final_wear_this_lap *= 1.2
-            adjusted_time *= 0.98
-        elif entry.current_tire_compound == 'hard':
-            final_wear_this_lap *= 0.8
-            adjusted_time *= 1.02
-        elif entry.current_tire_compound == 'intermediate':
-            adjusted_time *= 0.95 if weather.get('tire_type_recommendation', 'dry') == 'intermediate' else 1.05
-            final_wear_this_lap *= 1.0
-        elif entry.current_tire_compound == 'wet':
-            adjusted_time *= 0.90 if weather.get('tire_type_recommendation', 'dry') == 'wet' else 1.10
-            final_wear_this_lap *= 0.7
+        compound_multipliers = profile.compound_multipliers.get(entry.current_tire_compound)
+        if compound_multipliers:
+            final_wear_this_lap *= compound_multipliers[0]
+            adjusted_time *= compound_multipliers[1]
 
     entry.tire_wear = min(1.0, entry.tire_wear + final_wear_this_lap)
     entry.laps_on_current_tires += 1
@@ -181,18 +290,18 @@ def calculate_lap_time(entry, circuit, weather, enhanced_simulation=False, weath
         graining_chance = 0.0
         if entry.current_tire_compound in ['soft', 'medium'] and entry.tire_wear > 0.4 and entry.laps_on_current_tires > 8:
             graining_chance = (entry.tire_wear - 0.4) * 0.05
-            graining_chance += (1.0 - entry.driver_tire_management) * 0.02
-            graining_chance += weather.get('track_temp_celsius', 25) / 1000.0
+            graining_chance += profile.graining_tire_term
+            graining_chance += profile.graining_temp_term
 
-        if random.random() < graining_chance:
+        if ENGINE_RNG.random() < graining_chance:
             entry.has_graining = True
-            adjusted_time += random.uniform(1.0, 3.0)
+            adjusted_time += ENGINE_RNG.uniform(1.0, 3.0)
 
     if entry.has_graining:
         adjusted_time += 1.5
 
-    deviation_range = (1.0 - entry.driver_consistency) * 0.5
-    random_deviation = random.uniform(-deviation_range, deviation_range)
+    deviation_range = profile.deviation_range
+    random_deviation = ENGINE_RNG.uniform(-deviation_range, deviation_range)
     adjusted_time += random_deviation
     
     strategy_bonus = (entry.effective_strategy_acumen - 0.7) * 0.1
@@ -202,17 +311,10 @@ def calculate_lap_time(entry, circuit, weather, enhanced_simulation=False, weath
         adjusted_time *= entry.damage_penalty_factor
 
     if enhanced_simulation:
-        weather_variability_lap_jitter = weather.get('variability', 0.0) * 0.5
-        if random.random() < weather_variability_lap_jitter:
-            adjusted_time *= random.uniform(0.995, 1.005)
-            
-        fuel_burn_rate = circuit['length_km'] * 0.35
-        if entry.ers_mode['name'] in ['Overtake', 'Hotlap']:
-            fuel_burn_rate *= 1.1
-        elif entry.ers_mode['name'] == 'Recharge':
-            fuel_burn_rate *= 0.9
+        if ENGINE_RNG.random() < profile.lap_jitter_chance:
+            adjusted_time *= ENGINE_RNG.uniform(0.995, 1.005)
             
-        entry.fuel_load_kg = max(0.0, entry.fuel_load_kg - fuel_burn_rate)
+        entry.fuel_load_kg = max(0.0, entry.fuel_load_kg - profile.fuel_burn[entry.ers_mode['name']])
         weight_penalty = (entry.fuel_load_kg / 10.0) * 0.3
         adjusted_time += weight_penalty
         
@@ -221,7 +323,7 @@ def calculate_lap_time(entry, circuit, weather, enhanced_simulation=False, weath
         elif entry.morale < 1.0:
             adjusted_time *= (1.0 + min(0.02, (1.0 - entry.morale) * 0.01))
 
-    return max(base_time * 0.8, adjusted_time)
+    return max(profile.min_lap_time, adjusted_time)
 
 def decide_pit_stop(entry, circuit, lap, is_safety_car, enhanced_simulation=False, current_weather_name='Dry'):
     """Determines if a car should make a pit stop on the current lap."""
@@ -282,12 +384,12 @@ def simulate_pit_stop(entry, lap, logger, is_safety_car, enhanced_simulation=Fal
     stationary_time = base_stationary_time - time_reduction
     if enhanced_simulation:
         pit_error_chance = 0.03 * (1 - entry.team_pit_stop_speed)
-        if random.random() < pit_error_chance:
-            error_time = random.uniform(1.5, 5.0)
+        if ENGINE_RNG.random() < pit_error_chance:
+            error_time = ENGINE_RNG.uniform(1.5, 5.0)
             stationary_time += error_time
             logger.log_pit_error(lap, entry, error_time)
         else:
-            pit_stop_variability = random.uniform(-0.3, 0.3)
+            pit_stop_variability = ENGINE_RNG.uniform(-0.3, 0.3)
             stationary_time += pit_stop_variability
             
     pit_stop_time = pit_lane_delta + stationary_time
@@ -316,15 +418,15 @@ def simulate_pit_stop(entry, lap, logger, is_safety_car, enhanced_simulation=Fal
         if circuit:
             remaining_laps = circuit['laps'] - entry.laps_completed
             if remaining_laps < 10:
-                new_compound = random.choices(['soft', 'medium'], weights=[0.7, 0.3], k=1)[0]
+                new_compound = ENGINE_RNG.choices(['soft', 'medium'], weights=[0.7, 0.3], k=1)[0]
             elif remaining_laps > 30 and entry.tire_wear < 0.2:
-                new_compound = random.choices(['medium', 'hard'], weights=[0.6, 0.4], k=1)[0]
+                new_compound = ENGINE_RNG.choices(['medium', 'hard'], weights=[0.6, 0.4], k=1)[0]
             elif entry.tire_wear > 0.7:
-                new_compound = random.choices(['medium', 'hard'], weights=[0.6, 0.4], k=1)[0]
+                new_compound = ENGINE_RNG.choices(['medium', 'hard'], weights=[0.6, 0.4], k=1)[0]
             else:
-                new_compound = random.choices(compounds, weights=[strategy_pref[c] for c in compounds], k=1)[0]
+                new_compound = ENGINE_RNG.choices(compounds, weights=[strategy_pref[c] for c in compounds], k=1)[0]
         else:
-            new_compound = random.choices(compounds, weights=[strategy_pref[c] for c in compounds], k=1)[0]
+            new_compound = ENGINE_RNG.choices(compounds, weights=[strategy_pref[c] for c in compounds], k=1)[0]
 
     entry.current_tire_compound = new_compound
     
@@ -351,13 +453,13 @@ def simulate_event(entry, lap, logger, weather, enhanced_simulation=False):
         if entry.tire_wear > 0.8:
             minor_damage_chance_base *= (1 + (entry.tire_wear - 0.8) * 0.5)
 
-        if random.random() < minor_damage_chance_base and not entry.has_minor_damage:
+        if ENGINE_RNG.random() < minor_damage_chance_base and not entry.has_minor_damage:
             entry.has_minor_damage = True
-            entry.damage_penalty_factor = random.uniform(1.005, 1.02)
+            entry.damage_penalty_factor = ENGINE_RNG.uniform(1.005, 1.02)
 
-    if random.random() < failure_chance:
+    if ENGINE_RNG.random() < failure_chance:
         total_penalty = engine_reliability_penalty_factor + brakes_durability_penalty_factor
-        if total_penalty > 0 and random.random() < (engine_reliability_penalty_factor / total_penalty):
+        if total_penalty > 0 and ENGINE_RNG.random() < (engine_reliability_penalty_factor / total_penalty):
             entry.dnf_reason = "Mechanical Failure (Engine)"
         elif total_penalty > 0:
             entry.dnf_reason = "Mechanical Failure (Brakes/Chassis)"
@@ -375,18 +477,18 @@ def simulate_event(entry, lap, logger, weather, enhanced_simulation=False):
         if entry.assigned_strategy_type.get('name', '').lower().startswith('aggressive'):
             error_chance *= 1.1
 
-    if random.random() < error_chance:
+    if ENGINE_RNG.random() < error_chance:
         if enhanced_simulation:
             entry.morale = max(0.8, entry.morale - 0.1)
-        incident_type_roll = random.random()
+        incident_type_roll = ENGINE_RNG.random()
         if incident_type_roll < 0.05:
             entry.is_dnf = True
             entry.dnf_reason = "Driver Error (Crash)"
             logger.log_dnf(lap, entry)
         elif incident_type_roll < 0.2:
-            entry.total_race_time_s += random.uniform(5.0, 10.0)
+            entry.total_race_time_s += ENGINE_RNG.uniform(5.0, 10.0)
         else:
-            entry.total_race_time_s += random.uniform(1.0, 3.0)
+            entry.total_race_time_s += ENGINE_RNG.uniform(1.0, 3.0)
 
 
 def check_for_overtake(front_entry, rear_entry, circuit, time_diff, enhanced_simulation=False):
@@ -429,72 +531,118 @@ def check_for_overtake(front_entry, rear_entry, circuit, time_diff, enhanced_sim
         overtake_prob += (rear_entry.morale - 1.0) * 0.1
         overtake_prob -= (front_entry.morale - 1.0) * 0.1
 
-    return random.random() < max(0.0, min(1.0, overtake_prob))
-
-
-def simulate_race(circuit, weather, entries, enhanced_simulation=False):
-    """The main function to simulate an entire race from start to finish."""
-    for entry in entries:
-        entry.total_race_time_s = 0.0
-        entry.laps_completed = 0
-        entry.is_dnf = False
-        entry.dnf_reason = ""
-        entry.pit_stops_made = 0
-        entry.tire_wear = 0.0
-        entry.laps_on_current_tires = 0
-        entry.has_graining = False
-        entry.has_minor_damage = False
-        entry.damage_penalty_factor = 1.0
-        entry.ers_charge = 1.0
-        entry.ers_mode = ERS_MODES['Standard']
-        entry.ers_deployment_lap = 0
-        entry.morale = 1.0
-        entry.fuel_load_kg = 110.0
-        entry.drs_active = False
-        entry.in_dirty_air = False
+    return ENGINE_RNG.random() < max(0.0, min(1.0, overtake_prob))
+
+
+# Replay capture levels, from cheapest to most detailed:
+#   none    - no replay is built or written
+#   final   - race header, starting grid and final standings
+#   summary - 'final' plus the race event log
+#   full    - 'summary' plus lap-by-lap standings (the format the dashboard plays back)
+REPLAY_LEVELS = ('none', 'final', 'summary', 'full')
+
+# Upper bounds on the ENGINE_RNG draws of one lap: per running car (ERS, events, pit stop, lap
+# time, blue flag, team orders, overtakes) plus the lap's own safety car and weather draws.
+# simulate_race reserves them at the start of each lap so random() never runs dry mid-lap.
+LAP_DRAWS_PER_CAR = 32
+LAP_DRAWS_PER_LAP = 16
+
+# Version of the race model, part of every result cache key (see result_cache). Bump it with
+# any change to either engine that alters what a seeded run produces.
+ENGINE_VERSION = 2
+
+def _standings_snapshot(ordered_entries):
+    """Builds the replay standings rows for entries in classification order."""
+    standings = []
+    for e in ordered_entries:
+        standings.append({
+            'driver': e.driver_name,
+            'team': e.team_name,
+            'position': e.current_position,
+            'gap': e.total_race_time_s - ordered_entries[0].total_race_time_s if not e.is_dnf and len(ordered_entries) > 0 else -1,
+            'tire': e.current_tire_compound,
+            'tire_laps': e.laps_on_current_tires,
+            'pits': e.pit_stops_made,
+            'dnf': e.is_dnf,
+            'dnf_reason': e.dnf_reason if e.is_dnf else '',
+            'time': round(e.total_race_time_s, 3)
+        })
+    return standings
 
+def simulate_race(circuit, weather, entries, enhanced_simulation=False, replay_level='full', logger=None, profiler=None, verbose=False):
+    """
+    The main function to simulate an entire race from start to finish.
+    Entries must be freshly created or re-armed with RaceEntry.reset().
+    replay_level (see REPLAY_LEVELS) controls how much replay data is built; with 'none'
+    the returned replay data is None.
+    Returns the final results, the race logger (iterating it yields the formatted log
+    entries) and the replay data. Pass a NullRaceLogger when nobody reads the race log.
+    Pass a RaceProfiler to collect time per race phase (see race_profiler.RACE_PHASES).
+    verbose prints a banner as the race starts.
+    """
+    profiling = profiler is not None
+    if profiling:
+        mark = profiler.mark
+        phase_start = profiler.clock()
+    if replay_level not in REPLAY_LEVELS:
+        raise ValueError(f"Unknown replay level '{replay_level}'. Expected one of {REPLAY_LEVELS}.")
+    capture_laps = replay_level == 'full'
     safety_car_laps = 0
     current_weather = weather.copy()
     current_weather_name = weather['name']
     
     track_state = TrackState()
-    logger = RaceLogger()
+    if logger is None:
+        logger = RaceLogger()
+    for i, entry in enumerate(entries):
+        entry.entry_index = i
+    running_order = RunningOrder(entries)
+    race_state = RaceStateIndex(entries)
+    logger.bind_roster(entries)
     
-    replay_data = {
-        'circuit': circuit['name'],
-        'total_laps': circuit['laps'],
-        'initial_weather': current_weather_name,
-        'starting_grid': [],
-        'laps_data': [],
-        'events': []
-    }
-    for entry in entries:
-        replay_data['starting_grid'].append({
-            'driver': entry.driver_name,
-            'team': entry.team_name,
-            'position': entry.initial_position
-        })
+    replay_data = None
+    if replay_level != 'none':
+        replay_data = {
+            'circuit': circuit['name'],
+            'total_laps': circuit['laps'],
+            'initial_weather': current_weather_name,
+            'starting_grid': []
+        }
+        if capture_laps:
+            replay_data['laps_data'] = []
+        if replay_level in ('summary', 'full'):
+            replay_data['events'] = []
+        for entry in entries:
+            replay_data['starting_grid'].append({
+                'driver': entry.driver_name,
+                'team': entry.team_name,
+                'position': entry.initial_position
+            })
 
-    print(f"\n--- Simulating Race at {circuit['name']} with initial {current_weather_name} conditions ---")
+    if verbose:
+        print(f"\n--- Simulating Race at {circuit['name']} with initial {current_weather_name} conditions ---")
+    if profiling: phase_start = mark('race.setup', phase_start)
 
     for lap in range(1, circuit['laps'] + 1):
+        ENGINE_RNG.reserve(LAP_DRAWS_PER_CAR * len(running_order) + LAP_DRAWS_PER_LAP)
         is_safety_car_deployed_this_lap = False
         if safety_car_laps == 0 and lap > 2 and lap < circuit['laps'] - 5:
             non_dnf_incident_chance = 0.005 
-            dnf_occurred_last_lap = any(e.laps_completed == lap - 1 and e.is_dnf for e in entries)
-            if dnf_occurred_last_lap or random.random() < non_dnf_incident_chance:
+            dnf_occurred_last_lap = bool(race_state.retired_last_lap)
+            if dnf_occurred_last_lap or ENGINE_RNG.random() < non_dnf_incident_chance:
                 sc_probability = 0.6 if circuit.get('track_type') == 'Street Circuit' else 0.4
-                if random.random() < sc_probability:
+                if ENGINE_RNG.random() < sc_probability:
                     is_safety_car_deployed_this_lap = True
-                    safety_car_laps = random.randint(2, 4)
+                    safety_car_laps = ENGINE_RNG.randint(2, 4)
                     logger.log_safety_car(lap)
+        if profiling: phase_start = mark('race.safety_car', phase_start)
 
         is_safety_car_active = safety_car_laps > 0
         weather_changed_this_lap = False
 
         if enhanced_simulation:
             weather_susceptibility = circuit.get('weather_susceptibility', 0.1)
-            if random.random() < current_weather.get('variability', 0.0) * weather_susceptibility:
+            if ENGINE_RNG.random() < current_weather.get('variability', 0.0) * weather_susceptibility:
                 possible_transitions = WEATHER_TRANSITIONS.get(current_weather_name, {})
                 if possible_transitions:
                     next_weather_names = list(possible_transitions.keys())
@@ -505,7 +653,7 @@ def simulate_race(circuit, weather, entries, enhanced_simulation=False):
                         new_weather_name = current_weather_name
                     else:
                         normalized_weights = [w / total_weight for w in transition_weights]
-                        new_weather_name = random.choices(next_weather_names, weights=normalized_weights, k=1)[0]
+                        new_weather_name = ENGINE_RNG.choices(next_weather_names, weights=normalized_weights, k=1)[0]
                     
                     if new_weather_name != current_weather_name:
                         current_weather = WEATHER_CONDITIONS[new_weather_name].copy()
@@ -514,290 +662,729 @@ def simulate_race(circuit, weather, entries, enhanced_simulation=False):
                         track_state.handle_weather_change(current_weather_name)
                         logger.log_weather_change(lap, new_weather_name)
 
-        track_state.update_rubber(len([e for e in entries if not e.is_dnf]))
+        track_state.update_rubber(len(running_order))
         track_grip_bonus = track_state.get_grip_bonus() if enhanced_simulation else 0.0
+        if profiling: phase_start = mark('race.weather', phase_start)
 
-        live_race_order = sorted([e for e in entries if not e.is_dnf], key=lambda x: x.total_race_time_s)
-
-        for i, entry in enumerate(live_race_order):
-            if entry.is_dnf: continue
-            
-            temp_front_car = live_race_order[i-1] if i > 0 else None
-            entry.current_time_to_front = entry.total_race_time_s - temp_front_car.total_race_time_s if temp_front_car else float('inf')
+        lap_leader = running_order.leader
+        for i, entry in enumerate(running_order):
+            time_to_front = running_order.gap_to_front(i)
+            entry.current_time_to_front = time_to_front
             
             if enhanced_simulation:
-                front_car = live_race_order[i-1] if i > 0 else None
-                rear_car = live_race_order[i+1] if i < len(live_race_order) - 1 else None
-                time_to_front = entry.total_race_time_s - front_car.total_race_time_s if front_car else float('inf')
-                time_to_rear = rear_car.total_race_time_s - entry.total_race_time_s if rear_car else float('inf')
+                time_to_rear = running_order.gap_to_rear(i)
                 manage_ers(entry, lap, time_to_front, time_to_rear)
                 
                 entry.drs_active = lap > 2 and not is_safety_car_active and time_to_front < 1.0
                 entry.in_dirty_air = time_to_front < 2.0
+        if profiling: phase_start = mark('race.ers', phase_start)
 
         for entry in entries:
             if entry.is_dnf: continue
 
             simulate_event(entry, lap, logger, current_weather, enhanced_simulation)
-            if entry.is_dnf: continue
+            if profiling: phase_start = mark('race.events', phase_start)
+            if entry.is_dnf:
+                race_state.record_dnf(entry)
+                continue
 
             if decide_pit_stop(entry, circuit, lap, is_safety_car_active, enhanced_simulation, current_weather_name):
                 simulate_pit_stop(entry, lap, logger, is_safety_car_active, enhanced_simulation, current_weather_name, circuit)
+            if profiling: phase_start = mark('race.pit_stops', phase_start)
 
             ers_boost = entry.ers_mode['power_boost'] if enhanced_simulation else 0.0
             lap_time = calculate_lap_time(entry, circuit, current_weather, enhanced_simulation, weather_changed_this_lap, track_grip_bonus, ers_boost)
             
-            leader_laps = max(e.laps_completed for e in entries)
-            if entry.laps_completed < leader_laps -1:
-                time_to_leader = entry.total_race_time_s - live_race_order[0].total_race_time_s
+            if entry.laps_completed < race_state.leader_laps -1:
+                time_to_leader = entry.total_race_time_s - lap_leader.total_race_time_s
                 if time_to_leader > 0 and time_to_leader < 5: 
                     lap_time *= 1.02 
                     logger.log_blue_flag(lap, entry)
-                    if len(live_race_order) > 0:
-                        live_race_order[0].total_race_time_s += random.uniform(0.5, 1.2)
+                    lap_leader.total_race_time_s += ENGINE_RNG.uniform(0.5, 1.2)
 
             if is_safety_car_active:
-                if hasattr(entry, 'current_time_to_front') and entry.current_time_to_front > 1.0:
-                    lap_time = calculate_base_lap_time(circuit) * 1.2 + random.uniform(-0.5, 0.5)
+                if entry.current_time_to_front > 1.0:
+                    lap_time = calculate_base_lap_time(circuit) * 1.2 + ENGINE_RNG.uniform(-0.5, 0.5)
                 else:
-                    lap_time = calculate_base_lap_time(circuit) * 1.4 + random.uniform(-0.5, 0.5)
+                    lap_time = calculate_base_lap_time(circuit) * 1.4 + ENGINE_RNG.uniform(-0.5, 0.5)
 
             entry.total_race_time_s += lap_time
-            entry.laps_completed += 1
+            race_state.complete_lap(entry)
+            if profiling: phase_start = mark('race.lap_time', phase_start)
 
         if is_safety_car_active:
             safety_car_laps -= 1
             if safety_car_laps == 0:
                 logger.log_safety_car_ends(lap)
+        race_state.end_lap()
 
-        live_race_order = sorted([e for e in entries if not e.is_dnf], key=lambda x: x.total_race_time_s)
-        for i, entry in enumerate(live_race_order):
-            entry.current_position = i + 1
+        running_order.remove_retired()
+        running_order.reorder()
+        running_order.assign_positions()
+        if profiling: phase_start = mark('race.standings', phase_start)
             
         if enhanced_simulation and not is_safety_car_active:
-            teams = {e.team_name for e in live_race_order}
-            for team in teams:
-                team_drivers = [e for e in live_race_order if e.team_name == team]
-                if len(team_drivers) == 2:
-                    team_drivers.sort(key=lambda x: x.current_position)
-                    if check_for_team_orders(team_drivers[0], team_drivers[1], lap, circuit['laps'], logger):
-                        time_swap_diff = team_drivers[1].total_race_time_s - team_drivers[0].total_race_time_s
-                        team_drivers[0].total_race_time_s += time_swap_diff + 0.1
-                        live_race_order.sort(key=lambda x: x.total_race_time_s)
-
-        for i in range(len(live_race_order) - 1, 0, -1):
-            rear_entry, front_entry = live_race_order[i], live_race_order[i-1]
+            for front_driver, rear_driver in race_state.live_teammate_pairs():
+                if check_for_team_orders(front_driver, rear_driver, lap, circuit['laps'], logger):
+                    time_swap_diff = rear_driver.total_race_time_s - front_driver.total_race_time_s
+                    front_driver.total_race_time_s += time_swap_diff + 0.1
+                    running_order.drop_back(running_order.cars.index(front_driver))
+        if profiling: phase_start = mark('race.team_orders', phase_start)
+
+        for i in range(len(running_order) - 1, 0, -1):
+            rear_entry, front_entry = running_order[i], running_order[i-1]
             time_difference = rear_entry.total_race_time_s - front_entry.total_race_time_s
             
             if 0 < time_difference < 1.2: 
                 if check_for_overtake(front_entry, rear_entry, circuit, time_difference, enhanced_simulation):
                     logger.log_overtake(lap, rear_entry, front_entry)
-                    front_entry.total_race_time_s = rear_entry.total_race_time_s + random.uniform(0.1, 0.3)
+                    front_entry.total_race_time_s = rear_entry.total_race_time_s + ENGINE_RNG.uniform(0.1, 0.3)
                     
                     if enhanced_simulation:
                         rear_entry.morale = min(1.2, rear_entry.morale + 0.05)
                         front_entry.morale = max(0.8, front_entry.morale - 0.05)
                     
-                    live_race_order.sort(key=lambda x: x.total_race_time_s)
+                    running_order.drop_back(i - 1)
                     break 
 
-        for idx, entry_sorted in enumerate(live_race_order):
-            entry_sorted.current_position = idx + 1
+        running_order.assign_positions()
+        # Cars on exactly equal times (common when lap times hit the floor) go back to entry order
+        # before the snapshot and the next lap, as a full re-sort of the field would leave them.
+        running_order.reorder()
+        if profiling: phase_start = mark('race.overtakes', phase_start)
             
-        lap_state = []
-        current_standings = sorted([e for e in entries if not e.is_dnf], key=lambda x: x.total_race_time_s) + sorted([e for e in entries if e.is_dnf], key=lambda x: (-x.laps_completed, x.total_race_time_s))
-        for e in current_standings:
-            lap_state.append({
-                'driver': e.driver_name,
-                'team': e.team_name,
-                'position': e.current_position,
-                'gap': e.total_race_time_s - current_standings[0].total_race_time_s if not e.is_dnf and len(current_standings) > 0 else -1,
-                'tire': e.current_tire_compound,
-                'tire_laps': e.laps_on_current_tires,
-                'pits': e.pit_stops_made,
-                'dnf': e.is_dnf,
-                'dnf_reason': e.dnf_reason if e.is_dnf else '',
-                'time': round(e.total_race_time_s, 3)
+        if capture_laps:
+            current_standings = running_order.standings()
+            replay_data['laps_data'].append({
+                'lap': lap,
+                'weather': current_weather_name,
+                'safety_car': is_safety_car_active,
+                'standings': _standings_snapshot(current_standings)
             })
-        replay_data['laps_data'].append({
-            'lap': lap,
-            'weather': current_weather_name,
-            'safety_car': is_safety_car_active,
-            'standings': lap_state
-        })
+            if profiling: phase_start = mark('race.replay_snapshot', phase_start)
 
-    non_dnf = sorted([e for e in entries if not e.is_dnf], key=lambda x: x.total_race_time_s)
-    dnf = sorted([e for e in entries if e.is_dnf], key=lambda x: (-x.laps_completed, x.total_race_time_s))
-    
-    final_results = non_dnf + dnf
+    final_results = running_order.standings()
     for i, entry in enumerate(final_results):
         entry.current_position = i + 1
         
-    replay_data['events'] = logger.logs
-        
-    return final_results, logger.logs, replay_data
+    if replay_data is not None:
+        if 'events' in replay_data:
+            replay_data['events'] = logger.logs
+        replay_data['final_standings'] = _standings_snapshot(final_results)
+    if profiling: mark('race.results', phase_start)
+
+    return final_results, logger, replay_data
 
 def assign_points(position):
     """Assigns F1 points based on finishing position."""
     points_system = {1: 25, 2: 18, 3: 15, 4: 12, 5: 10, 6: 8, 7: 6, 8: 4, 9: 2, 10: 1}
     return points_system.get(position, 0)
 
+def format_log_line(log_entry):
+    """Formats a race log entry as a single text line."""
+    return f"Lap {log_entry['lap']:>2}: [{log_entry['type']:<12}] {log_entry['message']}"
+
+# Columns of a single race's result rows (see generate_final_race_result).
+RACE_RESULT_COLUMNS = ('Position', 'Driver', 'Team', 'Points', 'Status')
+
 def generate_final_race_result(final_results):
-    """Generates a P1-P20 race result list with Position, Driver, Team Name, Points, and Status."""
-    result_data = []
-    for entry in final_results:
-        points = 0 if entry.is_dnf else assign_points(entry.current_position)
-        status = entry.dnf_reason if entry.is_dnf else "Finished"
-        result_data.append({
-            'Position': entry.current_position,
-            'Driver': entry.driver_name,
-            'Team': entry.team_name,
-            'Points': points,
-            'Status': status
-        })
-    result_df = pd.DataFrame(result_data)
-    return result_df
+    """
+    Generates a P1-P20 race result as plain row tuples (Position, Driver, Team, Points, Status),
+    in RACE_RESULT_COLUMNS order. Rows are cheap to build for every race; pandas is only used
+    for the aggregated results.
+    """
+    return [
+        (entry.current_position, entry.driver_name, entry.team_name,
+         0 if entry.is_dnf else assign_points(entry.current_position),
+         entry.dnf_reason if entry.is_dnf else "Finished")
+        for entry in final_results
+    ]
+
+def format_race_result(rows):
+    """Formats race result rows (see generate_final_race_result) as a right-aligned text table."""
+    table = [RACE_RESULT_COLUMNS] + [tuple(str(value) for value in row) for row in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(RACE_RESULT_COLUMNS))]
+    return "\n".join(" ".join(value.rjust(width) for value, width in zip(row, widths)) for row in table)
+
+def derive_sim_seed(base_seed, circuit, weather, sim_num):
+    """
+    Derives an independent, reproducible RNG seed for a single simulation.
+    The seed depends only on the base seed, the race setup and the sim number,
+    so a sim produces the same race no matter which worker process runs it.
+    """
+    key = f"{base_seed}|{circuit['name']}|{weather['name']}|{sim_num}".encode('utf-8')
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], 'big')
+
+def create_sim_entries(race_entries_template):
+    """Creates one reusable race entry per template, sharing the template's static profile."""
+    return [RaceEntry.from_profile(entry_template.profile) for entry_template in race_entries_template]
+
+def arm_sim_entries(sim_entries, circuit, weather, enhanced_simulation=False, strategy_overrides=None):
+    """
+    Re-arms reusable entries for a new race with random strategies, grid slots and starting tires.
+    strategy_overrides maps driver names to the RACE_STRATEGY_TYPES entry they always run.
+    """
+    # One strategy, one shuffle step and one starting compound per car.
+    ENGINE_RNG.reserve(3 * len(sim_entries))
+    assigned_strategies = [ENGINE_RNG.choice(RACE_STRATEGY_TYPES) for _ in sim_entries]
+    if strategy_overrides:
+        # Overridden strategies still consume their draw, so the rest of the race sees the same stream.
+        assigned_strategies = [strategy_overrides.get(entry.driver_name, strategy) for entry, strategy in zip(sim_entries, assigned_strategies)]
+
+    initial_grid_positions = list(range(1, len(sim_entries) + 1))
+    ENGINE_RNG.shuffle(initial_grid_positions)
+
+    compounds = ['soft', 'medium', 'hard']
+    tire_type = weather.get('tire_type_recommendation', 'dry')
+    circuit_weights = circuit.get('tire_compound_preference', {'soft': 0.33, 'medium': 0.33, 'hard': 0.34})
+    for entry, assigned_strategy, grid_position in zip(sim_entries, assigned_strategies, initial_grid_positions):
+        if enhanced_simulation:
+            if tire_type in ['intermediate', 'wet']:
+                starting_compound = tire_type
+            else:
+                strategy_weights = assigned_strategy.get('tire_compound_preference', {'soft': 0.33, 'medium': 0.33, 'hard': 0.34})
+                combined_weights = [(circuit_weights[c] + strategy_weights[c]) / 2 for c in compounds]
+                starting_compound = ENGINE_RNG.choices(compounds, weights=combined_weights, k=1)[0]
+        else:
+            starting_compound = 'medium'
+        entry.reset(assigned_strategy, grid_position, starting_compound)
+    return sim_entries
 
-def run_monte_carlo_simulation(num_simulations, circuit, weather, race_entries_template, enhanced_simulation=False, race_results_output_dir=None, show_logs=False, save_logs=False, save_individual_races=False):
-    """Runs the race simulation multiple times for a specific weather condition."""
-    print(f"\n--- Running {num_simulations} simulations for {weather['name']} conditions at {circuit['name']} ---")
+def run_single_simulation(sim_num, circuit, weather, sim_entries, enhanced_simulation=False, base_seed=0, replay_level='full', log_events=True, profiler=None, antithetic=False, strategy_overrides=None, verbose=False):
+    """
+    Runs one seeded simulation on reusable entries (see create_sim_entries).
+    Returns the final results, race log and replay data. The result entries are re-armed
+    by the next call, so snapshot them first if they must outlive it.
+    With log_events=False the race events are not recorded at all.
+    antithetic runs the sim on the antithetic twin of its random stream (see RandomPool), and
+    strategy_overrides is passed on to arm_sim_entries, verbose to simulate_race.
+    """
+    if profiler is not None:
+        phase_start = profiler.clock()
+    ENGINE_RNG.seed(derive_sim_seed(base_seed, circuit, weather, sim_num), antithetic)
+    arm_sim_entries(sim_entries, circuit, weather, enhanced_simulation, strategy_overrides)
+    logger = RaceLogger() if log_events else NullRaceLogger()
+    if profiler is not None:
+        profiler.mark('race.arm', phase_start)
+    return simulate_race(circuit, weather, sim_entries, enhanced_simulation, replay_level, logger, profiler, verbose)
+
+# --- Parallel Execution (process pool) ---
+# Each worker process receives the race entry templates once, through the pool initializer,
+# and builds its reusable entries from them.
+_worker_sim_entries = None
+
+def _init_simulation_worker(race_entries_template):
+    global _worker_sim_entries
+    _worker_sim_entries = create_sim_entries(race_entries_template)
+
+def _run_simulation_chunk(circuit, weather, enhanced_simulation, base_seed, replay_level, log_events, profile_trace, sim_nums):
+    # profile_trace is None (no profiling), False (phase stats) or True (stats and trace).
+    profiler = RaceProfiler(trace=profile_trace) if profile_trace is not None else None
+    chunk_results = []
+    for sim_num in sim_nums:
+        final_results, race_logs, replay_data = run_single_simulation(sim_num, circuit, weather, _worker_sim_entries, enhanced_simulation, base_seed, replay_level, log_events, profiler)
+        # The worker entries are re-armed for the next sim, so send back snapshots.
+        chunk_results.append(([copy.copy(e) for e in final_results], race_logs, replay_data))
+    return chunk_results, profiler
+
+def create_simulation_pool(num_workers, race_entries_template):
+    """Creates a process pool whose workers are initialised once with the race entry templates."""
+    return ProcessPoolExecutor(max_workers=num_workers, initializer=_init_simulation_worker, initargs=(race_entries_template,))
+
+def _iter_parallel_simulations(executor, num_workers, sim_nums, circuit, weather, enhanced_simulation, base_seed, replay_level, log_events, profiler=None):
+    # Sims are split into contiguous chunks; executor.map yields them back in submission order,
+    # so results are merged exactly as the single-worker run produces them.
+    chunk_size = max(1, math.ceil(len(sim_nums) / (num_workers * 4)))
+    chunks = [sim_nums[start:start + chunk_size] for start in range(0, len(sim_nums), chunk_size)]
+    profile_trace = profiler.trace if profiler is not None else None
+    chunk_results = executor.map(_run_simulation_chunk, *zip(*[(circuit, weather, enhanced_simulation, base_seed, replay_level, log_events, profile_trace, c) for c in chunks]))
+    for chunk, chunk_profiler in chunk_results:
+        if chunk_profiler is not None:
+            profiler.merge(chunk_profiler)
+        yield from chunk
+
+# Convergence reporting and adaptive runs (see RaceResultAccumulator.precision): the outcome
+# probabilities whose 95% confidence intervals are tracked, and the z value of that interval.
+PRECISION_OUTCOMES = ('Win', 'Podium', 'Points', 'DNF')
+CONFIDENCE_Z = 1.96
+# Sims added between convergence checks in adaptive runs.
+ADAPTIVE_BATCH_SIZE = 500
+
+def run_monte_carlo_simulation(num_simulations, circuit, weather, race_entries_template, enhanced_simulation=False, race_results_output_dir=None, show_logs=False, save_logs=False, save_individual_races=False, num_workers=1, seed=None, executor=None, accumulator=None, replay_level='full', output_writer=None, profiler=None, start_sim=0, target_precision=None, batch_size=ADAPTIVE_BATCH_SIZE, verbosity='progress', progress=None, race_results_format='sqlite', results_store=None, run_id=None, checkpoint=None, replay_format='archive', replay_archive=None):
+    """
+    Runs the race simulation multiple times for a specific weather condition.
+    With num_workers > 1 (or a pool from create_simulation_pool passed as executor) the races
+    run in parallel worker processes. Every sim draws from its own stream seeded from `seed`,
+    so the results are identical for any number of workers.
+    Returns the list of per-race records, or, when a RaceResultAccumulator is given, streams
+    each finished race into it and returns the accumulator instead.
+    replay_level (see REPLAY_LEVELS) sets how much replay data each race builds; no replays
+    are written when it is 'none'. The replays go to one replay archive per run (see
+    replay_archive), or to one JSON file per race when replay_format is 'json'. Pass a shared
+    replay_archive to archive several calls together (the caller must close it); otherwise
+    the run's archive is replays/<circuit>/<run id>.f1replays under the output directory.
+    Replays, race CSVs and logs are persisted by a background AsyncOutputWriter. Pass a shared
+    output_writer to keep writing across calls (the caller must close it); otherwise one is
+    created and closed before this function returns.
+    With save_individual_races, every race's results go to the SQLite race results store
+    (see results_store), or to one CSV per race when race_results_format is 'csv'. Pass a
+    shared results_store and its run_id to store several calls as one run (the caller must
+    close it); otherwise a run is started in results/races.sqlite under the output directory.
+    Pass a RaceProfiler to collect time per phase of the run and of every race (including
+    races run in worker processes).
+    Sims are numbered from start_sim, so a run can continue another one with the same seed.
+    With a target_precision (the widest 95% CI half-width allowed, in percentage points, see
+    RaceResultAccumulator.precision) the races run in batches of batch_size and stop as soon
+    as this run's results reach the target; num_simulations is then the maximum.
+    verbosity (see progress.VERBOSITY_LEVELS) sets the console output: a progress line by
+    default, every race's result table when 'verbose'. Pass a shared ProgressReporter as
+    progress to report several calls on one line (the caller must close it).
+    checkpoint, if given, is called as checkpoint(sims_done) after every race, with the number
+    of this call's races finished so far (run_weather_sweep saves its checkpoints from it).
+    """
+    owns_progress = progress is None
+    if owns_progress:
+        progress = ProgressReporter(num_simulations, verbosity=verbosity)
+    progress.set_label(f"{weather['name']} at {circuit['name']}")
+    verbose = progress.verbosity == 'verbose'
+    if target_precision is None:
+        progress.write(f"\n--- Running {num_simulations} simulations for {weather['name']} conditions at {circuit['name']} ---")
+    else:
+        progress.write(f"\n--- Running up to {num_simulations} simulations for {weather['name']} conditions at {circuit['name']} (target precision +/-{target_precision} pp) ---")
     all_simulation_results = []
-    
-    for sim_num in range(num_simulations):
-        sim_entries = []
-        for entry_template in race_entries_template:
-            driver_data_copy = {
-                'driver_name': entry_template.driver_name, 'skill': entry_template.driver_skill,
-                'consistency': entry_template.driver_consistency, 'tire_management': entry_template.driver_tire_management,
-                'wet_weather_ability': entry_template.driver_wet_weather_ability, 'overtaking_skill': entry_template.driver_overtaking_skill,
-                'defending_skill': entry_template.driver_defending_skill, 'team_name': entry_template.team_name
-            }
-            team_data_copy = {
-                'team_name': entry_template.team_name, 'team_pit_stop_speed': entry_template.team_pit_stop_speed,
-                'team_strategy_acumen': entry_template.team_strategy_acumen_base, 'strategy_aggressive_acumen': entry_template.strategy_aggressive_acumen,
-                'strategy_balanced_acumen': entry_template.strategy_balanced_acumen, 'strategy_conservative_acumen': entry_template.strategy_conservative_acumen
-            }
-            car_scores_copy = {
-                'Overall_Car_Score': entry_template.car_overall_score, 'Engine_HP_Final': entry_template.car_engine_hp_final,
-                'Engine_REL_Final': entry_template.car_engine_rel_final, 'ChassisAero_DF_Final': entry_template.car_chassis_aero_df_final,
-                'ChassisAero_DR_Final': entry_template.car_chassis_aero_dr_final, 'Brakes_SP_Final': entry_template.car_brakes_sp_final,
-                'Brakes_DUR_Final': entry_template.car_brakes_dur_final, 'Tires_WR_Final': entry_template.car_tires_wr_final
-            }
-            assigned_strategy = random.choice(RACE_STRATEGY_TYPES)
-            new_entry = RaceEntry(driver_data_copy, team_data_copy, car_scores_copy, 0, assigned_strategy)
-            sim_entries.append(new_entry)
+    base_seed = seed if seed is not None else random.randrange(2**32)
 
-        initial_grid_positions = list(range(1, len(sim_entries) + 1))
-        random.shuffle(initial_grid_positions)
-        for i, entry in enumerate(sim_entries):
-            entry.initial_position = initial_grid_positions[i]
-            entry.current_position = initial_grid_positions[i]
+    # Race events are only recorded when a text log or the replay event list will read them.
+    log_events = show_logs or save_logs or replay_level in ('summary', 'full')
 
-        for i, entry in enumerate(sim_entries):
-            if enhanced_simulation:
-                compounds = ['soft', 'medium', 'hard']
-                tire_type = weather.get('tire_type_recommendation', 'dry')
-                if tire_type in ['intermediate', 'wet']:
-                    entry.current_tire_compound = tire_type
-                else:
-                    circuit_weights = circuit.get('tire_compound_preference', {'soft': 0.33, 'medium': 0.33, 'hard': 0.34})
-                    strategy_weights = entry.assigned_strategy_type.get('tire_compound_preference', {'soft': 0.33, 'medium': 0.33, 'hard': 0.34})
-                    combined_weights = [(circuit_weights[c] + strategy_weights[c]) / 2 for c in compounds]
-                    entry.current_tire_compound = random.choices(compounds, weights=combined_weights, k=1)[0]
-            else:
-                entry.current_tire_compound = 'medium'
+    owns_executor = False
+    if executor is None and num_workers > 1:
+        executor = create_simulation_pool(num_workers, race_entries_template)
+        owns_executor = True
 
-        simulation_results, race_logs, replay_data = simulate_race(circuit, weather, sim_entries, enhanced_simulation)
-        race_result_df = generate_final_race_result(simulation_results)
-        
-        base_output_dir = race_results_output_dir if race_results_output_dir else os.path.join(os.getcwd(), "outputs")
-        circuit_folder_name = circuit['name'].replace(' ', '_')
-        weather_folder_name = weather['name'].replace(' ', '_')
-
-        # Always save race replays into outputs/replays/
-        replay_dir = os.path.join(base_output_dir, "replays", circuit_folder_name, weather_folder_name)
-        os.makedirs(replay_dir, exist_ok=True)
-        replay_filepath = os.path.join(replay_dir, f"Sim_{sim_num + 1}_Replay.json")
-        with open(replay_filepath, 'w') as f:
-            json.dump(replay_data, f)
-        print(f"Replay saved to {replay_filepath}")
-        
-        print(f"\n--- Race Result for Simulation {sim_num + 1} ({weather['name']} conditions) ---")
-        print(race_result_df.to_string(index=False))
-
-        if show_logs:
-            print("\n--- Race Log ---")
-            for log_entry in race_logs:
-                print(f"Lap {log_entry['lap']:>2}: [{log_entry['type']:<12}] {log_entry['message']}")
-
-        if save_individual_races:
-            race_csv_dir = os.path.join(base_output_dir, "results", "races", circuit_folder_name, weather_folder_name)
-            os.makedirs(race_csv_dir, exist_ok=True)
-            race_filename = f"Race_{circuit_folder_name}_{weather_folder_name}_Sim_{sim_num + 1}.csv"
-            race_filepath = os.path.join(race_csv_dir, race_filename)
-            race_result_df.to_csv(race_filepath, index=False)
-            print(f"Individual race result saved to {race_filepath}")
-
-        if save_logs:
-            log_dir = os.path.join(base_output_dir, "logs", "races", circuit_folder_name, weather_folder_name)
-            os.makedirs(log_dir, exist_ok=True)
-            log_filename = f"Race_{circuit_folder_name}_{weather_folder_name}_Sim_{sim_num + 1}_Log.txt"
-            log_filepath = os.path.join(log_dir, log_filename)
-            with open(log_filepath, 'w') as f:
-                for log_entry in race_logs:
-                    f.write(f"Lap {log_entry['lap']:>2}: [{log_entry['type']:<12}] {log_entry['message']}\n")
-            print(f"Individual race log saved to {log_filepath}")
-
-        all_simulation_results.append([e.__dict__.copy() for e in simulation_results])
-    return all_simulation_results
+    if executor is not None:
+        pool_workers = num_workers if num_workers > 1 else (os.cpu_count() or 1)
+        run_sims = lambda sim_nums: _iter_parallel_simulations(executor, pool_workers, sim_nums, circuit, weather, enhanced_simulation, base_seed, replay_level, log_events, profiler)
+    else:
+        sim_entries = create_sim_entries(race_entries_template)
+        run_sims = lambda sim_nums: (run_single_simulation(sim_num, circuit, weather, sim_entries, enhanced_simulation, base_seed, replay_level, log_events, profiler, verbose=verbose) for sim_num in sim_nums)
 
-def aggregate_results(all_simulation_results, all_drivers):
-    """Aggregates results from all simulations into a final summary DataFrame."""
-    driver_stats = {d['driver_name']: {
-        'total_points': 0, 'dnf_count': 0,
-        'finishing_positions': {pos: 0 for pos in range(1, len(all_drivers) + 2)}, 
-        'team_name': d.get('team_name', 'N/A'), 'position_counts': []
-    } for d in all_drivers}
-
-    num_sims = len(all_simulation_results)
-    if num_sims == 0: return pd.DataFrame()
-
-    for sim_results in all_simulation_results:
-        for entry_data in sim_results:
-            stats = driver_stats.get(entry_data['driver_name'])
-            if stats:
-                position = len(all_drivers) + 1 if entry_data['is_dnf'] else entry_data['current_position']
-                stats['position_counts'].append(position)
-
-                if entry_data['is_dnf']:
-                    stats['dnf_count'] += 1
-                    stats['finishing_positions'][len(all_drivers) + 1] += 1
+    all_sim_nums = range(start_sim, start_sim + num_simulations)
+    if target_precision is None:
+        batches = [all_sim_nums]
+        run_results = None
+    else:
+        batches = [all_sim_nums[start:start + batch_size] for start in range(0, num_simulations, batch_size)]
+        # Only this run's races decide when it has converged, whatever else the accumulator holds.
+        run_results = RaceResultAccumulator([e.as_record() for e in race_entries_template])
+
+    owns_writer = output_writer is None
+    if owns_writer:
+        output_writer = AsyncOutputWriter()
+
+    base_output_dir = race_results_output_dir if race_results_output_dir else os.path.join(os.getcwd(), "outputs")
+    circuit_folder_name = circuit['name'].replace(' ', '_')
+    weather_folder_name = weather['name'].replace(' ', '_')
+    replay_dir = os.path.join(base_output_dir, "replays", circuit_folder_name, weather_folder_name)
+    race_csv_dir = os.path.join(base_output_dir, "results", "races", circuit_folder_name, weather_folder_name)
+    log_dir = os.path.join(base_output_dir, "logs", "races", circuit_folder_name, weather_folder_name)
+
+    store_races = save_individual_races and race_results_format == 'sqlite'
+    owns_store = store_races and results_store is None
+    if owns_store:
+        from results_store import RaceResultStore, race_store_path
+        results_store = RaceResultStore(race_store_path(base_output_dir))
+        run_id = results_store.start_run(circuit['name'], base_seed, 'scalar', enhanced_simulation)
+    archive_replays = replay_level != 'none' and replay_format == 'archive'
+    owns_archive = archive_replays and replay_archive is None
+    if owns_archive:
+        from replay_archive import ReplayArchive, replay_archive_path
+        from results_store import new_run_id
+        replay_archive = ReplayArchive(replay_archive_path(base_output_dir, circuit['name'], run_id or new_run_id()))
+
+    profiling = profiler is not None
+    if profiling:
+        mark = profiler.mark
+        phase_start = profiler.clock()
+    try:
+        for batch in batches:
+            for sim_num, (simulation_results, race_logs, replay_data) in zip(batch, run_sims(batch)):
+                if profiling: phase_start = mark('run.simulate', phase_start)
+                # The result table is only built when it is printed or saved as a CSV.
+                if verbose or (save_individual_races and not store_races):
+                    race_result_rows = generate_final_race_result(simulation_results)
+                if profiling: phase_start = mark('run.result_table', phase_start)
+
+                # Save race replays into outputs/replays/ unless replay capture is off
+                if replay_data is not None and archive_replays:
+                    replay_archive.add(sim_num, weather['name'], replay_data)
+                    if verbose:
+                        print(f"Replay queued for {replay_archive.path}")
+                elif replay_data is not None:
+                    replay_filepath = os.path.join(replay_dir, f"Sim_{sim_num + 1}_Replay.json")
+                    output_writer.write_json(replay_filepath, replay_data)
+                    if verbose:
+                        print(f"Replay queued for {replay_filepath}")
+
+                if verbose:
+                    print(f"\n--- Race Result for Simulation {sim_num + 1} ({weather['name']} conditions) ---")
+                    print(format_race_result(race_result_rows))
+
+                if show_logs:
+                    progress.write(f"\n--- Race Log for Simulation {sim_num + 1} ({weather['name']} conditions) ---\n"
+                                   + "\n".join(format_log_line(log_entry) for log_entry in race_logs))
+
+                if store_races:
+                    results_store.add_race(run_id, circuit['name'], weather['name'], sim_num, simulation_results)
+                elif save_individual_races:
+                    race_filename = f"Race_{circuit_folder_name}_{weather_folder_name}_Sim_{sim_num + 1}.csv"
+                    race_filepath = os.path.join(race_csv_dir, race_filename)
+                    output_writer.write_rows(race_filepath, RACE_RESULT_COLUMNS, race_result_rows)
+                    if verbose:
+                        print(f"Individual race result queued for {race_filepath}")
+
+                if save_logs:
+                    log_filename = f"Race_{circuit_folder_name}_{weather_folder_name}_Sim_{sim_num + 1}_Log.txt"
+                    log_filepath = os.path.join(log_dir, log_filename)
+                    output_writer.write_lines(log_filepath, (format_log_line(log_entry) for log_entry in race_logs))
+                    if verbose:
+                        print(f"Individual race log queued for {log_filepath}")
+                if profiling: phase_start = mark('run.report', phase_start)
+
+                if accumulator is not None:
+                    accumulator.add_race(simulation_results)
                 else:
-                    stats['total_points'] += assign_points(entry_data['current_position'])
-                    stats['finishing_positions'][entry_data['current_position']] += 1
+                    all_simulation_results.append([e.as_record() for e in simulation_results])
+                if run_results is not None:
+                    run_results.add_race(simulation_results)
+                progress.update()
+                if checkpoint is not None:
+                    checkpoint(sim_num - start_sim + 1)
+                if profiling: phase_start = mark('run.accumulate', phase_start)
+
+            if run_results is not None:
+                achieved_precision = run_results.precision()
+                progress.write(f"Precision after {run_results.num_simulations} simulations: +/-{achieved_precision:.2f} pp (target +/-{target_precision} pp)")
+                if achieved_precision <= target_precision:
+                    break
+    finally:
+        if owns_progress:
+            progress.close()
+        if owns_executor:
+            executor.shutdown()
+        if owns_store:
+            results_store.close()
+        if owns_archive:
+            replay_archive.close()
+        if owns_writer:
+            output_writer.close()
+            if profiling: mark('run.flush', phase_start)
+    return accumulator if accumulator is not None else all_simulation_results
+
+def save_npz_atomic(filepath, arrays):
+    """Writes arrays to a compressed .npz file through a temporary file, so readers never see it half written."""
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(temp_filepath, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(temp_filepath, filepath)
+
+class RaceResultAccumulator:
+    """
+    Streaming, constant-memory aggregation of race results.
+    Keeps a fixed amount of state per driver (a finishing-position histogram, DNF count, and
+    points sum and sum of squares), updated as each race finishes. to_dataframe() produces the
+    same summary as aggregate_results, however many races were added.
+    Races merged in with a weather name are also kept per weather condition (weather_results),
+    for weather_dataframe().
+    """
+    # Arrays saved and restored by save() and load(), next to the driver names and race count.
+    _STATE_ARRAYS = ('position_histogram', 'dnf_counts', 'points_sum', 'points_sq_sum')
+
+    def __init__(self, all_drivers):
+        self.driver_names = [d['driver_name'] for d in all_drivers]
+        self.team_names = [d.get('team_name', 'N/A') for d in all_drivers]
+        self.driver_index = {name: i for i, name in enumerate(self.driver_names)}
+        num_drivers = len(self.driver_names)
+        self.dnf_position = num_drivers + 1
+        # Column p - 1 counts finishes in P{p}; the last column counts DNFs.
+        self.position_histogram = np.zeros((num_drivers, num_drivers + 1), dtype=np.int64)
+        self.dnf_counts = np.zeros(num_drivers, dtype=np.int64)
+        self.points_sum = np.zeros(num_drivers, dtype=np.int64)
+        self.points_sq_sum = np.zeros(num_drivers, dtype=np.int64)
+        self.num_simulations = 0
+        self.weather_results = {}
+        self._all_drivers = all_drivers
+        self._points_by_position = np.array([assign_points(pos) for pos in range(num_drivers + 2)], dtype=np.int64)
+
+    def _add(self, driver_name, position, is_dnf):
+        i = self.driver_index.get(driver_name)
+        if i is None:
+            return
+        if is_dnf:
+            self.dnf_counts[i] += 1
+            self.position_histogram[i, -1] += 1
+        else:
+            points = assign_points(position)
+            self.points_sum[i] += points
+            self.points_sq_sum[i] += points * points
+            self.position_histogram[i, position - 1] += 1
+
+    def add_race(self, final_results):
+        """Adds one finished race, given as its list of RaceEntry objects."""
+        for entry in final_results:
+            self._add(entry.driver_name, entry.current_position, entry.is_dnf)
+        self.num_simulations += 1
+
+    def add_records(self, race_records):
+        """Adds one finished race, given as per-driver record dicts (see RaceEntry.as_record)."""
+        for record in race_records:
+            self._add(record['driver_name'], record['current_position'], record['is_dnf'])
+        self.num_simulations += 1
+
+    def add_positions(self, positions):
+        """
+        Adds many races at once, given as an (n_sims, n_drivers) integer array of classified
+        positions in this accumulator's driver order: 0 for a DNF, -1 where a driver did not race.
+        The histograms are filled with a single bincount, so this stays fast for millions of races.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        raced = positions >= 0
+        # Column of each result in the histogram: P{p} is column p - 1, DNFs the last column.
+        columns = np.minimum(np.where(positions == 0, self.dnf_position, positions), self.dnf_position) - 1
+        num_drivers = len(self.driver_names)
+        cells = (np.arange(num_drivers) * self.dnf_position + columns)[raced]
+        self.position_histogram += np.bincount(cells, minlength=num_drivers * self.dnf_position).reshape(num_drivers, self.dnf_position)
+        # _points_by_position scores column + 1, so DNFs (dnf_position) and absentees (index 0) score nothing.
+        points = self._points_by_position[np.where(raced, columns + 1, 0)]
+        self.dnf_counts += (positions == 0).sum(axis=0)
+        self.points_sum += points.sum(axis=0)
+        self.points_sq_sum += (points * points).sum(axis=0)
+        self.num_simulations += positions.shape[0]
+
+    def add_batch(self, batch_result):
+        """Adds every race of a batch_engine.BatchRaceResult with array operations."""
+        batch_positions = np.where(batch_result.is_dnf, 0, batch_result.positions)
+        positions = np.full((batch_result.num_simulations, len(self.driver_names)), -1, dtype=np.int64)
+        for d, driver_name in enumerate(batch_result.driver_names):
+            i = self.driver_index.get(driver_name)
+            if i is not None:
+                positions[:, i] = batch_positions[:, d]
+        self.add_positions(positions)
+
+    def merge(self, other, weather=None):
+        """
+        Adds the state of another accumulator over the same drivers, including its per-weather
+        results. With a weather name, other's races are also counted under that weather.
+        """
+        self.position_histogram += other.position_histogram
+        self.dnf_counts += other.dnf_counts
+        self.points_sum += other.points_sum
+        self.points_sq_sum += other.points_sq_sum
+        self.num_simulations += other.num_simulations
+        for weather_name, weather_results in other.weather_results.items():
+            self._weather_accumulator(weather_name).merge(weather_results)
+        if weather is not None:
+            self._weather_accumulator(weather).merge(other)
+        return self
+
+    def _weather_accumulator(self, weather):
+        if weather not in self.weather_results:
+            self.weather_results[weather] = RaceResultAccumulator(self._all_drivers)
+        return self.weather_results[weather]
+
+    def state_arrays(self, prefix=''):
+        """The accumulator's state (drivers, histograms, counts and sums, per weather too) as arrays named prefix + field."""
+        state = {
+            f'{prefix}driver_names': np.array(self.driver_names), f'{prefix}team_names': np.array(self.team_names),
+            f'{prefix}num_simulations': np.array(self.num_simulations),
+            f'{prefix}weathers': np.array(list(self.weather_results), dtype=str),
+        }
+        for name in self._STATE_ARRAYS:
+            state[f'{prefix}{name}'] = getattr(self, name)
+        for i, weather_results in enumerate(self.weather_results.values()):
+            state[f'{prefix}weather{i}.num_simulations'] = np.array(weather_results.num_simulations)
+            for name in self._STATE_ARRAYS:
+                state[f'{prefix}weather{i}.{name}'] = getattr(weather_results, name)
+        return state
+
+    @classmethod
+    def from_state_arrays(cls, state, prefix=''):
+        """Rebuilds an accumulator from state_arrays() output (or a loaded .npz holding it)."""
+        all_drivers = [{'driver_name': str(driver), 'team_name': str(team)}
+                       for driver, team in zip(state[f'{prefix}driver_names'], state[f'{prefix}team_names'])]
+        accumulator = cls(all_drivers)
+        accumulator._load_state(state, prefix)
+        for i, weather in enumerate(state[f'{prefix}weathers']):
+            accumulator._weather_accumulator(str(weather))._load_state(state, f'{prefix}weather{i}.')
+        return accumulator
+
+    def save(self, filepath):
+        """Writes the accumulator's state to a compressed .npz file, written atomically. load() restores it exactly."""
+        save_npz_atomic(filepath, self.state_arrays())
+
+    @classmethod
+    def load(cls, filepath):
+        """Restores an accumulator written by save()."""
+        with np.load(filepath) as state:
+            return cls.from_state_arrays(state)
+
+    def _load_state(self, state, prefix):
+        self.num_simulations = int(state[f'{prefix}num_simulations'])
+        for name in self._STATE_ARRAYS:
+            getattr(self, name)[...] = state[f'{prefix}{name}']
+
+    def distribution_stats(self):
+        """
+        Per-driver arrays describing the points and finishing-position distributions: average
+        points with its standard error, and the mean, median, 10th and 90th percentile classified
+        position (NaN for a driver who never finished).
+        """
+        num_sims = self.num_simulations
+        finishes = self.position_histogram[:, :-1]
+        num_finishes = finishes.sum(axis=1)
+        finished = num_finishes > 0
+        safe_finishes = np.where(finished, num_finishes, 1)
+        positions = np.arange(1, self.dnf_position)
+        cumulative_share = np.cumsum(finishes, axis=1) / safe_finishes[:, None]
+
+        def percentile_position(q):
+            # The first position at which the cumulative share of finishes reaches q.
+            return np.where(finished, (cumulative_share < q - 1e-12).sum(axis=1) + 1, np.nan)
+
+        points_mean = self.points_sum / max(num_sims, 1)
+        points_var = np.maximum(self.points_sq_sum / max(num_sims, 1) - points_mean ** 2, 0.0)
+        return {
+            'Avg Points': points_mean,
+            'Avg Points SE': np.sqrt(points_var / max(num_sims, 1)),
+            'Mean Position': np.where(finished, finishes @ positions / safe_finishes, np.nan),
+            'Median Position': percentile_position(0.5),
+            'P10 Position': percentile_position(0.1),
+            'P90 Position': percentile_position(0.9),
+        }
 
-    final_data = []
-    for driver_name, stats in driver_stats.items():
-        avg_points = stats['total_points'] / num_sims
-        dnf_rate = (stats['dnf_count'] / num_sims) * 100
-        
-        position_counts = Counter(stats['position_counts'])
-        mode_position = min(position_counts.items(), key=lambda x: (-x[1], x[0]))[0] if position_counts else len(all_drivers) + 1
-        mode_count = position_counts[mode_position] if position_counts else 0
+    def outcome_counts(self):
+        """Per-driver counts of each PRECISION_OUTCOMES outcome (win, podium, points finish, DNF)."""
+        histogram = self.position_histogram
+        scoring_positions = int((self._points_by_position[1:self.dnf_position] > 0).sum())
+        return {
+            'Win': histogram[:, 0],
+            'Podium': histogram[:, :3].sum(axis=1),
+            'Points': histogram[:, :scoring_positions].sum(axis=1),
+            'DNF': histogram[:, -1],
+        }
 
-        result = {
-            'Driver': driver_name, 'Team': stats['team_name'],
+    def confidence_half_widths(self):
+        """
+        95% confidence interval half-widths, in percentage points, of every driver's outcome
+        probabilities (see outcome_counts). Uses the Agresti-Coull interval, which stays
+        meaningful for outcomes that have not happened yet.
+        """
+        n = self.num_simulations + CONFIDENCE_Z ** 2
+        half_widths = {}
+        for outcome, counts in self.outcome_counts().items():
+            p = (counts + CONFIDENCE_Z ** 2 / 2) / n
+            half_widths[outcome] = CONFIDENCE_Z * np.sqrt(p * (1 - p) / n) * 100
+        return half_widths
+
+    def precision(self):
+        """The widest 95% CI half-width (percentage points) over all drivers and outcomes; inf before any race."""
+        if self.num_simulations == 0:
+            return math.inf
+        return float(max(half_width.max() for half_width in self.confidence_half_widths().values()))
+
+    def precision_dataframe(self):
+        """Per-driver outcome probabilities (%) and average points, each with its 95% CI half-width."""
+        import pandas as pd
+        num_sims = self.num_simulations
+        if num_sims == 0: return pd.DataFrame()
+        counts = self.outcome_counts()
+        half_widths = self.confidence_half_widths()
+        points_mean = self.points_sum / num_sims
+        points_var = np.maximum(self.points_sq_sum / num_sims - points_mean ** 2, 0.0)
+        points_half_width = CONFIDENCE_Z * np.sqrt(points_var / num_sims)
+        rows = []
+        for i, driver_name in enumerate(self.driver_names):
+            row = {'Driver': driver_name, 'Team': self.team_names[i]}
+            for outcome in PRECISION_OUTCOMES:
+                row[f'{outcome} (%)'] = int(counts[outcome][i]) / num_sims * 100
+                row[f'{outcome} CI (+/- pp)'] = half_widths[outcome][i]
+            row['Avg Points'] = points_mean[i]
+            row['Avg Points CI (+/-)'] = points_half_width[i]
+            rows.append(row)
+        return pd.DataFrame(rows).sort_values(by=['Win (%)', 'Avg Points'], ascending=[False, False]).reset_index(drop=True)
+
+    def to_dataframe(self):
+        """
+        Builds the aggregated summary DataFrame (same layout as aggregate_results): mode position,
+        the distribution statistics of distribution_stats(), DNF rate and the probability of
+        every finishing position.
+        """
+        import pandas as pd
+        num_sims = self.num_simulations
+        if num_sims == 0: return pd.DataFrame()
+
+        histogram = self.position_histogram
+        # argmax returns the first (best) position among equally common ones.
+        mode_position = np.where(histogram.any(axis=1), np.argmax(histogram, axis=1) + 1, self.dnf_position)
+        mode_count = histogram[np.arange(len(self.driver_names)), mode_position - 1] * histogram.any(axis=1)
+        stats = self.distribution_stats()
+        probabilities = histogram / num_sims * 100
+
+        columns = {
+            'Driver': self.driver_names, 'Team': self.team_names,
             'Mode Position': mode_position, 'Mode Count': mode_count,
-            'Avg Points': avg_points, 'DNF Rate (%)': f"{dnf_rate:.2f}"
         }
-        for pos in range(1, len(all_drivers) + 1):
-            result[f'P{pos}_Prob'] = (stats['finishing_positions'].get(pos, 0) / num_sims) * 100
-        result['DNF_Prob (%)'] = (stats['finishing_positions'].get(len(all_drivers) + 1, 0) / num_sims) * 100
-        
-        final_data.append(result)
-    
-    results_df = pd.DataFrame(final_data).sort_values(by=['Mode Position', 'Mode Count', 'Avg Points'], ascending=[True, False, False])
-    return results_df
+        columns.update(stats)
+        columns['DNF Rate (%)'] = [f"{rate:.2f}" for rate in self.dnf_counts / num_sims * 100]
+        for pos in range(1, self.dnf_position):
+            columns[f'P{pos}_Prob'] = probabilities[:, pos - 1]
+        columns['DNF_Prob (%)'] = probabilities[:, -1]
+
+        results_df = pd.DataFrame(columns).sort_values(by=['Mode Position', 'Mode Count', 'Avg Points'], ascending=[True, False, False])
+        return results_df
+
+    def weather_dataframe(self):
+        """
+        Per-weather breakdown of the races merged in with a weather name: one row per weather
+        and driver with the race count, win, podium and DNF probabilities (%) and the
+        distribution statistics of distribution_stats().
+        """
+        import pandas as pd
+        frames = []
+        for weather_name, weather_results in self.weather_results.items():
+            num_sims = weather_results.num_simulations
+            if num_sims == 0: continue
+            counts = weather_results.outcome_counts()
+            columns = {
+                'Weather': weather_name, 'Driver': weather_results.driver_names, 'Team': weather_results.team_names,
+                'Races': num_sims,
+                'Win (%)': counts['Win'] / num_sims * 100,
+                'Podium (%)': counts['Podium'] / num_sims * 100,
+                'DNF (%)': counts['DNF'] / num_sims * 100,
+            }
+            columns.update(weather_results.distribution_stats())
+            frames.append(pd.DataFrame(columns).sort_values(by=['Avg Points', 'Win (%)'], ascending=[False, False]))
+        if not frames: return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+def aggregate_results(all_simulation_results, all_drivers):
+    """Aggregates results from all simulations into a final summary DataFrame."""
+    import pandas as pd
+    if len(all_simulation_results) == 0: return pd.DataFrame()
+    accumulator = RaceResultAccumulator(all_drivers)
+    # One (n_sims, n_drivers) position matrix, 0 for a DNF, is aggregated with array operations.
+    positions = np.full((len(all_simulation_results), len(accumulator.driver_names)), -1, dtype=np.int64)
+    driver_index = accumulator.driver_index
+    for row, sim_results in enumerate(all_simulation_results):
+        for record in sim_results:
+            i = driver_index.get(record['driver_name'])
+            if i is not None:
+                positions[row, i] = 0 if record['is_dnf'] else record['current_position']
+    accumulator.add_positions(positions)
+    return accumulator.to_dataframe()
 
 def generate_final_p1_p20_list(aggregated_df, num_drivers):
     """Generates a final P1-P20 list with Position, Driver, Team, and Points based on sorted position."""
@@ -809,15 +1396,337 @@ def generate_final_p1_p20_list(aggregated_df, num_drivers):
     final_list = final_list.head(min(num_drivers, 20))
     return final_list
 
+def build_race_entries_template(teams_data, drivers_data, car_calculations_data):
+    """
+    Matches each driver to their team and car data and builds one template RaceEntry per driver.
+    Drivers whose team is missing from TEAM DATA or CALCULATIONS are skipped.
+    Returns (valid_drivers, race_entries_template).
+    """
+    valid_drivers = []
+    for d in drivers_data:
+        team_name = d.get('team_name', '').strip()
+        team_exists = any(t['team_name'].strip() == team_name for t in teams_data)
+        car_data_exists = any(cs.get('Team Name', '').strip() == team_name for cs in car_calculations_data)
+        if team_exists and car_data_exists:
+            valid_drivers.append(d)
+        else:
+            print(f"Skipping driver {d.get('driver_name', 'N/A')}: Team '{team_name}' not found in TEAM DATA or CALCULATIONS.")
+
+    if len(valid_drivers) < len(drivers_data):
+        print(f"\nWarning: Simulating for {len(valid_drivers)} of {len(drivers_data)} drivers with complete data.")
+
+    race_entries_template = []
+    for driver_data in valid_drivers:
+        team_name = driver_data['team_name'].strip()
+        team_info = next(t for t in teams_data if t['team_name'].strip() == team_name)
+        car_score_info = next(cs for cs in car_calculations_data if cs['Team Name'].strip() == team_name)
+        initial_strategy_for_template = random.choice(RACE_STRATEGY_TYPES)
+        entry = RaceEntry(driver_data, team_info, car_score_info, 0, initial_strategy_for_template)
+        race_entries_template.append(entry)
+    return valid_drivers, race_entries_template
+
+def load_race_field(data_dir=''):
+    """
+    Loads TEAM DATA.csv, DRIVERS DATA.csv and CALCULATIONS.csv from data_dir and builds the field.
+    Returns (valid_drivers, race_entries_template), or None if any file could not be loaded.
+    """
+    teams_data = load_csv_data(os.path.join(data_dir, 'TEAM DATA.csv'))
+    drivers_data = load_csv_data(os.path.join(data_dir, 'DRIVERS DATA.csv'))
+    car_calculations_data = load_csv_data(os.path.join(data_dir, 'CALCULATIONS.csv'))
+    if any(data is None for data in [teams_data, drivers_data, car_calculations_data]):
+        return None
+    return build_race_entries_template(teams_data, drivers_data, car_calculations_data)
+
+def prepare_weather(weather_name, enhanced_simulation=False):
+    """Returns a copy of a WEATHER_CONDITIONS entry, with its name, ready to simulate."""
+    weather_data = WEATHER_CONDITIONS[weather_name]
+    weather_for_sim = weather_data.copy()
+    weather_for_sim["name"] = weather_name
+    if enhanced_simulation:
+        weather_for_sim['variability'] = weather_data.get('variability', 0.1 if weather_name != 'Dry' else 0.05)
+    return weather_for_sim
+
+def run_weather_sweep(total_simulations, circuit, race_entries_template, valid_drivers, weather_names=None, enhanced_simulation=False, use_batch_engine=False, race_results_output_dir=None, show_logs=False, save_logs=False, save_individual_races=False, num_workers=1, seed=None, replay_level='full', profiler=None, target_precision=None, batch_size=ADAPTIVE_BATCH_SIZE, verbosity='progress', race_results_format='sqlite', run_id=None, checkpoint_path=None, checkpoint_interval=60.0, resume=False, shard_index=0, shard_count=1, replay_format='archive'):
+    """
+    Splits total_simulations evenly over the given weather conditions (all of them by default)
+    and runs them at one circuit, streaming every race into a single RaceResultAccumulator,
+    which is returned with a per-weather breakdown (see weather_dataframe). All outputs are on
+    disk when this returns.
+    A weather condition draws the same races for the same seed whichever other conditions run
+    alongside it.
+    With a target_precision (see run_monte_carlo_simulation) the sweep runs in rounds of about
+    batch_size simulations, split evenly over the weathers, until the combined results reach
+    the target; total_simulations is then the maximum. Every weather runs the same number of
+    races, so the conditions stay evenly weighted.
+    Progress over the whole sweep is reported on one line (see run_monte_carlo_simulation's verbosity).
+    With save_individual_races the whole sweep is stored as one run of the race results store
+    (both engines), with run_id as its id (a fresh one by default), or as per-race CSVs (scalar
+    engine) when race_results_format is 'csv'.
+    The scalar engine's replays of the whole sweep go to one replay archive, named after the
+    run id (see run_monte_carlo_simulation's replay_format).
+    With a checkpoint_path the sweep's progress is saved there every checkpoint_interval seconds
+    (see checkpoint.SweepCheckpoint), and the file is deleted once the sweep finishes. With
+    resume, a sweep with the same settings continues from that checkpoint, if there is one, and
+    returns exactly the results the uninterrupted sweep would have returned; an unseeded sweep
+    takes the seed of the run it resumes.
+    With a shard_count above 1 only shard shard_index's slice of every weather's sims runs (see
+    shards.shard_sim_range); the results of all shards, run with the same seed, merge into the
+    results of the whole sweep. Sharded sweeps cannot stop at a target_precision.
+    """
+    if weather_names is None:
+        weather_names = list(WEATHER_CONDITIONS)
+    if shard_count > 1 and target_precision is not None:
+        raise ValueError("A sharded sweep runs all its simulations; it cannot stop at a target_precision.")
+    base_seed = seed if seed is not None else random.randrange(2**32)
+    all_weather_names = list(WEATHER_CONDITIONS)
+
+    num_weathers = len(weather_names)
+    sims_per_weather = total_simulations // num_weathers
+    remainder_sims = total_simulations % num_weathers
+
+    # Results are streamed into fixed-size accumulators, one per weather run, which are merged into
+    # the sweep's results (keeping the per-weather breakdown), so memory stays flat however many sims run.
+    results_accumulator = RaceResultAccumulator(valid_drivers)
+    # Sims covered by each weather's finished weather runs, and the resumed weather run, if any.
+    weather_sims = {}
+    resumed_run = None
+    checkpointer = None
+    if checkpoint_path is not None:
+        from checkpoint import SweepCheckpoint
+        checkpointer = SweepCheckpoint(checkpoint_path, checkpoint_interval)
+        settings = {
+            'circuit': circuit['name'], 'weathers': list(weather_names), 'simulations': total_simulations,
+            'engine': 'batch' if use_batch_engine else 'scalar', 'enhanced': enhanced_simulation,
+            'target_precision': target_precision, 'batch_size': batch_size, 'shard': [shard_index, shard_count],
+        }
+        saved = checkpointer.load() if resume else None
+        if saved is not None:
+            if (saved['settings'] != settings or (seed is not None and saved['base_seed'] != seed)
+                    or saved['results_accumulator'].driver_names != results_accumulator.driver_names):
+                raise ValueError(f"Checkpoint {checkpoint_path} was saved by a run with other settings; delete it to start afresh.")
+            base_seed = saved['base_seed']
+            run_id = saved['run_id'] if saved['run_id'] is not None else run_id
+            results_accumulator = saved['results_accumulator']
+            weather_sims = saved['weather_sims']
+            resumed_run = saved['current']
+    # Replays, race CSVs and logs are written in the background while the races run.
+    output_writer = AsyncOutputWriter()
+    # One pool serves every weather condition, so workers receive the templates only once.
+    simulation_pool = create_simulation_pool(num_workers, race_entries_template) if num_workers > 1 and not use_batch_engine else None
+    # Sims run per weather: (start, count), all of them unless this is one shard of the sweep.
+    if shard_count > 1:
+        from shards import shard_sim_range
+        from batch_engine import BATCH_SIZE
+    weather_slices = []
+    for i, weather_name in enumerate(weather_names):
+        current_weather_sims = sims_per_weather + (1 if i < remainder_sims else 0)
+        start_sim = 0
+        if shard_count > 1:
+            start_sim, end_sim = shard_sim_range(current_weather_sims, shard_index, shard_count, BATCH_SIZE if use_batch_engine else 1)
+            current_weather_sims = end_sim - start_sim
+        weather_slices.append((weather_name, start_sim, current_weather_sims))
+    if target_precision is None:
+        planned_simulations = sum(count for _, _, count in weather_slices)
+    else:
+        planned_simulations = max(1, sims_per_weather) * num_weathers
+    resumed_simulations = results_accumulator.num_simulations + (resumed_run['accumulator'].num_simulations if resumed_run else 0)
+    progress = ProgressReporter(planned_simulations, verbosity=verbosity, initial=resumed_simulations)
+    if resumed_simulations:
+        progress.write(f"\nResuming from checkpoint {checkpoint_path}: {resumed_simulations} simulations already done (seed {base_seed}).")
+    results_store = None
+    if save_individual_races and race_results_format == 'sqlite':
+        from results_store import RaceResultStore, race_store_path
+        base_output_dir = race_results_output_dir if race_results_output_dir else os.path.join(os.getcwd(), "outputs")
+        results_store = RaceResultStore(race_store_path(base_output_dir))
+        run_id = results_store.start_run(circuit['name'], base_seed, 'batch' if use_batch_engine else 'scalar', enhanced_simulation, run_id)
+        if resumed_simulations:
+            # Races stored after the checkpoint was saved are run again.
+            for weather_name in weather_names:
+                kept_sims = weather_sims.get(weather_name, 0)
+                if resumed_run and resumed_run['weather'] == weather_name:
+                    kept_sims = resumed_run['start_sim'] + resumed_run['sims_done']
+                results_store.delete_races(run_id, weather_name, kept_sims)
+    replay_archive = None
+    if replay_level != 'none' and replay_format == 'archive' and not use_batch_engine:
+        from replay_archive import ReplayArchive, replay_archive_path
+        from results_store import new_run_id
+        base_output_dir = race_results_output_dir if race_results_output_dir else os.path.join(os.getcwd(), "outputs")
+        if run_id is None:
+            run_id = new_run_id()
+        # A resumed sweep appends to its archive; races archived again after the checkpoint replace their first copies.
+        replay_archive = ReplayArchive(replay_archive_path(base_output_dir, circuit['name'], run_id))
+        progress.write(f"Replays will be archived to {replay_archive.path}")
+
+    def run_weather(weather_name, num_simulations, start_sim=0):
+        """Runs one weather run, or what is left of it after a checkpoint. Returns False if nothing was left."""
+        nonlocal resumed_run
+        if weather_sims.get(weather_name, 0) >= start_sim + num_simulations:
+            return False
+        weather_for_sim = prepare_weather(weather_name, enhanced_simulation)
+        weather_accumulator = RaceResultAccumulator(valid_drivers)
+        sims_done = 0
+        if resumed_run is not None and (resumed_run['weather'], resumed_run['start_sim']) == (weather_name, start_sim):
+            weather_accumulator = resumed_run['accumulator']
+            sims_done = resumed_run['sims_done']
+            resumed_run = None
+
+        def save_checkpoint(run_sims_done):
+            if checkpointer.due():
+                # Everything the checkpoint counts as done must be on disk first.
+                output_writer.flush()
+                if results_store is not None:
+                    results_store.flush()
+                if replay_archive is not None:
+                    replay_archive.flush()
+                checkpointer.save(settings, base_seed, run_id, results_accumulator, weather_sims, {
+                    'weather': weather_name, 'start_sim': start_sim, 'sims_done': sims_done + run_sims_done,
+                    'accumulator': weather_accumulator,
+                })
+        checkpoint = save_checkpoint if checkpointer is not None else None
+
+        if use_batch_engine:
+            from batch_engine import run_batch_monte_carlo
+            # Every batch has a stream of its own, so later rounds of an adaptive sweep and resumed runs just start later.
+            run_batch_monte_carlo(
+                num_simulations - sims_done, circuit, weather_for_sim,
+                race_entries_template, enhanced_simulation, seed=[base_seed, all_weather_names.index(weather_name)],
+                accumulator=weather_accumulator, progress=progress, start_sim=start_sim + sims_done,
+                results_store=results_store, run_id=run_id, checkpoint=checkpoint
+            )
+        else:
+            run_monte_carlo_simulation(
+                num_simulations - sims_done, circuit, weather_for_sim,
+                race_entries_template, enhanced_simulation, race_results_output_dir,
+                show_logs, save_logs, save_individual_races,
+                num_workers=num_workers, seed=base_seed, executor=simulation_pool,
+                accumulator=weather_accumulator, replay_level=replay_level,
+                output_writer=output_writer, profiler=profiler, start_sim=start_sim + sims_done, progress=progress,
+                race_results_format=race_results_format, results_store=results_store, run_id=run_id,
+                checkpoint=checkpoint, replay_format=replay_format, replay_archive=replay_archive
+            )
+        results_accumulator.merge(weather_accumulator, weather=weather_name)
+        weather_sims[weather_name] = start_sim + num_simulations
+        return True
+
+    try:
+        if target_precision is None:
+            for weather_name, start_sim, current_weather_sims in weather_slices:
+                if current_weather_sims == 0: continue
+                run_weather(weather_name, current_weather_sims, start_sim)
+        else:
+            max_sims_per_weather = max(1, sims_per_weather)
+            round_sims_per_weather = max(1, batch_size // num_weathers)
+            start_sim = 0
+            while start_sim < max_sims_per_weather:
+                current_weather_sims = min(round_sims_per_weather, max_sims_per_weather - start_sim)
+                ran_round = False
+                for weather_name in weather_names:
+                    ran_round = run_weather(weather_name, current_weather_sims, start_sim) or ran_round
+                start_sim += current_weather_sims
+                if not ran_round:
+                    # Finished before the checkpoint, and short of the target then.
+                    continue
+                achieved_precision = results_accumulator.precision()
+                progress.write(f"\nPrecision after {results_accumulator.num_simulations} simulations: +/-{achieved_precision:.2f} pp (target +/-{target_precision} pp)")
+                if achieved_precision <= target_precision:
+                    break
+    finally:
+        progress.close()
+        if simulation_pool is not None:
+            simulation_pool.shutdown()
+        if results_store is not None:
+            results_store.close()
+        if replay_archive is not None:
+            replay_archive.close()
+        # Everything queued must be on disk before the aggregated CSVs are written.
+        if profiler is not None:
+            phase_start = profiler.clock()
+        output_writer.close()
+        if profiler is not None:
+            profiler.mark('run.flush', phase_start)
+    if checkpointer is not None:
+        checkpointer.remove()
+    return results_accumulator
+
+def save_aggregated_results(final_df, final_p1_p20, circuit, total_simulations, race_results_output_dir):
+    """Writes the aggregated summary and the P1-P20 list as CSVs. Returns both file paths."""
+    agg_output_dir = os.path.join(race_results_output_dir, "results", "aggregated")
+    os.makedirs(agg_output_dir, exist_ok=True)
+
+    output_filename = f"SimResult_{circuit['name'].replace(' ', '')}_{total_simulations}runs_AllWeather.csv"
+    output_filepath = os.path.join(agg_output_dir, output_filename)
+    final_df.to_csv(output_filepath, index=False)
+
+    p1_p20_filename = f"Final_P1_P20_{circuit['name'].replace(' ', '')}_{total_simulations}runs.csv"
+    p1_p20_filepath = os.path.join(agg_output_dir, p1_p20_filename)
+    final_p1_p20.to_csv(p1_p20_filepath, index=False)
+    return output_filepath, p1_p20_filepath
+
+def save_weather_results(weather_df, circuit, total_simulations, race_results_output_dir):
+    """Writes the per-weather breakdown (see RaceResultAccumulator.weather_dataframe) as a CSV. Returns the file path."""
+    agg_output_dir = os.path.join(race_results_output_dir, "results", "aggregated")
+    os.makedirs(agg_output_dir, exist_ok=True)
+    weather_filename = f"SimWeather_{circuit['name'].replace(' ', '')}_{total_simulations}runs.csv"
+    weather_filepath = os.path.join(agg_output_dir, weather_filename)
+    weather_df.to_csv(weather_filepath, index=False)
+    return weather_filepath
+
+def save_precision_results(precision_df, circuit, total_simulations, race_results_output_dir):
+    """Writes the outcome probabilities with their confidence intervals (see precision_dataframe) as a CSV. Returns the file path."""
+    agg_output_dir = os.path.join(race_results_output_dir, "results", "aggregated")
+    os.makedirs(agg_output_dir, exist_ok=True)
+    precision_filename = f"SimPrecision_{circuit['name'].replace(' ', '')}_{total_simulations}runs.csv"
+    precision_filepath = os.path.join(agg_output_dir, precision_filename)
+    precision_df.to_csv(precision_filepath, index=False)
+    return precision_filepath
+
 # --- 5. Main Execution Block ---
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Headless run from a job spec, e.g. `python race_sim_adv.py jobs.toml` (see sim_jobs.py).
+        from sim_jobs import main as run_jobs_cli
+        sys.exit(run_jobs_cli(sys.argv[1:]))
+
     print("--- F1 Race Simulator Initializing ---")
-    teams_data = load_csv_data('TEAM DATA.csv')
-    drivers_data = load_csv_data('DRIVERS DATA.csv')
-    car_calculations_data = load_csv_data('CALCULATIONS.csv')
+    race_field = load_race_field()
 
-    if any(data is None for data in [teams_data, drivers_data, car_calculations_data]):
+    if race_field is None:
         print("\nExiting due to data loading errors. Please check file paths and integrity.")
+    elif input("Simulate full championship seasons over the whole calendar? (y/n): ").strip().lower() == 'y':
+        from season import run_season_simulation, save_season_results
+        try:
+            num_seasons = int(input(f"\nEnter number of seasons to simulate ({len(CIRCUIT_DATA)} races each, e.g., 1000): "))
+            use_enhanced = input("Use enhanced simulation features? (y/n): ").strip().lower() == 'y'
+            use_batch_engine = input("Use the vectorized batch engine? Much faster (y/n): ").strip().lower() == 'y'
+            default_workers = os.cpu_count() or 1
+            workers_answer = input(f"Number of worker processes (default {default_workers}): ").strip()
+            num_workers = int(workers_answer) if workers_answer else default_workers
+            seed_answer = input("Random seed (leave blank for a random run): ").strip()
+            base_seed = int(seed_answer) if seed_answer else random.randrange(2**32)
+        except ValueError:
+            print("Invalid input. Exiting.")
+            exit()
+
+        valid_drivers, race_entries_template = race_field
+        if not valid_drivers or num_seasons < 1:
+            print("Nothing to simulate. Please check the season count and team assignments in your CSVs.")
+        else:
+            season_results = run_season_simulation(
+                num_seasons, race_entries_template, valid_drivers, enhanced_simulation=use_enhanced,
+                use_batch_engine=use_batch_engine, num_workers=num_workers, seed=base_seed
+            )
+            drivers_df = season_results.drivers_dataframe()
+            constructors_df = season_results.constructors_dataframe()
+            print("\n" + "="*50)
+            print(f"--- DRIVERS' CHAMPIONSHIP ({num_seasons} SEASONS) ---")
+            print("="*50)
+            print(drivers_df.to_string(index=False))
+            print("\n" + "="*50)
+            print(f"--- CONSTRUCTORS' CHAMPIONSHIP ({num_seasons} SEASONS) ---")
+            print("="*50)
+            print(constructors_df.to_string(index=False))
+            drivers_filepath, constructors_filepath = save_season_results(drivers_df, constructors_df, num_seasons, os.path.join(os.getcwd(), "outputs"))
+            print(f"\nChampionship results saved to {drivers_filepath} and {constructors_filepath}")
     else:
         try:
             print("\nAvailable Circuits:")
@@ -827,90 +1736,84 @@ if __name__ == "__main__":
             chosen_circuit = CIRCUIT_DATA[circuit_choice]
             
             total_simulations = int(input("\nEnter total number of Monte Carlo simulations to run (e.g., 5000): "))
+            precision_answer = input("Stop early once every win/podium/points/DNF probability is within +/- this many percentage points (95% CI), e.g. 0.5 (leave blank to run them all): ").strip()
+            target_precision = float(precision_answer) if precision_answer else None
             use_enhanced = input("Use enhanced simulation features? (y/n): ").strip().lower() == 'y'
+            use_batch_engine = input("Use the vectorized batch engine? Much faster, but no replays or race logs (y/n): ").strip().lower() == 'y'
             
-            save_individual_races = input("Save individual race results to CSVs? (y/n): ").strip().lower() == 'y'
+            save_individual_races = input("Save individual race results to the race results database (results/races.sqlite)? (y/n): ").strip().lower() == 'y'
             save_logs = input("Save detailed race logs to text files? (y/n): ").strip().lower() == 'y'
             
             race_results_output_dir = os.path.join(os.getcwd(), "outputs")
             print(f"All simulation outputs, logs, and replays will be saved under: {race_results_output_dir}/")
 
             show_logs = input("Show detailed race logs for each simulation? (y/n): ").strip().lower() == 'y'
+            verbosity = 'verbose' if input("Print every race's result table instead of a progress line? (y/n): ").strip().lower() == 'y' else 'progress'
+            replay_level = input(f"Replay capture level {REPLAY_LEVELS} (default full): ").strip().lower() or 'full'
+            if replay_level not in REPLAY_LEVELS:
+                raise ValueError(replay_level)
 
+            default_workers = os.cpu_count() or 1
+            workers_answer = input(f"Number of worker processes (default {default_workers}): ").strip()
+            num_workers = int(workers_answer) if workers_answer else default_workers
+            seed_answer = input("Random seed (leave blank for a random run): ").strip()
+            base_seed = int(seed_answer) if seed_answer else random.randrange(2**32)
 
         except (ValueError, IndexError):
             print("Invalid input. Exiting.")
             exit()
         
-        valid_drivers = []
-        for d in drivers_data:
-            team_name = d.get('team_name', '').strip()
-            team_exists = any(t['team_name'].strip() == team_name for t in teams_data)
-            car_data_exists = any(cs.get('Team Name', '').strip() == team_name for cs in car_calculations_data)
-            if team_exists and car_data_exists:
-                valid_drivers.append(d)
-            else:
-                print(f"Skipping driver {d.get('driver_name', 'N/A')}: Team '{team_name}' not found in TEAM DATA or CALCULATIONS.")
-
-        if len(valid_drivers) < len(drivers_data):
-            print(f"\nWarning: Simulating for {len(valid_drivers)} of {len(drivers_data)} drivers with complete data.")
+        valid_drivers, race_entries_template = race_field
         if not valid_drivers:
             print("No valid drivers found. Please check team assignments in your CSVs.")
         else:
-            race_entries_template = []
-            for driver_data in valid_drivers:
-                team_name = driver_data['team_name'].strip()
-                team_info = next(t for t in teams_data if t['team_name'].strip() == team_name)
-                car_score_info = next(cs for cs in car_calculations_data if cs['Team Name'].strip() == team_name)
-                initial_strategy_for_template = random.choice(RACE_STRATEGY_TYPES)
-                entry = RaceEntry(driver_data, team_info, car_score_info, 0, initial_strategy_for_template)
-                race_entries_template.append(entry)
-
-            all_weather_conditions_list = list(WEATHER_CONDITIONS.items())
-            num_weathers = len(all_weather_conditions_list)
+            # Long runs save checkpoints; an interrupted run with the same settings can resume from its last one.
+            from checkpoint import sweep_checkpoint_path
+            from result_cache import run_cache_key
+            checkpoint_path = sweep_checkpoint_path(race_results_output_dir, chosen_circuit['name'], run_cache_key(
+                chosen_circuit, list(WEATHER_CONDITIONS), race_entries_template, total_simulations, int(seed_answer) if seed_answer else None,
+                use_enhanced, 'batch' if use_batch_engine else 'scalar', target_precision, ADAPTIVE_BATCH_SIZE))
+            resume = os.path.exists(checkpoint_path) and input(f"Found a checkpoint of an interrupted run with these settings ({checkpoint_path}). Resume it? (y/n): ").strip().lower() == 'y'
+            results_accumulator = run_weather_sweep(
+                total_simulations, chosen_circuit, race_entries_template, valid_drivers,
+                enhanced_simulation=use_enhanced, use_batch_engine=use_batch_engine,
+                race_results_output_dir=race_results_output_dir, show_logs=show_logs,
+                save_logs=save_logs, save_individual_races=save_individual_races,
+                num_workers=num_workers, seed=None if resume and not seed_answer else base_seed, replay_level=replay_level,
+                target_precision=target_precision, verbosity=verbosity, checkpoint_path=checkpoint_path, resume=resume
+            )
             
-            sims_per_weather = total_simulations // num_weathers
-            remainder_sims = total_simulations % num_weathers
-            
-            all_sim_results_across_weathers = []
-            for i, (weather_name, weather_data) in enumerate(all_weather_conditions_list):
-                current_weather_sims = sims_per_weather + (1 if i < remainder_sims else 0)
-                if current_weather_sims == 0: continue
-
-                weather_for_sim = weather_data.copy()
-                weather_for_sim["name"] = weather_name
-                if use_enhanced:
-                    weather_for_sim['variability'] = weather_data.get('variability', 0.1 if weather_name != 'Dry' else 0.05)
-                
-                results_for_this_weather = run_monte_carlo_simulation(
-                    current_weather_sims, chosen_circuit, weather_for_sim, 
-                    race_entries_template, use_enhanced, race_results_output_dir, 
-                    show_logs, save_logs, save_individual_races
-                )
-                all_sim_results_across_weathers.extend(results_for_this_weather)
-            
-            if all_sim_results_across_weathers:
-                final_df = aggregate_results(all_sim_results_across_weathers, valid_drivers)
+            if results_accumulator.num_simulations:
+                simulations_run = results_accumulator.num_simulations
+                final_df = results_accumulator.to_dataframe()
                 print("\n" + "="*50)
                 print("--- FINAL AGGREGATED RACE RESULTS (ALL WEATHER CONDITIONS) ---")
                 print("="*50)
                 print(final_df.to_string())
-                
-                agg_output_dir = os.path.join(race_results_output_dir, "results", "aggregated")
-                os.makedirs(agg_output_dir, exist_ok=True)
 
-                output_filename = f"SimResult_{chosen_circuit['name'].replace(' ', '')}_{total_simulations}runs_AllWeather.csv"
-                output_filepath = os.path.join(agg_output_dir, output_filename)
-                final_df.to_csv(output_filepath, index=False)
-                print(f"\nAggregated results saved to {output_filepath}")
+                precision_df = results_accumulator.precision_dataframe()
+                print("\n" + "="*50)
+                print(f"--- PRECISION AFTER {simulations_run} SIMULATIONS (95% CI, +/- {results_accumulator.precision():.2f} pp AT WORST) ---")
+                print("="*50)
+                print(precision_df.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+
+                weather_df = results_accumulator.weather_dataframe()
+                print("\n" + "="*50)
+                print("--- RESULTS BY WEATHER CONDITION ---")
+                print("="*50)
+                print(weather_df[['Weather', 'Driver', 'Races', 'Win (%)', 'Podium (%)', 'DNF (%)', 'Avg Points', 'Median Position']]
+                      .groupby('Weather', sort=False).head(5).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
 
                 final_p1_p20 = generate_final_p1_p20_list(final_df, len(valid_drivers))
+                output_filepath, p1_p20_filepath = save_aggregated_results(final_df, final_p1_p20, chosen_circuit, simulations_run, race_results_output_dir)
+                precision_filepath = save_precision_results(precision_df, chosen_circuit, simulations_run, race_results_output_dir)
+                weather_filepath = save_weather_results(weather_df, chosen_circuit, simulations_run, race_results_output_dir)
+                print(f"\nAggregated results saved to {output_filepath}")
+                print(f"Precision report saved to {precision_filepath}")
+                print(f"Per-weather breakdown saved to {weather_filepath}")
+
                 print("\n" + "="*50)
                 print("--- FINAL P1-P20 RACE RESULT ---")
                 print("="*50)
                 print(final_p1_p20.to_string(index=False))
-                
-                p1_p20_filename = f"Final_P1_P20_{chosen_circuit['name'].replace(' ', '')}_{total_simulations}runs.csv"
-                p1_p20_filepath = os.path.join(agg_output_dir, p1_p20_filename)
-                final_p1_p20.to_csv(p1_p20_filepath, index=False)
-                print(f"\nFinal P1-P20 race result saved to {p1_p20_filepath}")
\ No newline at end of file
+                print(f"\nFinal P1-P20 race result saved to {p1_p20_filepath}")
@@ -0,0 +1,48 @@
+class RaceStateIndex:
+    # Per-race lookups that are kept up to date as the race unfolds, so simulate_race does
+    # not rescan the whole field for them on every lap (or for every car).
+    #  - leader_laps: the most laps completed by any car so far.
+    #  - retired_last_lap: the cars that retired during the previous lap.
+    #  - team_groups: the entries of every team with more than one car, built once per race.
+    def __init__(self, entries):
+        self.leader_laps = max((e.laps_completed for e in entries), default=0)
+        self.retired_last_lap = []
+        self._retired_this_lap = []
+
+        teams = {}
+        for entry in entries:
+            teams.setdefault(entry.team_name, []).append(entry)
+        # Teams are kept in name order so seeded races replay identically in every process.
+        self.team_groups = [tuple(teams[team]) for team in sorted(teams) if len(teams[team]) > 1]
+
+    def complete_lap(self, entry):
+        # Counts a completed lap for the entry.
+        entry.laps_completed += 1
+        if entry.laps_completed > self.leader_laps:
+            self.leader_laps = entry.laps_completed
+
+    def record_dnf(self, entry):
+        # Records a car that has just retired.
+        self._retired_this_lap.append(entry)
+
+    def end_lap(self):
+        # Rolls this lap's retirements over into retired_last_lap.
+        self.retired_last_lap = self._retired_this_lap
+        self._retired_this_lap = []
+
+    def live_teammate_pairs(self):
+        # Yields (front, rear) for every team with exactly two cars still running, ordered by
+        # current_position. Team groups where a car has retired drop out automatically.
+        for group in self.team_groups:
+            if len(group) == 2:
+                front, rear = group
+                if front.is_dnf or rear.is_dnf:
+                    continue
+            else:
+                running = [e for e in group if not e.is_dnf]
+                if len(running) != 2:
+                    continue
+                front, rear = running
+            if rear.current_position < front.current_position:
+                front, rear = rear, front
+            yield front, rear
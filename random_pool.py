@@ -0,0 +1,68 @@
+from bisect import bisect
+from itertools import accumulate
+
+import numpy as np
+
+class RandomPool:
+    # Source of the scalar engine's random draws.
+    # Uniform floats are drawn from a NumPy Generator in blocks into a preallocated buffer, and
+    # random() hands them out one at a time: it is the buffer's own pop(), so a draw is a single
+    # C call with no Python frame. The buffer is never replaced (seed() and reserve() work in
+    # place), so random stays valid for the life of the pool.
+    # The buffer is not refilled on demand: callers that draw more than reserve() promised get an
+    # IndexError. seed() reserves one block, which covers arming a grid or a single engine call;
+    # simulate_race reserves its worst case at the start of every lap.
+    # uniform, randint, choice, choices and shuffle use the same formulas as the random module on
+    # top of random(), so every distribution in the race model is unchanged. Only the stream is
+    # different, so a given seed produces different races than it did with the random module.
+    # An antithetic stream hands out (1 - u) mod 1 for every draw u of the same seed's plain
+    # stream, which is again uniform on [0, 1) but negatively correlated with it.
+    def __init__(self, seed=None, block_size=4096):
+        self.block_size = block_size
+        self._buffer = []
+        self.random = self._buffer.pop
+        self.seed(seed)
+
+    def seed(self, seed=None, antithetic=False):
+        """Restarts the stream from a new NumPy Generator seeded with seed (its antithetic twin if antithetic)."""
+        self._generator = np.random.default_rng(seed)
+        self.antithetic = antithetic
+        self._buffer.clear()
+        self.reserve(self.block_size)
+
+    def reserve(self, n):
+        """Makes sure at least n draws are buffered."""
+        if len(self._buffer) < n:
+            # pop() takes from the end, so the new block goes in front of the draws still buffered.
+            block = self._generator.random(max(n, self.block_size))
+            if self.antithetic:
+                block = (1.0 - block) % 1.0
+            self._buffer[:0] = block.tolist()
+
+    def uniform(self, a, b):
+        return a + (b - a) * self.random()
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def choices(self, population, weights=None, k=1):
+        if weights is None:
+            n = len(population)
+            return [population[int(self.random() * n)] for _ in range(k)]
+        cum_weights = list(accumulate(weights))
+        total = cum_weights[-1]
+        hi = len(cum_weights) - 1
+        return [population[bisect(cum_weights, self.random() * total, 0, hi)] for _ in range(k)]
+
+    def shuffle(self, x):
+        # Fisher-Yates, as random.shuffle.
+        for i in reversed(range(1, len(x))):
+            j = int(self.random() * (i + 1))
+            x[i], x[j] = x[j], x[i]
+
+# The stream used by the scalar engine (race_sim_adv, ers_management, team_orders).
+# run_single_simulation re-seeds it for every simulation.
+ENGINE_RNG = RandomPool()
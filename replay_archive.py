@@ -0,0 +1,277 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Replay archives: all the replays of a run in one append-only file, instead of one
+# Sim_{n}_Replay.json per race.
+# The file starts with ARCHIVE_MAGIC, followed by framed records (a 1-byte kind and a 4-byte
+# length, then the zlib-compressed JSON payload). A race is a RACE record (the replay without
+# its laps, plus its sim number, weather and tags) followed by LAPS records of up to
+# LAP_BLOCK_SIZE laps each, so a lap range is read without decompressing the rest of the race.
+# Closing the archive appends an INDEX record (every race's sim, weather, tags and record
+# offsets) and a trailer pointing at it. A reader maps the file into memory and decompresses
+# only the records it is asked for. An archive whose run was killed before closing has no
+# index; readers rebuild it by scanning the records, and reopening it for writing drops any
+# half-written race and carries on appending.
+# export writes a single race back out as the replay JSON the dashboard plays back.
+
+# How replays are saved: one archive per run, or the legacy JSON file per race.
+REPLAY_FORMATS = ('archive', 'json')
+ARCHIVE_EXTENSION = '.f1replays'
+ARCHIVE_MAGIC = b'F1RPLAY1'
+INDEX_MAGIC = b'F1RPIDX1'
+LAP_BLOCK_SIZE = 10
+
+RACE, LAPS, INDEX = 1, 2, 3
+_FRAME = struct.Struct('<BI')
+_TRAILER = struct.Struct('<Q8s')
+
+def replay_archive_path(output_dir, circuit_name, run_id):
+    """Where a run writing under output_dir keeps the replay archive of circuit_name."""
+    return os.path.join(output_dir, "replays", circuit_name.replace(' ', '_'), f"{run_id}{ARCHIVE_EXTENSION}")
+
+def replay_tags(replay_data):
+    """Index tags of a race: its winner, the winner's grid slot, the pole sitter and the number of DNFs."""
+    final_standings = replay_data['final_standings']
+    winner = final_standings[0]['driver'] if final_standings else None
+    grid = {row['driver']: row['position'] for row in replay_data['starting_grid']}
+    return {
+        'winner': winner,
+        'winner_grid': grid.get(winner),
+        'pole': min(grid, key=grid.get) if grid else None,
+        'dnfs': sum(1 for row in final_standings if row['dnf']),
+    }
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+def _unpack(buffer, offset, length):
+    return json.loads(zlib.decompress(buffer[offset:offset + length]))
+
+def _read_index(buffer):
+    """Returns (index entries, end of the last complete race) of an archive's contents."""
+    if len(buffer) < len(ARCHIVE_MAGIC) or buffer[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+        raise ValueError("Not a replay archive.")
+    if len(buffer) >= len(ARCHIVE_MAGIC) + _TRAILER.size:
+        index_offset, magic = _TRAILER.unpack_from(buffer, len(buffer) - _TRAILER.size)
+        if magic == INDEX_MAGIC:
+            kind, length = _FRAME.unpack_from(buffer, index_offset)
+            return _unpack(buffer, index_offset + _FRAME.size, length), index_offset
+    return _scan(buffer)
+
+def _scan(buffer):
+    # Rebuilds the index of an archive that was not closed, up to its last complete race.
+    entries = []
+    offset = end = len(ARCHIVE_MAGIC)
+    entry = None
+    while offset + _FRAME.size <= len(buffer):
+        kind, length = _FRAME.unpack_from(buffer, offset)
+        data_offset = offset + _FRAME.size
+        if data_offset + length > len(buffer) or kind not in (RACE, LAPS):
+            break
+        if kind == RACE:
+            header = _unpack(buffer, data_offset, length)
+            entry = {'sim': header['sim'], 'weather': header['weather'], 'tags': header['tags'],
+                     'laps': header['laps'], 'offset': data_offset, 'length': length, 'blocks': [], '_blocks': header['blocks']}
+        elif entry is not None:
+            entry['blocks'].append([data_offset, length])
+        offset = data_offset + length
+        if entry is not None and len(entry['blocks']) == entry['_blocks']:
+            del entry['_blocks']
+            entries.append(entry)
+            entry = None
+            end = offset
+    return entries, end
+
+def _latest(entries):
+    # A race archived twice (e.g. rerun after resuming from a checkpoint) is read from its last copy.
+    return {(entry['weather'], entry['sim']): entry for entry in entries}
+
+class ReplayArchive:
+    # Appends replays to an archive file on a background thread, so the simulation loop only
+    # hands them over. At most max_pending replays wait to be written; adding more blocks
+    # until one is done. Opening an existing archive appends to it. close() (or leaving a
+    # with block) writes the index.
+    def __init__(self, path, max_pending=64):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._entries = []
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                self._entries, end = _read_index(f.read())
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(ARCHIVE_MAGIC)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='replay-archive')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = []
+        self._closed = False
+
+    def add(self, sim_num, weather_name, replay_data):
+        """Queues one race's replay; sim_num is 0-based and archived 1-based, as in replay file names."""
+        if self._closed:
+            raise RuntimeError("ReplayArchive is closed.")
+        self._slots.acquire()
+        self._pending.append(self._executor.submit(self._append, sim_num + 1, weather_name, replay_data))
+
+    def _append(self, sim, weather_name, replay_data):
+        try:
+            laps_data = replay_data.get('laps_data')
+            blocks = [] if laps_data is None else [_pack(laps_data[i:i + LAP_BLOCK_SIZE]) for i in range(0, len(laps_data), LAP_BLOCK_SIZE)]
+            header = {
+                'sim': sim, 'weather': weather_name, 'tags': replay_tags(replay_data),
+                'laps': None if laps_data is None else len(laps_data), 'blocks': len(blocks),
+                'replay': {key: value for key, value in replay_data.items() if key != 'laps_data'},
+            }
+            entry = {'sim': sim, 'weather': weather_name, 'tags': header['tags'], 'laps': header['laps'], 'blocks': []}
+            entry['offset'], entry['length'] = self._write(RACE, _pack(header))
+            for block in blocks:
+                entry['blocks'].append(list(self._write(LAPS, block)))
+            self._entries.append(entry)
+        finally:
+            self._slots.release()
+
+    def _write(self, kind, payload):
+        self._file.write(_FRAME.pack(kind, len(payload)))
+        offset = self._file.tell()
+        self._file.write(payload)
+        return offset, len(payload)
+
+    def flush(self):
+        """Blocks until every queued replay is in the file. Raises the first write error, if any."""
+        pending, self._pending = self._pending, []
+        wait(pending)
+        self._file.flush()
+        for future in pending:
+            future.result()
+
+    def close(self):
+        """Writes the queued replays and the index, and closes the file."""
+        if self._closed:
+            return
+        try:
+            self.flush()
+            index_offset = self._file.tell()
+            self._write(INDEX, _pack(self._entries))
+            self._file.write(_TRAILER.pack(index_offset, INDEX_MAGIC))
+        finally:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class ReplayArchiveReader:
+    # Random access to the races of an archive through a read-only memory map.
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        entries, _ = _read_index(self._map)
+        self._index = _latest(entries)
+
+    def entries(self, weather=None, **tags):
+        """Index entries (sim, weather, tags, laps), in archive order, filtered by weather and tag values, e.g. winner='Max Verstappen'."""
+        return [
+            {key: entry[key] for key in ('sim', 'weather', 'tags', 'laps')}
+            for entry in self._index.values()
+            if (weather is None or entry['weather'] == weather) and all(entry['tags'].get(tag) == value for tag, value in tags.items())
+        ]
+
+    def _entry(self, sim, weather):
+        try:
+            return self._index[(weather, sim)]
+        except KeyError:
+            raise KeyError(f"No replay of sim {sim} in {weather} conditions in {self.path}.") from None
+
+    def race(self, sim, weather):
+        """The full replay of a race (sim is 1-based), as written to Sim_{sim}_Replay.json."""
+        entry = self._entry(sim, weather)
+        replay = _unpack(self._map, entry['offset'], entry['length'])['replay']
+        if entry['laps'] is None:
+            return replay
+        laps_data = [lap for offset, length in entry['blocks'] for lap in _unpack(self._map, offset, length)]
+        # laps_data sits between the starting grid and the events, as simulate_race builds it.
+        keys = list(replay)
+        keys.insert(keys.index('starting_grid') + 1, 'laps_data')
+        return {key: laps_data if key == 'laps_data' else replay[key] for key in keys}
+
+    def laps(self, sim, weather, first_lap=1, last_lap=None):
+        """Laps first_lap to last_lap (inclusive, 1-based) of a race, decompressing only the blocks holding them."""
+        entry = self._entry(sim, weather)
+        if entry['laps'] is None:
+            raise ValueError(f"Sim {sim} in {weather} conditions was archived without lap-by-lap data.")
+        last_lap = entry['laps'] if last_lap is None else min(last_lap, entry['laps'])
+        laps = []
+        for block in range((first_lap - 1) // LAP_BLOCK_SIZE, (last_lap - 1) // LAP_BLOCK_SIZE + 1):
+            offset, length = entry['blocks'][block]
+            laps.extend(_unpack(self._map, offset, length))
+        first_in_block = (first_lap - 1) // LAP_BLOCK_SIZE * LAP_BLOCK_SIZE + 1
+        return laps[first_lap - first_in_block:last_lap - first_in_block + 1]
+
+    def export(self, sim, weather, filepath):
+        """Writes one race as a replay JSON file (the dashboard's format)."""
+        with open(filepath, 'w') as f:
+            json.dump(self.race(sim, weather), f)
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the races of a replay archive or export one as replay JSON.")
+    parser.add_argument('archive', help=f"path to a {ARCHIVE_EXTENSION} file")
+    parser.add_argument('--weather', help="only races in this weather condition")
+    parser.add_argument('--winner', help="only races won by this driver")
+    parser.add_argument('--sim', type=int, help="export this sim (1-based, needs --weather)")
+    parser.add_argument('--laps', help="with --sim, print only this lap range, e.g. 10-20")
+    parser.add_argument('--output', '-o', help="with --sim, the replay JSON file to write")
+    args = parser.parse_args(argv)
+
+    with ReplayArchiveReader(args.archive) as archive:
+        if args.sim is None:
+            tags = {'winner': args.winner} if args.winner else {}
+            for entry in archive.entries(args.weather, **tags):
+                t = entry['tags']
+                print(f"Sim {entry['sim']:>6}  {entry['weather']:<11} winner {t['winner']} (from P{t['winner_grid']}), pole {t['pole']}, {t['dnfs']} DNFs")
+            return 0
+        if args.weather is None:
+            parser.error("--sim needs --weather.")
+        if args.laps:
+            first_lap, _, last_lap = args.laps.partition('-')
+            laps = archive.laps(args.sim, args.weather, int(first_lap), int(last_lap or first_lap))
+            json.dump(laps, sys.stdout, indent=1)
+            print()
+            return 0
+        filepath = args.output or f"Sim_{args.sim}_Replay.json"
+        archive.export(args.sim, args.weather, filepath)
+        print(f"Replay of sim {args.sim} ({args.weather}) saved to {filepath}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
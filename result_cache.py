@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+from ers_management import ERS_MODES
+from race_strategy import RACE_STRATEGY_TYPES
+from weather_transitions import WEATHER_TRANSITIONS
+from race_sim_adv import ENGINE_VERSION, RaceResultAccumulator, prepare_weather
+
+# Content-addressed cache of aggregated Monte Carlo results.
+# An entry is the saved RaceResultAccumulator of one seeded run, stored under the SHA-256 of
+# everything that run's results depend on: every driver's static profile as loaded from the
+# team, driver and car CSVs, the circuit and weather dicts, the strategy, weather transition
+# and ERS tables, ENGINE_VERSION, the engine and the run settings (sims, seed, enhanced,
+# target precision). Any change to an input therefore gives a new key, and stale entries are
+# simply never read again and age out.
+# The cache is bounded by max_bytes on disk and evicts the least recently used entries; a hit
+# refreshes the entry's modification time, which is what recency is measured by.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'race_sim')
+DEFAULT_CACHE_MAX_BYTES = 256 * 2**20
+CACHE_EXTENSION = '.npz'
+
+def _json_default(value):
+    # NumPy scalars from the CSV loader become plain numbers; anything else its text.
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def run_cache_key(circuit, weather_names, race_entries_template, simulations, seed, enhanced_simulation=False,
+                  engine='scalar', target_precision=None, batch_size=None):
+    """
+    Returns the cache key of a weather sweep (see run_weather_sweep) with these settings.
+    batch_size only matters, and is only part of the key, when a target_precision is set.
+    """
+    inputs = {
+        'engine_version': ENGINE_VERSION,
+        'engine': engine,
+        'circuit': circuit,
+        'weathers': [prepare_weather(name, enhanced_simulation) for name in weather_names],
+        'race_field': [entry.profile._asdict() for entry in race_entries_template],
+        'strategies': RACE_STRATEGY_TYPES,
+        'weather_transitions': WEATHER_TRANSITIONS,
+        'ers_modes': ERS_MODES,
+        'simulations': simulations,
+        'seed': seed,
+        'enhanced': enhanced_simulation,
+        'target_precision': target_precision,
+        'batch_size': batch_size if target_precision is not None else None,
+    }
+    encoded = json.dumps(inputs, sort_keys=True, default=_json_default).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+class ResultCache:
+    # Aggregated results on disk, one .npz file per key, with size-bounded LRU eviction.
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_EXTENSION)
+
+    def get(self, key):
+        """Returns the cached RaceResultAccumulator for key, or None on a miss."""
+        filepath = self._path(key)
+        try:
+            accumulator = RaceResultAccumulator.load(filepath)
+        except (OSError, ValueError, KeyError):
+            # Missing, or unreadable (e.g. truncated); a fresh run will replace it.
+            return None
+        os.utime(filepath)
+        return accumulator
+
+    def put(self, key, accumulator):
+        """Stores an accumulator under key, then evicts least recently used entries beyond max_bytes."""
+        accumulator.save(self._path(key))
+        self.evict()
+
+    def entries(self):
+        """(path, size in bytes, last use time) of every entry, least recently used first."""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(CACHE_EXTENSION):
+                    filepath = os.path.join(self.cache_dir, name)
+                    try:
+                        stat = os.stat(filepath)
+                    except OSError:
+                        continue
+                    entries.append((filepath, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for filepath, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Deletes every entry."""
+        for filepath, _, _ in self.entries():
+            os.remove(filepath)
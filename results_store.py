@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import time
+import uuid
+
+import numpy as np
+
+from race_strategy import RACE_STRATEGY_TYPES
+from race_sim_adv import assign_points
+from batch_engine import COMPOUNDS, DNF_REASONS
+
+# Individual race results are stored in a single SQLite database (results/races.sqlite under
+# the output directory) instead of one CSV per race. Every run gets a run id; race_results
+# holds one row per driver per race, partitioned by (run_id, circuit, weather) through its
+# leading index, and indexed by outcome so questions like "all wins from P10 or lower on the
+# grid" are answered without scanning every race:
+#   SELECT * FROM race_results WHERE position = 1 AND grid >= 10
+# Rows are buffered and inserted in batches of batch_rows, one transaction per batch.
+
+# How individual race results are saved: the SQLite store, or the legacy per-race CSVs.
+RACE_RESULT_FORMATS = ('sqlite', 'csv')
+RACE_STORE_FILENAME = 'races.sqlite'
+
+RACE_RESULT_FIELDS = (
+    'run_id', 'circuit', 'weather', 'sim', 'driver', 'team', 'grid', 'position', 'points',
+    'strategy', 'compound', 'pits', 'laps', 'time_s', 'dnf', 'dnf_reason'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    circuit TEXT NOT NULL,
+    seed INTEGER,
+    engine TEXT,
+    enhanced INTEGER,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS race_results (
+    run_id TEXT NOT NULL,
+    circuit TEXT NOT NULL,
+    weather TEXT NOT NULL,
+    sim INTEGER NOT NULL,
+    driver TEXT NOT NULL,
+    team TEXT,
+    grid INTEGER,
+    position INTEGER,
+    points INTEGER,
+    strategy TEXT,
+    compound TEXT,
+    pits INTEGER,
+    laps INTEGER,
+    time_s REAL,
+    dnf INTEGER,
+    dnf_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS race_results_partition ON race_results (run_id, circuit, weather, sim);
+CREATE INDEX IF NOT EXISTS race_results_outcome ON race_results (position, grid);
+CREATE INDEX IF NOT EXISTS race_results_driver ON race_results (driver, position);
+"""
+
+def new_run_id():
+    """A fresh run id: the start time plus a random suffix, e.g. '20250301-141502-3fa85f64'."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+def race_store_path(race_results_output_dir):
+    """Where a run writing under race_results_output_dir keeps its race results store."""
+    return os.path.join(race_results_output_dir, "results", RACE_STORE_FILENAME)
+
+class RaceResultStore:
+    # Appends race results to a SQLite database in batches. Use one store per process; close()
+    # (or leaving a with block) writes the rows still buffered.
+    def __init__(self, path, batch_rows=20000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_rows = batch_rows
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        self._pending = []
+        self._insert = f"INSERT INTO race_results ({', '.join(RACE_RESULT_FIELDS)}) VALUES ({', '.join('?' * len(RACE_RESULT_FIELDS))})"
+
+    def start_run(self, circuit_name, seed=None, engine='scalar', enhanced=False, run_id=None):
+        """Registers a run and returns its id (a fresh timestamped id unless run_id is given)."""
+        if run_id is None:
+            run_id = new_run_id()
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs (run_id, circuit, seed, engine, enhanced, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, circuit_name, seed, engine, int(enhanced), time.strftime('%Y-%m-%dT%H:%M:%S'))
+            )
+        return run_id
+
+    def add_race(self, run_id, circuit_name, weather_name, sim_num, final_results):
+        """Queues one finished race (its RaceEntry objects); sim_num is 0-based and stored 1-based, as in file names."""
+        sim = sim_num + 1
+        self._pending.extend(
+            (run_id, circuit_name, weather_name, sim, e.driver_name, e.team_name.strip(), e.initial_position,
+             e.current_position, 0 if e.is_dnf else assign_points(e.current_position),
+             e.assigned_strategy_type['name'], e.current_tire_compound, e.pit_stops_made, e.laps_completed,
+             round(e.total_race_time_s, 3), int(e.is_dnf), e.dnf_reason if e.is_dnf else '')
+            for e in final_results
+        )
+        if len(self._pending) >= self.batch_rows:
+            self.flush()
+
+    def add_batch(self, run_id, circuit_name, weather_name, first_sim_num, batch_result):
+        """Queues every race of a batch_engine.BatchRaceResult, numbered from first_sim_num."""
+        n_sims, n_drivers = batch_result.positions.shape
+        points_by_position = np.array([assign_points(pos) for pos in range(n_drivers + 2)])
+        points = np.where(batch_result.is_dnf, 0, points_by_position[np.minimum(batch_result.positions, n_drivers + 1)])
+        strategy_names = [s['name'] for s in RACE_STRATEGY_TYPES]
+        team_names = [team.strip() for team in batch_result.team_names]
+        sims = np.repeat(np.arange(first_sim_num + 1, first_sim_num + n_sims + 1), n_drivers)
+        drivers = np.tile(np.arange(n_drivers), n_sims)
+        columns = zip(
+            sims.tolist(), drivers.tolist(), batch_result.grid_positions.ravel().tolist(), batch_result.positions.ravel().tolist(),
+            points.ravel().tolist(), batch_result.strategy.ravel().tolist(), batch_result.tire_compound.ravel().tolist(),
+            batch_result.pit_stops_made.ravel().tolist(), batch_result.laps_completed.ravel().tolist(),
+            np.round(batch_result.total_race_time_s, 3).ravel().tolist(), batch_result.is_dnf.ravel().tolist(),
+            batch_result.dnf_reason.ravel().tolist()
+        )
+        self._pending.extend(
+            (run_id, circuit_name, weather_name, sim, batch_result.driver_names[d], team_names[d], grid, position, pts,
+             strategy_names[strategy], COMPOUNDS[compound], pits, laps, time_s, int(dnf), DNF_REASONS[reason] if dnf else '')
+            for sim, d, grid, position, pts, strategy, compound, pits, laps, time_s, dnf, reason in columns
+        )
+        if len(self._pending) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Inserts every buffered row in one transaction."""
+        if self._pending:
+            with self._connection:
+                self._connection.executemany(self._insert, self._pending)
+            self._pending = []
+
+    def delete_races(self, run_id, weather_name, after_sim):
+        """Deletes a run's races in a weather beyond its first after_sim sims, e.g. the ones a resumed run simulates again."""
+        self.flush()
+        with self._connection:
+            self._connection.execute("DELETE FROM race_results WHERE run_id = ? AND weather = ? AND sim > ?", (run_id, weather_name, after_sim))
+
+    def query(self, sql, params=()):
+        """Runs a SQL query against the store (buffered rows are written first) and returns the rows."""
+        self.flush()
+        return self._connection.execute(sql, params).fetchall()
+
+    def dataframe(self, sql="SELECT * FROM race_results", params=()):
+        """Runs a SQL query and returns the result as a pandas DataFrame."""
+        import pandas as pd
+        self.flush()
+        return pd.read_sql_query(sql, self._connection, params=params)
+
+    def races(self, run_id=None, circuit=None, weather=None):
+        """All stored rows of a run, circuit and/or weather (every row if none is given) as a DataFrame."""
+        filters = [(column, value) for column, value in (('run_id', run_id), ('circuit', circuit), ('weather', weather)) if value is not None]
+        where = f" WHERE {' AND '.join(f'{column} = ?' for column, _ in filters)}" if filters else ''
+        return self.dataframe(f"SELECT * FROM race_results{where} ORDER BY run_id, circuit, weather, sim, position", tuple(value for _, value in filters))
+
+    def close(self):
+        """Writes the buffered rows and closes the database."""
+        if self._connection is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,76 @@
+class RunningOrder:
+    # Maintains the cars still in the race ordered by total race time, plus the retired cars.
+    # The order is kept across laps instead of being rebuilt with a full sort: after a lap only
+    # a few cars change places, so it is repaired with a local insertion pass, and a car that
+    # drops back (team order, overtake) is moved with adjacent swaps.
+    # reorder() breaks exact time ties by entry_index, like a stable sort of the entry list.
+    def __init__(self, entries):
+        # Entries must carry their entry_index (simulate_race assigns it before building this).
+        self.cars = sorted((e for e in entries if not e.is_dnf), key=lambda x: x.total_race_time_s)
+        self.retired = [e for e in entries if e.is_dnf]
+
+    def __len__(self):
+        return len(self.cars)
+
+    def __iter__(self):
+        return iter(self.cars)
+
+    def __getitem__(self, index):
+        return self.cars[index]
+
+    @property
+    def leader(self):
+        return self.cars[0] if self.cars else None
+
+    def gap_to_front(self, index):
+        # Time gap from the car at index to the car directly ahead (inf for the leader).
+        if index == 0:
+            return float('inf')
+        return self.cars[index].total_race_time_s - self.cars[index - 1].total_race_time_s
+
+    def gap_to_rear(self, index):
+        # Time gap from the car at index to the car directly behind (inf for the last car).
+        if index == len(self.cars) - 1:
+            return float('inf')
+        return self.cars[index + 1].total_race_time_s - self.cars[index].total_race_time_s
+
+    def remove_retired(self):
+        # Moves cars that have retired since the last call out of the running order.
+        if any(car.is_dnf for car in self.cars):
+            self.retired.extend(car for car in self.cars if car.is_dnf)
+            self.cars = [car for car in self.cars if not car.is_dnf]
+
+    def reorder(self):
+        # Restores time order after every car's time has changed (e.g. after a lap).
+        # Insertion pass: O(n) when nothing changed, plus one step per place gained.
+        cars = self.cars
+        for i in range(1, len(cars)):
+            car = cars[i]
+            race_time = car.total_race_time_s
+            j = i - 1
+            while j >= 0 and (cars[j].total_race_time_s > race_time or
+                              (cars[j].total_race_time_s == race_time and cars[j].entry_index > car.entry_index)):
+                cars[j + 1] = cars[j]
+                j -= 1
+            cars[j + 1] = car
+
+    def drop_back(self, index):
+        # Moves the car at index behind every car that is now quicker than it, after its time
+        # has been increased. Returns the car's new index.
+        cars = self.cars
+        car = cars[index]
+        race_time = car.total_race_time_s
+        last = len(cars) - 1
+        while index < last and cars[index + 1].total_race_time_s < race_time:
+            cars[index] = cars[index + 1]
+            index += 1
+        cars[index] = car
+        return index
+
+    def assign_positions(self):
+        for i, car in enumerate(self.cars):
+            car.current_position = i + 1
+
+    def standings(self):
+        # Running cars in order, followed by retired cars (most laps first, then by time).
+        return self.cars + sorted(self.retired, key=lambda x: (-x.laps_completed, x.total_race_time_s))
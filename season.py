@@ -0,0 +1,206 @@
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from circuit_data import CIRCUIT_DATA
+from weather_conditions import WEATHER_CONDITIONS
+from race_sim_adv import assign_points, create_sim_entries, prepare_weather, run_single_simulation
+from progress import ProgressReporter
+
+# Full-season championship simulation.
+# Every season runs one race at each circuit of the calendar. The work is scheduled per circuit
+# across worker processes: a task runs one circuit for a block of seasons and returns the
+# classified positions, which are turned into drivers' and constructors' points here.
+# Each race's weather is drawn per (season, circuit) from the base seed, and scalar races are
+# seeded per race, so a seeded season run gives the same championships for any worker count.
+
+_worker_sim_entries = None
+
+def _init_season_worker(race_entries_template):
+    global _worker_sim_entries
+    _worker_sim_entries = create_sim_entries(race_entries_template)
+
+def simulate_circuit_races(sim_entries, circuit, circuit_number, season_nums, weather_indices, enhanced_simulation=False, use_batch_engine=False, base_seed=0, batch_size=4096):
+    """
+    Runs one race at the circuit for each season in season_nums, in the weather given by the
+    matching entry of weather_indices (an index into WEATHER_CONDITIONS).
+    Returns an (n_seasons, n_drivers) array of classified positions in entry order, with 0
+    for a DNF.
+    """
+    weather_names = list(WEATHER_CONDITIONS)
+    positions = np.zeros((len(season_nums), len(sim_entries)), dtype=np.int64)
+    if use_batch_engine:
+        from batch_engine import simulate_race_batch
+        for weather_index in np.unique(weather_indices):
+            weather = prepare_weather(weather_names[weather_index], enhanced_simulation)
+            rng = np.random.default_rng([base_seed, circuit_number, int(weather_index)])
+            rows = np.flatnonzero(weather_indices == weather_index)
+            for start in range(0, len(rows), batch_size):
+                batch_rows = rows[start:start + batch_size]
+                batch = simulate_race_batch(circuit, weather, sim_entries, len(batch_rows), enhanced_simulation, rng)
+                positions[batch_rows] = np.where(batch.is_dnf, 0, batch.positions)
+    else:
+        weathers = {}
+        for row, (season_num, weather_index) in enumerate(zip(season_nums, weather_indices)):
+            weather_name = weather_names[weather_index]
+            if weather_name not in weathers:
+                weathers[weather_name] = prepare_weather(weather_name, enhanced_simulation)
+            final_results, _, _ = run_single_simulation(
+                int(season_num), circuit, weathers[weather_name], sim_entries, enhanced_simulation,
+                base_seed, replay_level='none', log_events=False
+            )
+            for entry in final_results:
+                positions[row, entry.entry_index] = 0 if entry.is_dnf else entry.current_position
+    return positions
+
+def _run_season_task(circuit, circuit_number, season_nums, weather_indices, enhanced_simulation, use_batch_engine, base_seed):
+    positions = simulate_circuit_races(_worker_sim_entries, circuit, circuit_number, season_nums, weather_indices, enhanced_simulation, use_batch_engine, base_seed)
+    return season_nums, positions
+
+class SeasonAccumulator:
+    """
+    Championship points per simulated season, for every driver and constructor.
+    Keeps one row of points and wins per season, so title odds, championship positions and
+    points distributions (percentiles) can be reported once all races are in.
+    Championship ties are broken on wins, then on entry order.
+    """
+    def __init__(self, all_drivers, num_seasons):
+        self.driver_names = [d['driver_name'] for d in all_drivers]
+        self.team_names = [d.get('team_name', 'N/A').strip() for d in all_drivers]
+        self.constructor_names = list(dict.fromkeys(self.team_names))
+        num_drivers = len(self.driver_names)
+        self.num_seasons = num_seasons
+        self.races_added = 0
+        self.seed = None
+        self.driver_points = np.zeros((num_seasons, num_drivers), dtype=np.int64)
+        self.driver_wins = np.zeros((num_seasons, num_drivers), dtype=np.int64)
+        # Maps drivers to constructors: constructor points = driver points @ team_matrix.
+        self.team_matrix = np.zeros((num_drivers, len(self.constructor_names)), dtype=np.int64)
+        for i, team_name in enumerate(self.team_names):
+            self.team_matrix[i, self.constructor_names.index(team_name)] = 1
+        # Index 0 is a DNF.
+        self._points_by_position = np.array([0] + [assign_points(pos) for pos in range(1, num_drivers + 1)], dtype=np.int64)
+
+    def add_races(self, season_nums, positions):
+        """Adds one race per listed season; positions as returned by simulate_circuit_races."""
+        self.driver_points[season_nums] += self._points_by_position[positions]
+        self.driver_wins[season_nums] += positions == 1
+        self.races_added += len(season_nums)
+
+    @property
+    def constructor_points(self):
+        return self.driver_points @ self.team_matrix
+
+    @property
+    def constructor_wins(self):
+        return self.driver_wins @ self.team_matrix
+
+    @staticmethod
+    def _championship_positions(points, wins):
+        # Ranks each season (row) by points, then wins; ties beyond that keep entry order.
+        key = points * (int(wins.max(initial=0)) + 1) + wins
+        order = np.argsort(-key, axis=1, kind='stable')
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, np.arange(1, order.shape[1] + 1)[None, :], axis=1)
+        return positions
+
+    def _standings_dataframe(self, names, teams, points, wins, name_column):
+        import pandas as pd
+        championship_positions = self._championship_positions(points, wins)
+        rows = []
+        for i, name in enumerate(names):
+            season_points = points[:, i]
+            p10, p50, p90 = np.percentile(season_points, [10, 50, 90])
+            row = {name_column: name}
+            if teams is not None:
+                row['Team'] = teams[i]
+            row.update({
+                'Title Probability (%)': (championship_positions[:, i] == 1).mean() * 100,
+                'Avg Championship Position': championship_positions[:, i].mean(),
+                'Avg Points': season_points.mean(),
+                'Std Points': season_points.std(),
+                'Min Points': int(season_points.min()),
+                'P10 Points': p10,
+                'Median Points': p50,
+                'P90 Points': p90,
+                'Max Points': int(season_points.max()),
+                'Avg Wins': wins[:, i].mean(),
+            })
+            rows.append(row)
+        return pd.DataFrame(rows).sort_values(by=['Title Probability (%)', 'Avg Points'], ascending=[False, False]).reset_index(drop=True)
+
+    def drivers_dataframe(self):
+        """Drivers' championship summary: title odds, championship position and points distribution."""
+        return self._standings_dataframe(self.driver_names, self.team_names, self.driver_points, self.driver_wins, 'Driver')
+
+    def constructors_dataframe(self):
+        """Constructors' championship summary, with the same columns as drivers_dataframe()."""
+        return self._standings_dataframe(self.constructor_names, None, self.constructor_points, self.constructor_wins, 'Team')
+
+def run_season_simulation(num_seasons, race_entries_template, valid_drivers, circuits=None, enhanced_simulation=False, use_batch_engine=False, num_workers=1, seed=None, verbosity='progress'):
+    """
+    Simulates num_seasons championships over the calendar (all of CIRCUIT_DATA by default) and
+    returns the filled SeasonAccumulator.
+    With num_workers > 1 the circuits are simulated in parallel worker processes, each of which
+    builds its race entries from the shared templates once.
+    verbosity (see progress.VERBOSITY_LEVELS) sets the console output; progress is reported
+    as each block of races finishes, labelled with its circuit.
+    """
+    circuits = list(CIRCUIT_DATA) if circuits is None else list(circuits)
+    base_seed = seed if seed is not None else random.randrange(2**32)
+    accumulator = SeasonAccumulator(valid_drivers, num_seasons)
+    total_races = num_seasons * len(circuits)
+    progress = ProgressReporter(total_races, verbosity=verbosity)
+    progress.write(f"\n--- Simulating {num_seasons} seasons of {len(circuits)} races ({total_races} races) ---")
+
+    # The weather of every race is fixed up front, independently of how the work is split.
+    weather_rng = np.random.default_rng([base_seed, len(circuits)])
+    race_weathers = weather_rng.integers(0, len(WEATHER_CONDITIONS), size=(num_seasons, len(circuits)))
+    season_nums = np.arange(num_seasons)
+
+    # The batch engine runs a whole circuit per task; the scalar engine splits circuits into
+    # blocks of seasons so that every worker stays busy.
+    if use_batch_engine:
+        blocks_per_circuit = 1
+    else:
+        blocks_per_circuit = max(1, math.ceil(num_workers * 4 / len(circuits)))
+    block_size = max(1, math.ceil(num_seasons / blocks_per_circuit))
+    tasks = [
+        (circuit, circuit_number, season_nums[start:start + block_size], race_weathers[start:start + block_size, circuit_number])
+        for circuit_number, circuit in enumerate(circuits)
+        for start in range(0, num_seasons, block_size)
+    ]
+
+    try:
+        if num_workers > 1:
+            with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_season_worker, initargs=(race_entries_template,)) as executor:
+                futures = {executor.submit(_run_season_task, *task, enhanced_simulation, use_batch_engine, base_seed): task[0] for task in tasks}
+                for future in as_completed(futures):
+                    task_seasons, positions = future.result()
+                    accumulator.add_races(task_seasons, positions)
+                    progress.set_label(futures[future]['name'])
+                    progress.update(len(task_seasons))
+        else:
+            sim_entries = create_sim_entries(race_entries_template)
+            for circuit, circuit_number, task_seasons, task_weathers in tasks:
+                progress.set_label(circuit['name'])
+                positions = simulate_circuit_races(sim_entries, circuit, circuit_number, task_seasons, task_weathers, enhanced_simulation, use_batch_engine, base_seed)
+                accumulator.add_races(task_seasons, positions)
+                progress.update(len(task_seasons))
+    finally:
+        progress.close()
+    accumulator.seed = base_seed
+    return accumulator
+
+def save_season_results(drivers_df, constructors_df, num_seasons, race_results_output_dir):
+    """Writes the drivers' and constructors' championship summaries as CSVs. Returns both file paths."""
+    season_output_dir = os.path.join(race_results_output_dir, "results", "season")
+    os.makedirs(season_output_dir, exist_ok=True)
+    drivers_filepath = os.path.join(season_output_dir, f"Season_Drivers_{num_seasons}seasons.csv")
+    constructors_filepath = os.path.join(season_output_dir, f"Season_Constructors_{num_seasons}seasons.csv")
+    drivers_df.to_csv(drivers_filepath, index=False)
+    constructors_df.to_csv(constructors_filepath, index=False)
+    return drivers_filepath, constructors_filepath
@@ -0,0 +1,68 @@
+import json
+import os
+
+import numpy as np
+
+from race_sim_adv import RaceResultAccumulator, save_npz_atomic
+
+# Sharded runs: one study split over several machines that share an output directory.
+# Shard i of n runs a fixed slice of every weather's sims (contiguous, and aligned to whole
+# batches for the batch engine) with the study's base seed. Both engines seed their races from
+# the base seed and the sim number, so the shards together draw exactly the races of one
+# single-node run. Each shard writes a partial aggregate (its RaceResultAccumulator: position
+# histograms, DNF counts and points sums, per weather too) to partials/ under the output
+# directory, and merging all n partials gives the single-node run's results.
+
+PARTIAL_VERSION = 1
+
+def shard_sim_range(num_simulations, shard_index, shard_count, step=1):
+    """The (start, end) sims of shard shard_index of shard_count, splitting num_simulations into slices of whole steps."""
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} is out of range for {shard_count} shards.")
+    num_steps = -(-num_simulations // step)
+    start = num_steps * shard_index // shard_count * step
+    end = num_steps * (shard_index + 1) // shard_count * step
+    return min(start, num_simulations), min(end, num_simulations)
+
+def shard_suffix(shard_index, shard_count):
+    return f"_shard{shard_index}of{shard_count}"
+
+def partial_path(output_dir, circuit_name, run_key, shard_index, shard_count):
+    """Where shard shard_index of a sharded run (identified by run_key, see result_cache.run_cache_key) writes its partial aggregate."""
+    return os.path.join(output_dir, "partials", f"{circuit_name.replace(' ', '')}_{run_key[:16]}{shard_suffix(shard_index, shard_count)}.npz")
+
+def save_partial(filepath, accumulator, run_key, shard_index, shard_count, settings):
+    """Writes a shard's accumulated results with the run key, shard and run settings, atomically."""
+    meta = {'version': PARTIAL_VERSION, 'run_key': run_key, 'shard_index': shard_index, 'shard_count': shard_count, 'settings': settings}
+    arrays = accumulator.state_arrays()
+    arrays['meta'] = np.array(json.dumps(meta))
+    save_npz_atomic(filepath, arrays)
+
+def load_partial(filepath):
+    """Returns (accumulator, meta) of a partial written by save_partial."""
+    with np.load(filepath) as arrays:
+        meta = json.loads(str(arrays['meta']))
+        if meta['version'] != PARTIAL_VERSION:
+            raise ValueError(f"Partial {filepath} has version {meta['version']}, expected {PARTIAL_VERSION}.")
+        return RaceResultAccumulator.from_state_arrays(arrays), meta
+
+def merge_partials(output_dir, circuit_name, run_key, shard_count, valid_drivers, weather_names):
+    """
+    Merges the partials of all shard_count shards of a run into one RaceResultAccumulator over
+    valid_drivers, with the weathers in the order a single-node run adds them. Raises
+    FileNotFoundError naming the missing shards unless every shard has written its partial.
+    """
+    paths = [partial_path(output_dir, circuit_name, run_key, i, shard_count) for i in range(shard_count)]
+    missing = [i for i, path in enumerate(paths) if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Missing partials of {circuit_name} from shards {missing} of {shard_count} in {os.path.join(output_dir, 'partials')}.")
+    accumulator = RaceResultAccumulator(valid_drivers)
+    for i, path in enumerate(paths):
+        partial, meta = load_partial(path)
+        if (meta['run_key'], meta['shard_index'], meta['shard_count']) != (run_key, i, shard_count):
+            raise ValueError(f"Partial {path} belongs to another run or shard.")
+        if partial.driver_names != accumulator.driver_names:
+            raise ValueError(f"Partial {path} was run on another race field.")
+        accumulator.merge(partial)
+    accumulator.weather_results = {w: accumulator.weather_results[w] for w in weather_names if w in accumulator.weather_results}
+    return accumulator
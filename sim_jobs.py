@@ -0,0 +1,679 @@
+"""
+Headless runs of the race simulator: declarative job specs, a command line entry point and
+the simulate() Python API.
+
+A job spec is a JSON, TOML or YAML (needs PyYAML) file. Settings under "defaults" apply to
+every job; each entry of "jobs" runs its circuits one after another. A file without a "jobs"
+list is a single job.
+
+    # jobs.toml
+    output_dir = "outputs"
+
+    [defaults]
+    simulations = 2000
+    enhanced = true
+    workers = 8
+
+    [[jobs]]
+    circuits = ["Bahrain International Circuit", "Circuit de Monaco"]
+    seed = 42
+
+    [[jobs]]
+    circuits = "all"
+    weathers = ["Dry"]
+    engine = "batch"
+    simulations = 50000
+
+    [[jobs]]
+    mode = "season"
+    seasons = 10000
+    engine = "batch"
+
+    [[jobs]]
+    mode = "compare"
+    circuits = ["Circuit de Monaco"]
+    simulations = 5000
+    antithetic = true
+    variant = { name = "Upgrade", data_dir = "upgrade_data" }
+
+Run it with `python sim_jobs.py jobs.toml` (or `python race_sim_adv.py jobs.toml`).
+
+To spread race jobs over several machines sharing output_dir, run shard i of n on each
+machine with `--shard-index i --shard-count n` (every job needs a seed), then combine the
+partial results with `--merge --shard-count n`.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+from circuit_data import CIRCUIT_DATA
+from progress import VERBOSITY_LEVELS, check_verbosity
+from race_profiler import RaceProfiler
+from results_store import RACE_RESULT_FORMATS, new_run_id, race_store_path
+from checkpoint import DEFAULT_CHECKPOINT_INTERVAL, SweepCheckpoint, sweep_checkpoint_path
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_BYTES, ResultCache, run_cache_key
+from shards import merge_partials, partial_path, save_partial
+from replay_archive import REPLAY_FORMATS, replay_archive_path
+from weather_conditions import WEATHER_CONDITIONS
+from race_sim_adv import (
+    REPLAY_LEVELS, ADAPTIVE_BATCH_SIZE, load_race_field, run_weather_sweep, generate_final_p1_p20_list,
+    save_aggregated_results, save_precision_results, save_weather_results
+)
+
+ENGINES = ('scalar', 'batch')
+MODES = ('race', 'season', 'compare')
+
+# Every setting a job may use, with its default.
+JOB_DEFAULTS = {
+    'mode': 'race',                 # 'race' runs each circuit on its own; 'season' runs championships over them;
+                                    # 'compare' runs two scenarios at each circuit on common random numbers
+    'circuits': None,               # circuit names, 1-based circuit numbers, or "all" (required in race and compare mode)
+    'weathers': 'all',              # weather condition names, or "all"
+    'simulations': 1000,            # race mode: per circuit, split evenly over the weathers
+    'target_precision': None,       # race mode: stop once every outcome probability's 95% CI is within
+                                    # +/- this many percentage points; 'simulations' is then the maximum
+    'seasons': 100,                 # season mode: number of championships (weather drawn per race)
+    'enhanced': False,
+    'engine': 'scalar',             # 'scalar', or 'batch' for the vectorized engine (no replays or logs)
+    'seed': None,                   # None draws a fresh base seed for every circuit
+    'workers': 1,
+    'replay_level': 'none',         # see REPLAY_LEVELS
+    'replay_format': 'archive',     # how replays are saved: 'archive' (one indexed file per run, see replay_archive) or 'json' (one file per race)
+    'save_individual_races': False,
+    'race_results_format': 'sqlite',  # where save_individual_races goes: 'sqlite' (results/races.sqlite) or 'csv' (one file per race)
+    'save_logs': False,
+    'show_logs': False,
+    'save_aggregated': True,
+    'cache': False,                 # race mode: reuse the aggregated results of an identical seeded run (see result_cache)
+    'checkpoint_interval': DEFAULT_CHECKPOINT_INTERVAL,  # race mode: seconds between checkpoints (see checkpoint); None for none
+    'verbosity': 'progress',        # see VERBOSITY_LEVELS: 'quiet', 'progress' (one updating line) or 'verbose' (every race)
+    'baseline': None,               # compare mode: scenario settings (SCENARIO_KEYS) of side A; None is the race field as is
+    'variant': None,                # compare mode: scenario settings of side B (required)
+    'antithetic': False,            # compare mode: run the races in antithetic pairs
+}
+SPEC_KEYS = ('data_dir', 'output_dir', 'cache_dir', 'cache_max_mb', 'defaults', 'jobs')
+# Scenario settings: data_dir holds the scenario's own team, driver and car CSVs; car_overrides and
+# strategy_overrides change drivers' attributes and strategies (see paired_runs).
+SCENARIO_KEYS = ('name', 'data_dir', 'car_overrides', 'strategy_overrides')
+
+class SimulationResult:
+    """
+    The outcome of simulating one circuit: the aggregated summary (results), the P1-P20 list
+    (p1_p20), the underlying RaceResultAccumulator and the settings that produced them.
+    The seed is always recorded, so a run without an explicit seed can be reproduced.
+    precision is the widest 95% CI half-width of the outcome probabilities, in percentage
+    points, and precision_table the per-driver breakdown (see RaceResultAccumulator).
+    weather_table breaks the results down per weather condition (see weather_dataframe).
+    run_id identifies the run in the race results store and names its replay archive, when
+    individual races or replays were saved.
+    cached is True when the results came from the result cache instead of being simulated.
+    shard is (shard_index, shard_count) for the results of one shard of a sharded run.
+    """
+    def __init__(self, circuit, weathers, num_simulations, seed, enhanced, engine, accumulator, results, p1_p20, output_files, target_precision=None, run_id=None, cached=False, shard=None):
+        self.circuit = circuit
+        self.weathers = weathers
+        self.num_simulations = num_simulations
+        self.seed = seed
+        self.enhanced = enhanced
+        self.engine = engine
+        self.accumulator = accumulator
+        self.results = results
+        self.p1_p20 = p1_p20
+        self.output_files = output_files
+        self.target_precision = target_precision
+        self.run_id = run_id
+        self.cached = cached
+        self.shard = shard
+        self.precision = accumulator.precision()
+        self.precision_table = accumulator.precision_dataframe()
+        self.weather_table = accumulator.weather_dataframe()
+
+    def __repr__(self):
+        return (f"SimulationResult(circuit='{self.circuit['name']}', weathers={self.weathers}, "
+                f"num_simulations={self.num_simulations}, seed={self.seed}, engine='{self.engine}', "
+                f"precision={self.precision:.2f})")
+
+def resolve_circuit(circuit):
+    """Looks up a circuit by name (case-insensitive) or 1-based number; circuit dicts pass through."""
+    if isinstance(circuit, dict):
+        return circuit
+    if isinstance(circuit, int) and not isinstance(circuit, bool):
+        if 1 <= circuit <= len(CIRCUIT_DATA):
+            return CIRCUIT_DATA[circuit - 1]
+        raise ValueError(f"Circuit number {circuit} is out of range (1-{len(CIRCUIT_DATA)}).")
+    for c in CIRCUIT_DATA:
+        if c['name'].lower() == str(circuit).strip().lower():
+            return c
+    raise ValueError(f"Unknown circuit '{circuit}'.")
+
+def resolve_weathers(weathers):
+    """Validates weather condition names; None or "all" means every condition."""
+    if weathers is None or weathers == 'all':
+        return list(WEATHER_CONDITIONS)
+    if isinstance(weathers, str):
+        weathers = [weathers]
+    for name in weathers:
+        if name not in WEATHER_CONDITIONS:
+            raise ValueError(f"Unknown weather condition '{name}'. Expected one of {list(WEATHER_CONDITIONS)}.")
+    return list(weathers)
+
+def simulate(circuit, simulations=1000, weathers=None, enhanced=False, engine='scalar', seed=None, workers=1,
+             replay_level='none', output_dir=None, save_individual_races=False, save_logs=False, show_logs=False,
+             save_aggregated=False, data_dir=None, race_field=None, profiler=None, target_precision=None,
+             batch_size=ADAPTIVE_BATCH_SIZE, verbosity='progress', race_results_format='sqlite', cache=None,
+             checkpoint_interval=None, resume=False, shard_index=0, shard_count=1, replay_format='archive'):
+    """
+    Runs a Monte Carlo simulation of one circuit and returns a SimulationResult.
+
+    circuit is a circuit name, 1-based circuit number or CIRCUIT_DATA dict. The simulations
+    are split evenly over weathers (all conditions by default). Files (replays, race CSVs,
+    logs, aggregated CSVs) are only written when requested, and then output_dir is required.
+    race_field is the (valid_drivers, race_entries_template) pair from load_race_field(); pass
+    it to skip re-reading the CSVs from data_dir (this module's directory by default).
+    Pass a race_profiler.RaceProfiler to collect per-phase timings of the scalar engine.
+    With a target_precision (percentage points) the simulations run in rounds of batch_size
+    and stop once every driver's win, podium, points and DNF probabilities are known to within
+    +/- target_precision at 95% confidence; simulations is then the maximum.
+    verbosity is one of VERBOSITY_LEVELS: progress is shown as a single updating line by
+    default, 'verbose' prints every race's result table and 'quiet' prints nothing.
+    save_individual_races stores one row per driver per race in output_dir/results/races.sqlite
+    (see results_store.RaceResultStore), or one CSV per race with race_results_format='csv'
+    (scalar engine only).
+    Replays go to one archive per run, output_dir/replays/<circuit>/<run id>.f1replays (see
+    replay_archive), or to one JSON file per race with replay_format='json'.
+    cache is a result_cache.ResultCache (or True for one in the default directory). A seeded
+    run that writes no per-race files (replays, race results or logs) and is not profiled is
+    then looked up by the content hash of all its inputs, and on a hit the aggregated results
+    are returned without simulating anything; on a miss the run's results are stored.
+    With a checkpoint_interval (seconds) the run saves its progress under output_dir/checkpoints
+    that often (see checkpoint.SweepCheckpoint). With resume, a run with the same inputs and
+    settings as an interrupted one continues from its checkpoint, and returns the results the
+    interrupted run would have; without a seed it takes the interrupted run's seed.
+    With a shard_count above 1 only shard shard_index of the run is simulated (see shards),
+    and its partial results are written to output_dir/partials for merge_shards() instead of
+    the aggregated CSVs. Sharded runs need a seed, shared by every shard, and are not cached.
+    """
+    chosen_circuit = resolve_circuit(circuit)
+    weather_names = resolve_weathers(weathers)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Expected one of {ENGINES}.")
+    if replay_level not in REPLAY_LEVELS:
+        raise ValueError(f"Unknown replay level '{replay_level}'. Expected one of {REPLAY_LEVELS}.")
+    if simulations < 1:
+        raise ValueError("simulations must be at least 1.")
+    if target_precision is not None and target_precision <= 0:
+        raise ValueError("target_precision must be positive.")
+    check_verbosity(verbosity)
+    if race_results_format not in RACE_RESULT_FORMATS:
+        raise ValueError(f"Unknown race results format '{race_results_format}'. Expected one of {RACE_RESULT_FORMATS}.")
+    if replay_format not in REPLAY_FORMATS:
+        raise ValueError(f"Unknown replay format '{replay_format}'. Expected one of {REPLAY_FORMATS}.")
+    if engine == 'batch' and save_individual_races and race_results_format == 'csv':
+        raise ValueError("The batch engine saves individual races to the SQLite store only.")
+    writes_files = replay_level != 'none' or save_individual_races or save_logs or save_aggregated
+    if engine == 'scalar' and writes_files and output_dir is None:
+        raise ValueError("output_dir is required when replays, race results, logs or aggregated results are saved.")
+    if engine == 'batch' and (save_aggregated or save_individual_races) and output_dir is None:
+        raise ValueError("output_dir is required to save race or aggregated results.")
+    if checkpoint_interval is not None and output_dir is None:
+        raise ValueError("output_dir is required to save checkpoints.")
+    sharded = shard_count > 1
+    if sharded and (seed is None or target_precision is not None or output_dir is None):
+        raise ValueError("A sharded run needs a seed and an output_dir, and no target_precision.")
+
+    race_field = _resolve_race_field(race_field, data_dir)
+    valid_drivers, race_entries_template = race_field
+
+    base_seed = seed if seed is not None else random.randrange(2**32)
+    # Identifies the run's inputs and settings, unseeded ones too, so an unseeded run can be resumed.
+    run_key = run_cache_key(chosen_circuit, weather_names, race_entries_template, simulations, seed,
+                            enhanced, engine, target_precision, batch_size)
+    checkpoint_path = None
+    if checkpoint_interval is not None:
+        checkpoint_path = sweep_checkpoint_path(output_dir, chosen_circuit['name'], run_key, shard_index, shard_count)
+    store_races = save_individual_races and race_results_format == 'sqlite'
+    archive_replays = engine == 'scalar' and replay_level != 'none' and replay_format == 'archive'
+    run_id = new_run_id() if store_races or archive_replays else None
+    if checkpoint_path is not None and resume:
+        saved = SweepCheckpoint(checkpoint_path).load()
+        if saved is not None:
+            # The resumed run keeps the interrupted run's seed and run id (race results store run and replay archive).
+            base_seed = saved['base_seed'] if seed is None else base_seed
+            run_id = saved['run_id'] if run_id is not None and saved['run_id'] is not None else run_id
+    if cache is True:
+        cache = ResultCache()
+    per_race_outputs = replay_level != 'none' or save_individual_races or save_logs or show_logs
+    cache_key = None
+    accumulator = None
+    if cache and seed is not None and not per_race_outputs and profiler is None and not sharded:
+        cache_key = run_key
+        accumulator = cache.get(cache_key)
+    cached = accumulator is not None
+    if not cached:
+        accumulator = run_weather_sweep(
+            simulations, chosen_circuit, race_entries_template, valid_drivers,
+            weather_names=weather_names, enhanced_simulation=enhanced, use_batch_engine=engine == 'batch',
+            race_results_output_dir=output_dir, show_logs=show_logs, save_logs=save_logs,
+            save_individual_races=save_individual_races, num_workers=workers, seed=base_seed,
+            replay_level=replay_level, profiler=profiler, target_precision=target_precision, batch_size=batch_size,
+            verbosity=verbosity, race_results_format=race_results_format, run_id=run_id,
+            checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval, resume=resume,
+            shard_index=shard_index, shard_count=shard_count, replay_format=replay_format
+        )
+        if cache_key is not None:
+            cache.put(cache_key, accumulator)
+    output_files = [race_store_path(output_dir)] if store_races else []
+    if archive_replays:
+        output_files.append(replay_archive_path(output_dir, chosen_circuit['name'], run_id))
+    if sharded:
+        filepath = partial_path(output_dir, chosen_circuit['name'], run_key, shard_index, shard_count)
+        save_partial(filepath, accumulator, run_key, shard_index, shard_count, {
+            'circuit': chosen_circuit['name'], 'weathers': weather_names, 'simulations': simulations,
+            'seed': seed, 'enhanced': enhanced, 'engine': engine,
+        })
+        output_files.append(filepath)
+        save_aggregated = False
+    return _simulation_result(chosen_circuit, weather_names, base_seed, enhanced, engine, accumulator, valid_drivers,
+                              output_files, output_dir if save_aggregated else None, target_precision, run_id, cached,
+                              (shard_index, shard_count) if sharded else None)
+
+def _simulation_result(circuit, weather_names, seed, enhanced, engine, accumulator, valid_drivers, output_files,
+                       aggregated_dir=None, target_precision=None, run_id=None, cached=False, shard=None):
+    # Builds the SimulationResult of an accumulator and, given an aggregated_dir, writes its aggregated CSVs.
+    num_simulations = accumulator.num_simulations
+    results = accumulator.to_dataframe()
+    p1_p20 = generate_final_p1_p20_list(results, len(valid_drivers))
+    result = SimulationResult(circuit, weather_names, num_simulations, seed, enhanced, engine, accumulator,
+                              results, p1_p20, output_files, target_precision, run_id, cached, shard)
+    if aggregated_dir is not None:
+        output_files.extend(save_aggregated_results(results, p1_p20, circuit, num_simulations, aggregated_dir))
+        output_files.append(save_precision_results(result.precision_table, circuit, num_simulations, aggregated_dir))
+        output_files.append(save_weather_results(result.weather_table, circuit, num_simulations, aggregated_dir))
+    return result
+
+def merge_shards(circuit, shard_count, output_dir, simulations=1000, weathers=None, enhanced=False, engine='scalar',
+                 seed=None, save_aggregated=True, data_dir=None, race_field=None, batch_size=ADAPTIVE_BATCH_SIZE):
+    """
+    Combines the partial results that shard_count shards of a run (see simulate's shard_index)
+    wrote to output_dir/partials into the SimulationResult of the whole run, and writes its
+    aggregated, precision, per-weather and P1-P20 CSVs, identical to those of a single-node
+    run. The settings must be those the shards ran with.
+    """
+    chosen_circuit = resolve_circuit(circuit)
+    weather_names = resolve_weathers(weathers)
+    if seed is None:
+        raise ValueError("Sharded runs are seeded; pass the seed the shards ran with.")
+    valid_drivers, race_entries_template = _resolve_race_field(race_field, data_dir)
+    run_key = run_cache_key(chosen_circuit, weather_names, race_entries_template, simulations, seed,
+                            enhanced, engine, None, batch_size)
+    accumulator = merge_partials(output_dir, chosen_circuit['name'], run_key, shard_count, valid_drivers, weather_names)
+    return _simulation_result(chosen_circuit, weather_names, seed, enhanced, engine, accumulator, valid_drivers,
+                              [], output_dir if save_aggregated else None)
+
+class SeasonResult:
+    """
+    The outcome of a season simulation: the drivers' and constructors' championship summaries
+    (drivers, constructors), the underlying SeasonAccumulator and the settings that produced them.
+    """
+    def __init__(self, circuits, num_seasons, seed, enhanced, engine, accumulator, drivers, constructors, output_files):
+        self.circuits = circuits
+        self.num_seasons = num_seasons
+        self.seed = seed
+        self.enhanced = enhanced
+        self.engine = engine
+        self.accumulator = accumulator
+        self.drivers = drivers
+        self.constructors = constructors
+        self.output_files = output_files
+
+    def __repr__(self):
+        return (f"SeasonResult(races_per_season={len(self.circuits)}, num_seasons={self.num_seasons}, "
+                f"seed={self.seed}, engine='{self.engine}')")
+
+def simulate_season(seasons=100, circuits=None, enhanced=False, engine='scalar', seed=None, workers=1,
+                    output_dir=None, save_results=False, data_dir=None, race_field=None, verbosity='progress'):
+    """
+    Simulates championship seasons over the calendar (circuits, all of CIRCUIT_DATA by default)
+    and returns a SeasonResult with title odds and points distributions.
+    data_dir, race_field and verbosity work as in simulate().
+    """
+    from season import run_season_simulation, save_season_results
+    calendar = list(CIRCUIT_DATA) if circuits is None or circuits == 'all' else [resolve_circuit(c) for c in circuits]
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Expected one of {ENGINES}.")
+    if seasons < 1:
+        raise ValueError("seasons must be at least 1.")
+    if save_results and output_dir is None:
+        raise ValueError("output_dir is required to save season results.")
+    check_verbosity(verbosity)
+    race_field = _resolve_race_field(race_field, data_dir)
+    valid_drivers, race_entries_template = race_field
+
+    base_seed = seed if seed is not None else random.randrange(2**32)
+    accumulator = run_season_simulation(
+        seasons, race_entries_template, valid_drivers, circuits=calendar, enhanced_simulation=enhanced,
+        use_batch_engine=engine == 'batch', num_workers=workers, seed=base_seed, verbosity=verbosity
+    )
+    drivers = accumulator.drivers_dataframe()
+    constructors = accumulator.constructors_dataframe()
+    output_files = list(save_season_results(drivers, constructors, seasons, output_dir)) if save_results else []
+    return SeasonResult(calendar, seasons, base_seed, enhanced, engine, accumulator, drivers, constructors, output_files)
+
+def compare(circuit, variant, baseline=None, simulations=1000, weathers=None, enhanced=False, seed=None, workers=1,
+            antithetic=False, output_dir=None, save_results=False, data_dir=None, race_field=None, verbosity='progress'):
+    """
+    Compares two scenarios at one circuit, race by race on common random numbers, and returns a
+    paired_runs.PairedComparison; its deltas_dataframe() has every driver's outcome deltas with
+    their confidence intervals.
+    baseline and variant are scenario settings (SCENARIO_KEYS), e.g.
+    {'name': 'Upgrade', 'car_overrides': {'McLaren Formula 1': {'car_engine_hp_final': 13.0}}}.
+    A scenario without a data_dir uses race_field (or the CSVs in data_dir, as in simulate()).
+    simulations is the number of races per scenario. verbosity works as in simulate().
+    """
+    from paired_runs import run_paired_comparison, save_comparison_results
+    chosen_circuit = resolve_circuit(circuit)
+    weather_names = resolve_weathers(weathers)
+    if simulations < 2:
+        raise ValueError("simulations must be at least 2.")
+    if save_results and output_dir is None:
+        raise ValueError("output_dir is required to save comparison results.")
+    check_verbosity(verbosity)
+    race_field = _resolve_race_field(race_field, data_dir)
+    scenario_a = _build_scenario(baseline, race_field, 'Baseline')
+    scenario_b = _build_scenario(variant, race_field, 'Variant')
+    if scenario_a.name == scenario_b.name:
+        raise ValueError(f"Both scenarios are named '{scenario_a.name}'.")
+
+    comparison = run_paired_comparison(
+        simulations, chosen_circuit, scenario_a, scenario_b, weather_names=weather_names,
+        enhanced_simulation=enhanced, seed=seed, antithetic=antithetic, num_workers=workers, verbosity=verbosity
+    )
+    if save_results:
+        comparison.output_files.append(save_comparison_results(comparison, output_dir))
+    return comparison
+
+def _build_scenario(settings, race_field, default_name):
+    from paired_runs import Scenario, apply_car_overrides
+    settings = settings or {}
+    if not isinstance(settings, dict):
+        raise ValueError(f"Scenario settings must be a mapping of {SCENARIO_KEYS}.")
+    unknown = set(settings) - set(SCENARIO_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown scenario settings: {sorted(unknown)}.")
+    if settings.get('data_dir') is not None:
+        race_field = _resolve_race_field(None, settings['data_dir'])
+    race_entries_template = apply_car_overrides(race_field[1], settings.get('car_overrides'))
+    return Scenario(settings.get('name', default_name), race_entries_template, settings.get('strategy_overrides'))
+
+def _resolve_race_field(race_field, data_dir):
+    if race_field is None:
+        race_field = load_race_field(data_dir if data_dir is not None else os.path.dirname(os.path.abspath(__file__)))
+        if race_field is None:
+            raise IOError("Could not load the team, driver and car data CSVs.")
+    if not race_field[0]:
+        raise ValueError("No valid drivers found. Please check team assignments in your CSVs.")
+    return race_field
+
+def load_job_spec(path):
+    """Reads a job spec from a .json, .toml or .yaml/.yml file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as f:
+            return json.load(f)
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("Reading TOML job specs needs Python 3.11+ or the tomli package (pip install tomli).")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading YAML job specs needs PyYAML (pip install pyyaml).")
+        with open(path) as f:
+            return yaml.safe_load(f)
+    raise ValueError(f"Unsupported job spec format '{extension}'. Use .json, .toml, .yaml or .yml.")
+
+def expand_jobs(spec):
+    """
+    Validates a job spec and returns its jobs as complete settings dicts (JOB_DEFAULTS, then
+    the spec's defaults, then the job's own settings), plus data_dir and output_dir.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("A job spec must be a mapping.")
+    unknown = set(spec) - set(SPEC_KEYS) - set(JOB_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown job spec settings: {sorted(unknown)}.")
+    cache_max_mb = spec.get('cache_max_mb', 1)
+    if isinstance(cache_max_mb, bool) or not isinstance(cache_max_mb, (int, float)) or cache_max_mb <= 0:
+        raise ValueError("cache_max_mb must be a positive number of megabytes.")
+    defaults = spec.get('defaults', {})
+    if 'jobs' in spec:
+        job_list = spec['jobs']
+    else:
+        job_list = [{key: value for key, value in spec.items() if key in JOB_DEFAULTS}]
+    if not job_list:
+        raise ValueError("The job spec contains no jobs.")
+
+    jobs = []
+    for index, job_settings in enumerate(job_list):
+        job = dict(JOB_DEFAULTS)
+        for settings in (defaults, job_settings):
+            unknown = set(settings) - set(JOB_DEFAULTS)
+            if unknown:
+                raise ValueError(f"Job {index + 1}: unknown settings {sorted(unknown)}.")
+            job.update(settings)
+        if job['mode'] not in MODES:
+            raise ValueError(f"Job {index + 1}: unknown mode '{job['mode']}'. Expected one of {MODES}.")
+        if job['circuits'] is None:
+            if job['mode'] != 'season':
+                raise ValueError(f"Job {index + 1}: 'circuits' is required.")
+            job['circuits'] = 'all'
+        circuits = job['circuits']
+        if circuits == 'all':
+            circuits = list(range(1, len(CIRCUIT_DATA) + 1))
+        elif isinstance(circuits, (str, int)):
+            circuits = [circuits]
+        job['circuits'] = [resolve_circuit(c) for c in circuits]
+        job['weathers'] = resolve_weathers(job['weathers'])
+        if job['engine'] not in ENGINES:
+            raise ValueError(f"Job {index + 1}: unknown engine '{job['engine']}'. Expected one of {ENGINES}.")
+        target_precision = job['target_precision']
+        if target_precision is not None and (isinstance(target_precision, bool) or not isinstance(target_precision, (int, float)) or target_precision <= 0):
+            raise ValueError(f"Job {index + 1}: target_precision must be a positive number of percentage points.")
+        if job['replay_level'] not in REPLAY_LEVELS:
+            raise ValueError(f"Job {index + 1}: unknown replay level '{job['replay_level']}'. Expected one of {REPLAY_LEVELS}.")
+        if job['race_results_format'] not in RACE_RESULT_FORMATS:
+            raise ValueError(f"Job {index + 1}: unknown race_results_format '{job['race_results_format']}'. Expected one of {RACE_RESULT_FORMATS}.")
+        if job['replay_format'] not in REPLAY_FORMATS:
+            raise ValueError(f"Job {index + 1}: unknown replay_format '{job['replay_format']}'. Expected one of {REPLAY_FORMATS}.")
+        if job['mode'] == 'race' and job['engine'] == 'batch' and job['save_individual_races'] and job['race_results_format'] == 'csv':
+            raise ValueError(f"Job {index + 1}: the batch engine saves individual races to the SQLite store only.")
+        checkpoint_interval = job['checkpoint_interval']
+        if checkpoint_interval is not None and (isinstance(checkpoint_interval, bool) or not isinstance(checkpoint_interval, (int, float)) or checkpoint_interval <= 0):
+            raise ValueError(f"Job {index + 1}: checkpoint_interval must be a positive number of seconds.")
+        if job['verbosity'] not in VERBOSITY_LEVELS:
+            raise ValueError(f"Job {index + 1}: unknown verbosity '{job['verbosity']}'. Expected one of {VERBOSITY_LEVELS}.")
+        if job['mode'] == 'compare':
+            if job['engine'] != 'scalar':
+                raise ValueError(f"Job {index + 1}: compare mode runs on the scalar engine.")
+            if job['variant'] is None:
+                raise ValueError(f"Job {index + 1}: compare mode needs a 'variant' scenario.")
+            for side in ('baseline', 'variant'):
+                if job[side] is not None and (not isinstance(job[side], dict) or set(job[side]) - set(SCENARIO_KEYS)):
+                    raise ValueError(f"Job {index + 1}: '{side}' must be a mapping of {SCENARIO_KEYS}.")
+        job['data_dir'] = spec.get('data_dir', '')
+        job['output_dir'] = spec.get('output_dir', 'outputs')
+        job['cache_dir'] = spec.get('cache_dir', DEFAULT_CACHE_DIR)
+        job['cache_max_bytes'] = int(spec['cache_max_mb'] * 2**20) if 'cache_max_mb' in spec else DEFAULT_CACHE_MAX_BYTES
+        jobs.append(job)
+    return jobs
+
+def run_jobs(jobs, profiler=None, resume=False, shard_index=0, shard_count=1, merge=False):
+    """
+    Runs expanded jobs in order and returns every SimulationResult, SeasonResult and PairedComparison.
+    With resume, race jobs continue from the checkpoints of interrupted runs. With a shard_count
+    above 1 only shard shard_index of every race job runs, or with merge the partial results of
+    all its shards are combined (see merge_shards); season and compare jobs are skipped then.
+    """
+    race_fields = {}
+    all_results = []
+    for job in jobs:
+        data_dir = job['data_dir']
+        if data_dir not in race_fields:
+            race_fields[data_dir] = load_race_field(data_dir)
+            if race_fields[data_dir] is None:
+                raise IOError(f"Could not load the team, driver and car data CSVs from '{data_dir}'.")
+        if job['mode'] != 'race' and (shard_count > 1 or merge):
+            print(f"\nSkipping a {job['mode']} job: only race jobs can be sharded.")
+            continue
+        if merge:
+            for circuit in job['circuits']:
+                result = merge_shards(
+                    circuit, shard_count, job['output_dir'], simulations=job['simulations'], weathers=job['weathers'],
+                    enhanced=job['enhanced'], engine=job['engine'], seed=job['seed'], save_aggregated=job['save_aggregated'],
+                    race_field=race_fields[data_dir]
+                )
+                print(f"\nMerged {result.num_simulations} simulations at {circuit['name']} from {shard_count} shards (seed {result.seed}), "
+                      f"precision +/-{result.precision:.2f} pp (95% CI).")
+                for filepath in result.output_files:
+                    print(f"Saved {filepath}")
+                all_results.append(result)
+            continue
+        if job['mode'] == 'season':
+            result = simulate_season(
+                seasons=job['seasons'], circuits=job['circuits'], enhanced=job['enhanced'], engine=job['engine'],
+                seed=job['seed'], workers=job['workers'], output_dir=job['output_dir'],
+                save_results=job['save_aggregated'], race_field=race_fields[data_dir], verbosity=job['verbosity']
+            )
+            print(f"\nFinished {result.num_seasons} seasons of {len(result.circuits)} races (seed {result.seed}).")
+            print(result.drivers[['Driver', 'Team', 'Title Probability (%)', 'Avg Points']].head(10).to_string(index=False))
+            for filepath in result.output_files:
+                print(f"Saved {filepath}")
+            all_results.append(result)
+            continue
+        if job['mode'] == 'compare':
+            for circuit in job['circuits']:
+                result = compare(
+                    circuit, job['variant'], baseline=job['baseline'], simulations=job['simulations'],
+                    weathers=job['weathers'], enhanced=job['enhanced'], seed=job['seed'], workers=job['workers'],
+                    antithetic=job['antithetic'], output_dir=job['output_dir'], save_results=job['save_aggregated'],
+                    race_field=race_fields[data_dir], verbosity=job['verbosity']
+                )
+                deltas = result.deltas_dataframe()
+                points = deltas[deltas['Metric'] == 'Points'].drop(columns=['Metric', 'Independent CI (+/-)'])
+                print(f"\nFinished {result.num_races} paired races at {circuit['name']} (seed {result.seed}). Average points:")
+                print(points.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+                for filepath in result.output_files:
+                    print(f"Saved {filepath}")
+                all_results.append(result)
+            continue
+        for circuit in job['circuits']:
+            result = simulate(
+                circuit, simulations=job['simulations'], weathers=job['weathers'], enhanced=job['enhanced'],
+                engine=job['engine'], seed=job['seed'], workers=job['workers'], replay_level=job['replay_level'],
+                output_dir=job['output_dir'], save_individual_races=job['save_individual_races'],
+                save_logs=job['save_logs'], show_logs=job['show_logs'], save_aggregated=job['save_aggregated'],
+                race_field=race_fields[data_dir], profiler=profiler, target_precision=job['target_precision'],
+                verbosity=job['verbosity'], race_results_format=job['race_results_format'],
+                cache=ResultCache(job['cache_dir'], job['cache_max_bytes']) if job['cache'] else None,
+                checkpoint_interval=job['checkpoint_interval'], resume=resume,
+                shard_index=shard_index, shard_count=shard_count, replay_format=job['replay_format']
+            )
+            source = "Loaded" if result.cached else "Finished"
+            shard = f"shard {shard_index} of {shard_count}, " if result.shard else ''
+            print(f"\n{source} {result.num_simulations} simulations at {circuit['name']} ({shard}seed {result.seed}), "
+                  f"precision +/-{result.precision:.2f} pp (95% CI){' from the result cache' if result.cached else ''}.")
+            if result.run_id is not None:
+                print(f"Stored as run {result.run_id}")
+            for filepath in result.output_files:
+                print(f"Saved {filepath}")
+            all_results.append(result)
+    return all_results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run race simulation jobs from a JSON, TOML or YAML job spec.")
+    parser.add_argument('spec', help="path to the job spec")
+    parser.add_argument('--output-dir', help="overrides the spec's output_dir")
+    parser.add_argument('--workers', type=int, help="overrides the worker count of every job")
+    parser.add_argument('--seed', type=int, help="overrides the seed of every job")
+    parser.add_argument('--verbosity', choices=VERBOSITY_LEVELS, help="overrides the console output level of every job")
+    parser.add_argument('--no-cache', action='store_true', help="simulate every job even if the result cache holds its results")
+    parser.add_argument('--resume', action='store_true', help="continue interrupted race jobs from their last checkpoint")
+    parser.add_argument('--shard-index', type=int, default=0, help="with --shard-count, the shard of every race job to run (0-based)")
+    parser.add_argument('--shard-count', type=int, default=1, help="split every race job into this many shards, run separately (e.g. on several machines)")
+    parser.add_argument('--merge', action='store_true', help="combine the partial results of all --shard-count shards into the final CSVs")
+    parser.add_argument('--dry-run', action='store_true', help="validate the spec and list the jobs without running them")
+    parser.add_argument('--profile', action='store_true', help="print time spent per simulation phase (scalar engine)")
+    parser.add_argument('--trace', help="also write a Chrome/Perfetto trace of the phases to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = expand_jobs(load_job_spec(args.spec))
+    except (OSError, ValueError, ImportError) as e:
+        print(f"Invalid job spec '{args.spec}': {e}", file=sys.stderr)
+        return 2
+    for job in jobs:
+        if args.output_dir is not None:
+            job['output_dir'] = args.output_dir
+        if args.workers is not None:
+            job['workers'] = args.workers
+        if args.seed is not None:
+            job['seed'] = args.seed
+        if args.verbosity is not None:
+            job['verbosity'] = args.verbosity
+        if args.no_cache:
+            job['cache'] = False
+    if args.shard_count < 1 or not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1.")
+    if args.merge and args.shard_count < 2:
+        parser.error("--merge needs the --shard-count the shards ran with.")
+    sharded_jobs = [job for job in jobs if job['mode'] == 'race'] if args.shard_count > 1 else []
+    if any(job['seed'] is None for job in sharded_jobs):
+        parser.error("Sharded race jobs need a seed shared by every shard (set seed in the spec or pass --seed).")
+    if any(job['target_precision'] is not None for job in sharded_jobs):
+        parser.error("Sharded race jobs run all their simulations; remove target_precision.")
+
+    if args.dry_run:
+        for index, job in enumerate(jobs):
+            circuit_names = ', '.join(c['name'] for c in job['circuits'])
+            if job['mode'] == 'season':
+                print(f"Job {index + 1}: {job['seasons']} seasons over [{circuit_names}], "
+                      f"engine={job['engine']}, enhanced={job['enhanced']}, seed={job['seed']}, workers={job['workers']}")
+                continue
+            if job['mode'] == 'compare':
+                baseline_name = (job['baseline'] or {}).get('name', 'Baseline')
+                variant_name = job['variant'].get('name', 'Variant')
+                print(f"Job {index + 1}: compare '{baseline_name}' with '{variant_name}', {job['simulations']} paired races x [{circuit_names}] "
+                      f"in {job['weathers']}, antithetic={job['antithetic']}, enhanced={job['enhanced']}, seed={job['seed']}, workers={job['workers']}")
+                continue
+            simulations = job['simulations'] if job['target_precision'] is None else f"up to {job['simulations']} (until +/-{job['target_precision']} pp)"
+            print(f"Job {index + 1}: {simulations} sims x [{circuit_names}] in {job['weathers']}, "
+                  f"engine={job['engine']}, enhanced={job['enhanced']}, seed={job['seed']}, workers={job['workers']}")
+        return 0
+
+    profiler = RaceProfiler(trace=args.trace is not None) if args.profile or args.trace else None
+    try:
+        run_jobs(jobs, profiler, args.resume, args.shard_index, args.shard_count, args.merge)
+    except (FileNotFoundError, ValueError) as e:
+        if not args.merge:
+            raise
+        print(f"Cannot merge the shards: {e}", file=sys.stderr)
+        return 1
+    if profiler is not None:
+        print("\n--- Time per phase ---")
+        profiler.print_table()
+        if args.trace:
+            profiler.write_chrome_trace(args.trace)
+            print(f"\nTrace saved to {args.trace}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
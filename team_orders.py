@@ -1,4 +1,4 @@
-import random
+from random_pool import ENGINE_RNG
 
 def check_for_team_orders(front_driver, rear_driver, lap, total_laps, logger):
     # Decides if a team should issue a team order to swap driver positions.
@@ -18,7 +18,7 @@ def check_for_team_orders(front_driver, rear_driver, lap, total_laps, logger):
 
     if rear_is_faster:
         # Higher acumen teams are more likely to make the call
-        if rear_driver.effective_strategy_acumen > 0.7 and random.random() < 0.8:
+        if rear_driver.effective_strategy_acumen > 0.7 and ENGINE_RNG.random() < 0.8:
             # NEW: Log the team order
             logger.log_team_order(lap, rear_driver.team_name, front_driver, rear_driver)
             return True
@@ -28,7 +28,7 @@ def check_for_team_orders(front_driver, rear_driver, lap, total_laps, logger):
     rear_stops = 1 if "1-Stop" in rear_driver.assigned_strategy_type['name'] else 2
     
     if front_stops != rear_stops and time_diff < 1.0:
-        if rear_driver.effective_strategy_acumen > 0.6 and random.random() < 0.5:
+        if rear_driver.effective_strategy_acumen > 0.6 and ENGINE_RNG.random() < 0.5:
             # NEW: Log the team order
             logger.log_team_order(lap, rear_driver.team_name, front_driver, rear_driver)
             return True